@@ -0,0 +1,209 @@
+import asyncio
+import time
+import uuid
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a download cannot even be queued."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A download's place in the admission queue, and later its active slot."""
+
+    def __init__(self, scheduler: "DownloadScheduler", client_id: str):
+        self.id = str(uuid.uuid4())
+        self.client_id = client_id
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.released = False
+        self._scheduler = scheduler
+        self._future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def wait_time(self) -> float:
+        """Seconds spent queued before admission."""
+        return (self.admitted_at or time.monotonic()) - self.enqueued_at
+
+    async def wait(self):
+        """Wait until admitted; leaves the queue if cancelled while waiting."""
+        try:
+            await self._future
+        except asyncio.CancelledError:
+            if self.admitted_at is not None:
+                # Admitted while being cancelled, hand the slot on
+                self.release()
+            else:
+                self._scheduler._remove(self)
+            raise
+
+    def release(self):
+        """Give the active slot back. Safe to call more than once."""
+        if self.admitted_at is None:
+            # Never admitted, just give up the place in the queue
+            self._scheduler._remove(self)
+            return
+        self._scheduler.release(self)
+
+
+class DownloadScheduler:
+    """
+    Admission control for downloads.
+
+    At most max_active downloads run at once. Further requests wait in a
+    bounded queue that is served round-robin across clients, so one client
+    queueing many downloads cannot starve the others. When the queue (or a
+    client's share of it) is full, requests are rejected immediately with a
+    Retry-After estimate.
+    """
+
+    def __init__(
+        self,
+        max_active: int = 5,
+        max_queue: int = 50,
+        max_queued_per_client: int = 5,
+    ):
+        self.max_active = max(1, max_active)
+        self.max_queue = max_queue
+        self.max_queued_per_client = max_queued_per_client
+        self.active = 0
+        self._queues: "OrderedDict[str, Deque[AdmissionTicket]]" = OrderedDict()
+        self._queued = 0
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self._avg_service_time = 30.0
+        self.admitted_total = 0
+        self.rejected_total = 0
+
+    async def acquire(self, client_id: str) -> AdmissionTicket:
+        """Wait for an active slot; raises QueueFullError if the queue is full."""
+        ticket = self.enqueue(client_id)
+        await ticket.wait()
+        return ticket
+
+    def enqueue(self, client_id: str) -> AdmissionTicket:
+        """
+        Admit or queue a ticket without waiting for it.
+
+        Raises QueueFullError right away when the queue is full, so callers
+        that wait later (background jobs) can still reject up front.
+        """
+        ticket = AdmissionTicket(self, client_id)
+
+        if self.active < self.max_active and not self._queued:
+            self._admit(ticket)
+            return ticket
+
+        client_queue = self._queues.get(client_id)
+        if self._queued >= self.max_queue:
+            self._reject("Download queue is full")
+        if client_queue and len(client_queue) >= self.max_queued_per_client:
+            self._reject("Too many queued downloads for this client")
+
+        self._queues.setdefault(client_id, deque()).append(ticket)
+        self._queued += 1
+        logger.info(
+            f"Queued download for {client_id} at position {self.position(ticket)}"
+        )
+        return ticket
+
+    def release(self, ticket: AdmissionTicket):
+        """Free the slot held by an admitted ticket and admit the next one."""
+        if ticket.released or ticket.admitted_at is None:
+            return
+        ticket.released = True
+        self.active -= 1
+
+        service_time = time.monotonic() - ticket.admitted_at
+        self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+        self._dispatch()
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        """1-based position of a queued ticket under round-robin service."""
+        client_queue = self._queues.get(ticket.client_id)
+        if not client_queue or ticket not in client_queue:
+            return 0
+
+        index = client_queue.index(ticket)
+        ahead = index
+        before_in_rotation = True
+        for client_id, queue in self._queues.items():
+            if client_id == ticket.client_id:
+                before_in_rotation = False
+                continue
+            # Clients earlier in the rotation are served once more per round
+            ahead += min(len(queue), index + (1 if before_in_rotation else 0))
+        return ahead + 1
+
+    def client_positions(self, client_id: str) -> List[int]:
+        """Positions of every queued ticket belonging to a client."""
+        return [self.position(ticket) for ticket in self._queues.get(client_id, ())]
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up."""
+        estimate = self._avg_service_time * (self._queued + 1) / self.max_active
+        return max(1, min(int(estimate), 600))
+
+    def _admit(self, ticket: AdmissionTicket):
+        ticket.admitted_at = time.monotonic()
+        self.active += 1
+        self.admitted_total += 1
+        self._recent_waits.append(ticket.wait_time)
+        if not ticket._future.done():
+            ticket._future.set_result(None)
+
+    def _dispatch(self):
+        """Admit queued tickets round-robin while slots are free."""
+        while self.active < self.max_active and self._queues:
+            client_id, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            if ticket._future.cancelled():
+                continue
+            self._admit(ticket)
+
+    def _remove(self, ticket: AdmissionTicket):
+        queue = self._queues.get(ticket.client_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            self._queued -= 1
+            if not queue:
+                del self._queues[ticket.client_id]
+
+    def _reject(self, message: str):
+        self.rejected_total += 1
+        raise QueueFullError(message, self.retry_after())
+
+    def stats(self) -> dict:
+        """Return queue statistics for monitoring."""
+        waits = sorted(self._recent_waits)
+
+        def percentile(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        return {
+            "active": self.active,
+            "max_active": self.max_active,
+            "queue_depth": self._queued,
+            "max_queue": self.max_queue,
+            "queued_clients": len(self._queues),
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "wait_seconds_p50": percentile(0.5),
+            "wait_seconds_p95": percentile(0.95),
+            "wait_seconds_max": round(waits[-1], 3) if waits else None,
+            "avg_service_seconds": round(self._avg_service_time, 3),
+        }
@@ -0,0 +1,190 @@
+"""
+End-to-end throughput of /api/download/stream against local synthetic media.
+
+Starts a MediaServer with synthetic media and the API under uvicorn in a
+subprocess, with a stub yt-dlp extractor resolving
+http://127.0.0.1:<port>/bench/<kind>/<size_mb> URLs, so everything runs
+offline. Each scenario posts --requests downloads at --concurrency:
+
+  * progressive: one progressive MP4 over plain HTTP,
+  * dash: a DASH video-only track downloaded segment by segment,
+  * hls: an HLS media playlist of 1 MiB segments,
+  * merged: DASH video + audio merged by ffmpeg (skipped without ffmpeg).
+
+Reports aggregate throughput, time to first byte and total latency (p50 and
+p99), peak RSS of the server and its yt-dlp/ffmpeg children, and the
+high-water mark of the server's temp directory. --no-progressive measures
+the temp-file path instead of progressive streaming.
+
+Run from the server directory:
+
+    python benchmarks/bench_download_stream.py [--requests 16] [--concurrency 4] [--size-mb 32]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin import (  # noqa: E402
+    MIB,
+    MediaServer,
+    ResourceSampler,
+    free_port,
+    install_stub_extractor,
+    percentiles,
+    request,
+    run_concurrent,
+    wait_for_http,
+)
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, URL kind, format selector, needs ffmpeg)
+SCENARIOS = [
+    ("progressive", "progressive", "progressive", False),
+    ("dash", "dash", "dash-v", False),
+    ("hls", "hls", "hls", False),
+    ("merged", "dash", "dash-v+dash-a", True),
+]
+
+
+def start_api(port: int, temp_dir: str, concurrency: int, progressive: bool):
+    """The API under uvicorn, with its temp files in temp_dir."""
+    env = {
+        **os.environ,
+        "TMPDIR": temp_dir,
+        "PYTHONPATH": os.pathsep.join([SERVER_DIR, os.environ["PYTHONPATH"]]),
+        "YTDLP_MAX_REQUESTS_PER_MINUTE": "1000000",
+        "YTDLP_MAX_CONCURRENT_DOWNLOADS": str(concurrency),
+        "YTDLP_DOWNLOAD_QUEUE_SIZE": "10000",
+        "YTDLP_DOWNLOAD_QUEUE_PER_CLIENT": "10000",
+        "YTDLP_MEDIA_CACHE_ENABLED": "false",
+        "YTDLP_PROGRESSIVE_STREAMING": str(progressive).lower(),
+        "YTDLP_LOG_FILE": "",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def run_scenario(port, media_url, kind, selector, args, sampler):
+    url = f"{media_url}/bench/{kind}/{args.size_mb}"
+
+    def download(_):
+        return request(
+            "127.0.0.1",
+            port,
+            "POST",
+            "/api/download/stream",
+            body={"url": url, "format": selector},
+        )
+
+    # One untimed request warms up imports and the extractor
+    download(0)
+    sampler.reset()
+    results, wall = run_concurrent(download, args.requests, args.concurrency)
+    ok = [result for result in results if result.ok and result.size > 0]
+    ttfb = percentiles([result.ttfb for result in ok])
+    total = percentiles([result.total for result in ok])
+    return {
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "mb_per_s": sum(result.size for result in ok) / MIB / wall,
+        "ttfb_p50": ttfb["p50"],
+        "ttfb_p99": ttfb["p99"],
+        "total_p50": total["p50"],
+        "total_p99": total["p99"],
+        "peak_rss_mb": sampler.peak_rss / MIB,
+        "peak_disk_mb": sampler.peak_disk / MIB,
+    }
+
+
+def ms(value):
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--requests", type=int, default=16, help="downloads per scenario"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="downloads in flight"
+    )
+    parser.add_argument("--size-mb", type=int, default=32, help="size of each download")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(name for name, *_ in SCENARIOS),
+        help="comma-separated subset of scenarios",
+    )
+    parser.add_argument(
+        "--no-progressive",
+        action="store_true",
+        help="disable progressive streaming (temp-file path)",
+    )
+    args = parser.parse_args()
+    selected = set(args.scenarios.split(","))
+
+    root = tempfile.mkdtemp(prefix="bench_download_stream_")
+    install_stub_extractor(os.path.join(root, "plugins"))
+    temp_dir = os.path.join(root, "tmp")
+    os.makedirs(temp_dir)
+    port = free_port()
+
+    print(
+        f"{args.requests} requests x {args.size_mb} MiB, concurrency {args.concurrency}, "
+        f"{'temp-file' if args.no_progressive else 'progressive'} mode\n"
+    )
+    print(
+        f"{'scenario':<14}{'ok':>4}{'fail':>6}{'MB/s':>9}{'ttfb p50':>10}{'p99':>8}"
+        f"{'total p50':>11}{'p99':>8}{'peak RSS MB':>13}{'peak tmp MB':>13}"
+    )
+
+    api = start_api(port, temp_dir, args.concurrency, not args.no_progressive)
+    try:
+        with MediaServer() as media:
+            wait_for_http("127.0.0.1", port, "/api/health")
+            with ResourceSampler(api.pid, temp_dir) as sampler:
+                for name, kind, selector, needs_ffmpeg in SCENARIOS:
+                    if name not in selected:
+                        continue
+                    if needs_ffmpeg and not shutil.which("ffmpeg"):
+                        print(f"{name:<14}skipped: ffmpeg not installed")
+                        continue
+                    row = run_scenario(
+                        port, media.base_url, kind, selector, args, sampler
+                    )
+                    print(
+                        f"{name:<14}{row['ok']:>4}{row['failed']:>6}{row['mb_per_s']:>9.1f}"
+                        f"{ms(row['ttfb_p50']):>10}{ms(row['ttfb_p99']):>8}"
+                        f"{ms(row['total_p50']):>11}{ms(row['total_p99']):>8}"
+                        f"{row['peak_rss_mb']:>13.0f}{row['peak_disk_mb']:>13.0f}"
+                    )
+    finally:
+        api.terminate()
+        api.wait(timeout=30)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
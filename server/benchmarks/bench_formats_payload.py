@@ -0,0 +1,164 @@
+"""
+Payload size and serialization time of /api/formats for a 200-format video.
+
+Builds a synthetic info dict shaped like a YouTube extraction (DASH formats
+with fragment lists, per-format URLs and HTTP headers) and serializes its
+formats:
+
+  * as before: every raw format dict, through a pydantic response model and
+    FastAPI's default jsonable_encoder + JSONResponse path,
+  * compact: the default field projection through CompactJSONResponse, with
+    orjson when installed and with the standard library encoder.
+
+Reports body size uncompressed, gzipped and (if the brotli package is
+installed) brotli-compressed, and the serialization time per response.
+
+Run from the server directory:
+
+    python benchmarks/bench_formats_payload.py [--formats 200] [--rounds 200]
+"""
+
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+import responses  # noqa: E402
+from compression import CompressionMiddleware, brotli  # noqa: E402
+from responses import COMPACT_FORMAT_FIELDS, compact_response, project  # noqa: E402
+
+
+class FormatsResponse(BaseModel):
+    is_playlist: bool
+    formats: Optional[List[Dict]] = None
+    entries: Optional[List[Dict]] = None
+
+
+def make_format(rng: random.Random, i: int, duration: int) -> dict:
+    height = rng.choice([144, 240, 360, 480, 720, 1080, 1440, 2160])
+    is_audio = i % 5 == 0
+    base = f"https://rr{i % 8}---sn-abc.googlevideo.com/videoplayback?expire=1760000000&id=o-{i:04d}"
+    fragments = [
+        {"url": f"{base}&range={n * 500000}-{n * 500000 + 499999}", "duration": 5.0}
+        for n in range(duration // 5)
+    ]
+    return {
+        "format_id": str(100 + i),
+        "format_note": "medium" if is_audio else f"{height}p",
+        "ext": "m4a" if is_audio else rng.choice(["mp4", "webm"]),
+        "protocol": "https",
+        "acodec": "mp4a.40.2" if is_audio else "none",
+        "vcodec": (
+            "none"
+            if is_audio
+            else rng.choice(["avc1.64001F", "vp09.00.40.08", "av01.0.08M.08"])
+        ),
+        "url": base + "&sig=" + "x" * 120,
+        "width": None if is_audio else height * 16 // 9,
+        "height": None if is_audio else height,
+        "fps": None if is_audio else rng.choice([24, 30, 60]),
+        "audio_channels": 2 if is_audio else None,
+        "quality": rng.randint(0, 10),
+        "has_drm": False,
+        "tbr": round(rng.uniform(50, 8000), 3),
+        "filesize": rng.randint(1_000_000, 900_000_000),
+        "asr": 44100 if is_audio else None,
+        "source_preference": -1,
+        "language": "en" if is_audio else None,
+        "dynamic_range": None if is_audio else "SDR",
+        "container": "m4a_dash" if is_audio else "mp4_dash",
+        "downloader_options": {"http_chunk_size": 10485760},
+        "fragments": fragments,
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-us,en;q=0.5",
+            "Sec-Fetch-Mode": "navigate",
+        },
+        "resolution": "audio only" if is_audio else f"{height * 16 // 9}x{height}",
+        "aspect_ratio": None if is_audio else 1.78,
+        "video_ext": "none" if is_audio else "mp4",
+        "audio_ext": "m4a" if is_audio else "none",
+        "format": f"{100 + i} - {'audio only' if is_audio else f'{height}p'}",
+    }
+
+
+def make_info(format_count: int, seed: int = 11) -> dict:
+    rng = random.Random(seed)
+    duration = 600
+    return {
+        "id": "synthetic",
+        "title": "Synthetic video",
+        "duration": duration,
+        "formats": [make_format(rng, i, duration) for i in range(format_count)],
+    }
+
+
+def legacy_body(info: dict) -> bytes:
+    model = FormatsResponse(
+        is_playlist=False, formats=[dict(fmt) for fmt in info["formats"]]
+    )
+    return JSONResponse(jsonable_encoder(model)).body
+
+
+def compact_body(info: dict) -> bytes:
+    formats = [project(dict(fmt), COMPACT_FORMAT_FIELDS) for fmt in info["formats"]]
+    return compact_response(FormatsResponse(is_playlist=False, formats=formats)).body
+
+
+def per_call(func, info: dict, rounds: int) -> float:
+    func(info)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(info)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--formats", type=int, default=200, help="formats in the video")
+    parser.add_argument("--rounds", type=int, default=200, help="responses per variant")
+    args = parser.parse_args()
+
+    info = make_info(args.formats)
+    compressor = CompressionMiddleware(None)
+    orjson = responses.orjson
+
+    variants = [("raw formats, pydantic + json (before)", legacy_body, orjson)]
+    if orjson is not None:
+        variants.append(("compact, orjson", compact_body, orjson))
+    variants.append(("compact, stdlib json", compact_body, None))
+
+    print(f"{args.formats} formats, {args.rounds} rounds\n")
+    header = f"{'variant':<40}{'bytes':>12}{'gzip':>10}"
+    if brotli is not None:
+        header += f"{'brotli':>10}"
+    print(header + f"{'encode us':>12}{'gzip us':>10}")
+
+    for name, func, encoder in variants:
+        responses.orjson = encoder
+        body = func(info)
+        encode_us = per_call(func, info, args.rounds)
+        start = time.perf_counter()
+        gzipped = compressor.compress(body, "gzip")
+        gzip_us = (time.perf_counter() - start) * 1e6
+        row = f"{name:<40}{len(body):>12}{len(gzipped):>10}"
+        if brotli is not None:
+            row += f"{len(compressor.compress(body, 'br')):>10}"
+        print(row + f"{encode_us:>12.0f}{gzip_us:>10.0f}")
+    responses.orjson = orjson
+
+    assert gzip.decompress(gzipped) == body
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Load test of the metadata endpoints (/api/info, /api/formats) offline.
+
+Runs the API under uvicorn on a thread of this process, with the stub
+yt-dlp extractor from standin.py resolving
+http://127.0.0.1:<port>/bench/video/<id> (60 formats) and
+http://127.0.0.1:<port>/bench/playlist/<entries>-<id> without network
+access. Every combination of:
+
+  * endpoint: info, formats,
+  * method: GET (cookies by session token) and POST (cookies in the body),
+  * cookies: without, and with a small client cookie jar,
+  * target: a single video, and playlists of each --playlist-sizes,
+
+gets --requests requests at --concurrency. Each request uses a new URL so
+it goes through extraction; --warm repeats one URL to measure the
+metadata cache instead.
+
+Reports requests/s and latency percentiles, plus event-loop lag sampled by
+a probe task on the server's loop: how late a 10 ms sleep wakes up while
+the load runs. Lag near zero means extraction stays off the loop.
+
+Run from the server directory:
+
+    python benchmarks/bench_metadata_load.py [--requests 12] [--concurrency 4] [--playlist-sizes 10,100,1000,5000]
+"""
+
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin import (  # noqa: E402
+    free_port,
+    install_stub_extractor,
+    percentiles,
+    request,
+    run_concurrent,
+    wait_for_http,
+)
+
+PROBE_INTERVAL = 0.01
+
+BENCH_COOKIES = [
+    {"domain": ".example.com", "name": f"bench_{n}", "value": "x" * 32, "path": "/"}
+    for n in range(8)
+]
+
+
+class LoopLagProbe:
+    """Measures how late the event loop runs a task that sleeps PROBE_INTERVAL."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._lock = threading.Lock()
+
+    async def run(self):
+        while True:
+            start_time = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lag = time.perf_counter() - start_time - PROBE_INTERVAL
+            with self._lock:
+                self.samples.append(max(lag, 0.0))
+
+    def take(self) -> List[float]:
+        with self._lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+
+def start_api(port: int, probe: LoopLagProbe):
+    """The API under uvicorn on a daemon thread, with the lag probe on its loop."""
+    import uvicorn
+
+    import main
+
+    server = uvicorn.Server(
+        uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    loop = asyncio.new_event_loop()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.serve())
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    wait_for_http("127.0.0.1", port, "/api/health")
+    probe_task = asyncio.run_coroutine_threadsafe(probe.run(), loop)
+    return server, thread, probe_task
+
+
+def cookie_session(port: int) -> str:
+    """Upload the bench cookies once and return their session token."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.request(
+        "POST",
+        "/api/cookies",
+        body=json.dumps({"cookies": BENCH_COOKIES}),
+        headers={"Content-Type": "application/json"},
+    )
+    token = json.loads(connection.getresponse().read())["session_token"]
+    connection.close()
+    if not token:
+        raise RuntimeError("Cookie upload was rejected")
+    return token
+
+
+def make_call(port, endpoint, method, with_cookies, size, warm, session):
+    """A function sending request number i of a scenario."""
+    is_playlist = size is not None
+    base = f"http://127.0.0.1:{port}/bench"
+
+    def url_for(i):
+        nonce = "warm" if warm else f"{time.monotonic_ns()}-{i}"
+        return (
+            f"{base}/playlist/{size}-{nonce}"
+            if is_playlist
+            else f"{base}/video/{nonce}"
+        )
+
+    def call(i):
+        if method == "GET":
+            params = {"url": url_for(i), "is_playlist": str(is_playlist).lower()}
+            if with_cookies:
+                params["cookie_session"] = session
+            return request(
+                "127.0.0.1", port, "GET", f"/api/{endpoint}?{urlencode(params)}"
+            )
+        body = {"url": url_for(i), "is_playlist": is_playlist}
+        if with_cookies:
+            body["cookies"] = BENCH_COOKIES
+        return request("127.0.0.1", port, "POST", f"/api/{endpoint}", body=body)
+
+    return call
+
+
+def ms(value):
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--requests", type=int, default=12, help="requests per scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    parser.add_argument(
+        "--playlist-sizes", default="10,100,1000,5000", help="playlist entry counts"
+    )
+    parser.add_argument("--endpoints", default="info,formats")
+    parser.add_argument("--methods", default="GET,POST")
+    parser.add_argument(
+        "--cookies", default="without,with", help="run without and/or with cookies"
+    )
+    parser.add_argument(
+        "--warm", action="store_true", help="repeat one URL (metadata cache hits)"
+    )
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_metadata_load_")
+    install_stub_extractor(os.path.join(root, "plugins"))
+    # Read by the settings when main is imported
+    os.environ.update(
+        {
+            "TMPDIR": root,
+            "YTDLP_MAX_REQUESTS_PER_MINUTE": "1000000",
+            "YTDLP_LOG_FILE": "",
+        }
+    )
+    tempfile.tempdir = None
+
+    port = free_port()
+    probe = LoopLagProbe()
+    server, thread, probe_task = start_api(port, probe)
+    session = cookie_session(port)
+
+    targets = [None] + [int(size) for size in args.playlist_sizes.split(",") if size]
+    scenarios = itertools.product(
+        args.endpoints.split(","),
+        args.methods.split(","),
+        args.cookies.split(","),
+        targets,
+    )
+
+    print(
+        f"{args.requests} requests per scenario, concurrency {args.concurrency}, "
+        f"{'warm (cached)' if args.warm else 'cold (new URL per request)'}\n"
+    )
+    print(
+        f"{'endpoint':<9}{'method':<7}{'cookies':<9}{'target':<15}{'ok':>4}{'fail':>6}"
+        f"{'req/s':>8}{'p50 ms':>8}{'p90':>7}{'p99':>7}{'lag p99':>9}{'lag max':>9}"
+    )
+    try:
+        for endpoint, method, cookies, size in scenarios:
+            call = make_call(
+                port, endpoint, method, cookies == "with", size, args.warm, session
+            )
+            call(-1)  # warm-up, and fills the cache for --warm
+            probe.take()
+            results, wall = run_concurrent(call, args.requests, args.concurrency)
+            lag = percentiles(probe.take())
+            ok = [result for result in results if result.ok]
+            latency = percentiles([result.total for result in ok])
+            target = f"playlist {size}" if size is not None else "video"
+            print(
+                f"{endpoint:<9}{method:<7}{cookies:<9}{target:<15}{len(ok):>4}"
+                f"{len(results) - len(ok):>6}{len(ok) / wall:>8.1f}"
+                f"{ms(latency['p50']):>8}{ms(latency['p90']):>7}{ms(latency['p99']):>7}"
+                f"{ms(lag['p99']):>9}{ms(lag['max']):>9}"
+            )
+    finally:
+        probe_task.cancel()
+        server.should_exit = True
+        thread.join(timeout=30)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
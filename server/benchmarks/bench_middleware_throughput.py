@@ -0,0 +1,146 @@
+"""
+Streaming throughput through the rate limiting middleware.
+
+Serves a large StreamingResponse (like /api/download/stream) through:
+
+  * no middleware (baseline),
+  * the previous BaseHTTPMiddleware-based RateLimitMiddleware,
+  * the current pure ASGI RateLimitMiddleware,
+
+calling the ASGI app directly so only middleware overhead is measured, not
+the network. Reports MB/s for each.
+
+Run from the server directory:
+
+    python benchmarks/bench_middleware_throughput.py [--mb 512] [--chunk-kb 64]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from security import (  # noqa: E402
+    RateLimitMiddleware,
+    SlidingWindowRateLimiter,
+    get_client_ip,
+)
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware-based middleware this benchmark compares against."""
+
+    def __init__(self, app, calls_per_minute: int = 30, max_clients: int = 100_000):
+        super().__init__(app)
+        self.calls_per_minute = calls_per_minute
+        self.limiter = SlidingWindowRateLimiter(calls_per_minute, 60, max_clients)
+
+    async def dispatch(self, request, call_next):
+        if not self.limiter.hit(get_client_ip(request)):
+            return JSONResponse(status_code=429, content={"detail": "Rate limited"})
+        return await call_next(request)
+
+
+def build_app(total_bytes: int, chunk_size: int, middleware=None) -> Starlette:
+    chunk = b"\0" * chunk_size
+
+    async def stream(request):
+        async def body():
+            remaining = total_bytes
+            while remaining > 0:
+                yield chunk if remaining >= chunk_size else chunk[:remaining]
+                remaining -= chunk_size
+
+        return StreamingResponse(body(), media_type="application/octet-stream")
+
+    app = Starlette(routes=[Route("/stream", stream)])
+    if middleware is not None:
+        app.add_middleware(middleware, calls_per_minute=1_000_000)
+    return app
+
+
+async def stream_once(app) -> int:
+    """Run one GET /stream through the ASGI app and count body bytes."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    received = 0
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return received
+
+
+async def measure(app, total_bytes: int, rounds: int) -> float:
+    await stream_once(app)  # warm up routing and imports
+    start = time.perf_counter()
+    for _ in range(rounds):
+        received = await stream_once(app)
+        assert received == total_bytes, received
+    elapsed = time.perf_counter() - start
+    return total_bytes * rounds / elapsed / (1024 * 1024)
+
+
+async def run(total_mb: int, chunk_kb: int, rounds: int):
+    total_bytes = total_mb * 1024 * 1024
+    chunk_size = chunk_kb * 1024
+    variants = [
+        ("no middleware", None),
+        ("BaseHTTPMiddleware (before)", LegacyRateLimitMiddleware),
+        ("pure ASGI (after)", RateLimitMiddleware),
+    ]
+
+    print(f"Streaming {total_mb} MB in {chunk_kb} KB chunks, {rounds} rounds\n")
+    print(f"{'middleware stack':<32}{'MB/s':>12}")
+    for name, middleware in variants:
+        app = build_app(total_bytes, chunk_size, middleware)
+        print(f"{name:<32}{await measure(app, total_bytes, rounds):>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=int, default=512, help="body size per request")
+    parser.add_argument("--chunk-kb", type=int, default=64, help="chunk size")
+    parser.add_argument("--rounds", type=int, default=3, help="requests per variant")
+    args = parser.parse_args()
+    asyncio.run(run(args.mb, args.chunk_kb, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
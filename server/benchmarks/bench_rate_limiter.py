@@ -0,0 +1,107 @@
+"""
+Per-request cost of the rate limiter as the number of tracked clients grows.
+
+Compares SlidingWindowRateLimiter with the previous implementation, which
+rebuilt the per-second dict of every tracked IP on each request. The legacy
+limiter is only run at small client counts; at 100k clients a single
+request takes seconds.
+
+Run from the server directory:
+
+    python benchmarks/bench_rate_limiter.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import SlidingWindowRateLimiter  # noqa: E402
+
+WINDOW = 60
+LIMIT = 100
+MEASURED_REQUESTS = 200_000
+
+
+class LegacyRateLimiter:
+    """The per-request full scan removed from RateLimitMiddleware."""
+
+    def __init__(self, limit: int, window_seconds: int = WINDOW):
+        self.limit = limit
+        self.window_size = window_seconds
+        self.storage = {}
+
+    def hit(self, client_ip: str, current_time: float) -> bool:
+        cutoff_time = current_time - self.window_size
+        for ip in list(self.storage.keys()):
+            self.storage[ip] = {
+                timestamp: count
+                for timestamp, count in self.storage[ip].items()
+                if float(timestamp) > cutoff_time
+            }
+            if not self.storage[ip]:
+                del self.storage[ip]
+
+        if client_ip in self.storage:
+            request_count = sum(
+                count
+                for timestamp, count in self.storage[client_ip].items()
+                if float(timestamp) > cutoff_time
+            )
+            if request_count >= self.limit:
+                return False
+
+        bucket = self.storage.setdefault(client_ip, {})
+        timestamp_key = str(int(current_time))
+        bucket[timestamp_key] = bucket.get(timestamp_key, 0) + 1
+        return True
+
+
+def client_ips(count: int):
+    return [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(count)]
+
+
+def measure(limiter, clients, requests: int) -> float:
+    """Warm the limiter with every client, then time requests spread over them."""
+    now = 1_000_000.0
+    for ip in clients:
+        limiter.hit(ip, now)
+
+    step = 30.0 / requests  # half a window, so counters stay live
+    start = time.perf_counter()
+    for i in range(requests):
+        limiter.hit(clients[(i * 7919) % len(clients)], now + i * step)
+    return (time.perf_counter() - start) / requests * 1e9
+
+
+def main():
+    print(f"{'limiter':<16}{'clients':>10}{'requests':>10}{'ns/request':>14}")
+
+    for count in (100, 1_000, 10_000, 100_000):
+        clients = client_ips(count)
+        limiter = SlidingWindowRateLimiter(LIMIT, WINDOW, max_clients=200_000)
+        ns = measure(limiter, clients, MEASURED_REQUESTS)
+        print(f"{'sliding-window':<16}{count:>10}{MEASURED_REQUESTS:>10}{ns:>14.0f}")
+
+    for count, requests in ((100, 20_000), (1_000, 2_000), (5_000, 200)):
+        clients = client_ips(count)
+        ns = measure(LegacyRateLimiter(LIMIT), clients, requests)
+        print(f"{'legacy':<16}{count:>10}{requests:>10}{ns:>14.0f}")
+
+    # Spoofed X-Forwarded-For flood: every request from a new address
+    limiter = SlidingWindowRateLimiter(LIMIT, WINDOW, max_clients=100_000)
+    flood = 1_000_000
+    start = time.perf_counter()
+    for i in range(flood):
+        limiter.hit(f"spoofed-{i}", 1_000_000.0)
+    ns = (time.perf_counter() - start) / flood * 1e9
+    print(
+        f"\nflood of {flood} distinct clients: {ns:.0f} ns/request, "
+        f"{len(limiter)} tracked (max {limiter.max_clients}), "
+        f"{limiter.evicted} evicted"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cookie upload validation cost for large browser-extension exports.
+
+Compares SecurityValidator.validate_cookie_data, which scans all cookie
+values in one sweep with a single compiled pattern, with the previous
+implementation that called re.search once per pattern per cookie. Both
+are checked to accept and reject exactly the same cookies.
+
+Run from the server directory:
+
+    python benchmarks/bench_validation.py [--cookies 500]
+"""
+
+import argparse
+import base64
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import SecurityValidator  # noqa: E402
+
+
+def legacy_validate_cookie_data(cookies: list) -> list:
+    """The per-pattern, per-cookie loop this benchmark compares against."""
+    validated_cookies = []
+    for cookie in cookies:
+        domain = cookie.get("domain", "")
+        if not domain or len(domain) > 255:
+            continue
+        name = cookie.get("name", "")
+        value = cookie.get("value", "")
+        if not name or len(name) > 255 or len(value) > 4096:
+            continue
+        dangerous_found = False
+        for pattern in SecurityValidator.DANGEROUS_PATTERNS:
+            if re.search(pattern, value, re.IGNORECASE):
+                dangerous_found = True
+                break
+        if not dangerous_found:
+            validated_cookies.append(cookie)
+    return validated_cookies
+
+
+def make_cookies(count: int, dangerous_ratio: float, seed: int = 7) -> list:
+    """Cookies shaped like a browser export: opaque tokens of mixed length."""
+    rng = random.Random(seed)
+    payloads = ["<script>x</script>", "../../etc", "javascript:alert(1)", "onload =1"]
+    cookies = []
+    for i in range(count):
+        value = base64.urlsafe_b64encode(rng.randbytes(rng.randint(16, 600))).decode()
+        if rng.random() < dangerous_ratio:
+            cut = rng.randint(0, len(value))
+            value = value[:cut] + rng.choice(payloads) + value[cut:]
+        cookies.append(
+            {
+                "domain": f".site{i % 40}.example.com",
+                "name": f"cookie_{i}",
+                "value": value,
+                "path": "/",
+            }
+        )
+    return cookies
+
+
+def per_call(func, cookies, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(cookies)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cookies", type=int, default=500, help="cookies per upload")
+    parser.add_argument("--rounds", type=int, default=200, help="uploads per variant")
+    args = parser.parse_args()
+
+    # Validation logs a warning per rejected cookie; keep the output readable
+    logging.getLogger("security").disabled = True
+
+    print(f"{args.cookies} cookies per upload, {args.rounds} rounds\n")
+    print(f"{'dangerous':>10}{'legacy us':>14}{'single-pass us':>18}{'speedup':>10}")
+    for ratio in (0.0, 0.01, 0.1):
+        cookies = make_cookies(args.cookies, ratio)
+        expected = legacy_validate_cookie_data(cookies)
+        actual = SecurityValidator.validate_cookie_data(cookies)
+        assert actual == expected, "validators disagree"
+
+        legacy = per_call(legacy_validate_cookie_data, cookies, args.rounds)
+        current = per_call(SecurityValidator.validate_cookie_data, cookies, args.rounds)
+        print(f"{ratio:>10.0%}{legacy:>14.0f}{current:>18.0f}{legacy / current:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Offline stand-ins shared by the end-to-end benchmarks.
+
+  * MediaServer: a local HTTP server with synthetic progressive MP4, DASH
+    segments and HLS playlists of any size, generated on the fly.
+  * install_stub_extractor: a yt-dlp plugin extractor for
+    http://127.0.0.1:<port>/bench/<kind>/<id> URLs, which resolves them
+    without any network access: media kinds point at a MediaServer, "video"
+    returns a YouTube-sized format list and "playlist/<n>[-<nonce>]" returns
+    n entries.
+    The plugin directory is put on sys.path and PYTHONPATH, so the yt-dlp
+    subprocesses the server starts find it too.
+  * request(), run_concurrent() and percentiles() to drive and summarize
+    load, and ResourceSampler for peak RSS and temp-disk use.
+
+Not a benchmark itself; imported by the bench_* scripts next to it.
+"""
+
+import http.client
+import json
+import math
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import psutil
+except ImportError:  # optional, RSS is reported as unavailable
+    psutil = None
+
+MIB = 1024 * 1024
+SEGMENT_SECONDS = 4
+AUDIO_SEGMENT_BYTES = 128 * 1024
+WRITE_CHUNK = 64 * 1024
+
+# Deterministic filler for every synthetic file
+_BLOCK = bytes(range(256)) * (MIB // 256)
+
+STUB_EXTRACTOR = r"""
+from yt_dlp.extractor.common import InfoExtractor
+
+SEGMENT_SECONDS = 4
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+VIDEO_CODECS = ("avc1.64001F", "vp09.00.40.08", "av01.0.08M.08")
+
+
+class BenchStandInIE(InfoExtractor):
+    IE_NAME = "bench:standin"
+    _VALID_URL = (
+        r"(?P<base>https?://127\.0\.0\.1:\d+)/bench/"
+        r"(?P<kind>progressive|dash|hls|video|playlist)/(?P<id>[\w-]+)"
+    )
+
+    def _real_extract(self, url):
+        base, kind, item_id = self._match_valid_url(url).group("base", "kind", "id")
+        if kind == "playlist":
+            # <entries> or <entries>-<nonce>, so load tests can avoid caches
+            count = int(item_id.split("-")[0])
+            entries = [
+                self.url_result(
+                    f"{base}/bench/video/{item_id}-{index}",
+                    BenchStandInIE,
+                    f"{item_id}-{index}",
+                    f"Entry {index} of {count}",
+                    duration=600,
+                )
+                for index in range(1, count + 1)
+            ]
+            return self.playlist_result(
+                entries, f"playlist-{item_id}", f"Playlist of {count}"
+            )
+
+        if kind == "video":
+            formats = self._metadata_formats(base, item_id)
+        else:
+            formats = self._media_formats(base, kind, int(item_id))
+        return {
+            "id": f"{kind}-{item_id}",
+            "title": f"Bench {kind} {item_id}",
+            "duration": 600,
+            "uploader": "bench",
+            "formats": formats,
+        }
+
+    def _media_formats(self, base, kind, size_mb):
+        media = f"{base}/media/{kind}/{size_mb}"
+        if kind == "progressive":
+            return [{
+                "format_id": "progressive", "url": f"{media}/video.mp4", "ext": "mp4",
+                "protocol": "http", "vcodec": "avc1.64001F", "acodec": "mp4a.40.2",
+                "height": 720, "filesize": size_mb * 1024 * 1024,
+            }]
+        if kind == "hls":
+            return [{
+                "format_id": "hls", "url": f"{media}/index.m3u8", "ext": "mp4",
+                "protocol": "m3u8_native", "vcodec": "avc1.64001F",
+                "acodec": "mp4a.40.2", "height": 720,
+            }]
+        video_fragments = [
+            {"path": f"{n}.m4s", "duration": SEGMENT_SECONDS} for n in range(size_mb)
+        ]
+        return [
+            {
+                "format_id": "dash-v", "url": f"{media}/video/", "ext": "mp4",
+                "protocol": "http_dash_segments", "container": "mp4_dash",
+                "fragment_base_url": f"{media}/video/", "fragments": video_fragments,
+                "vcodec": "avc1.64001F", "acodec": "none", "height": 1080,
+            },
+            {
+                "format_id": "dash-a", "url": f"{media}/audio/", "ext": "m4a",
+                "protocol": "http_dash_segments", "container": "m4a_dash",
+                "fragment_base_url": f"{media}/audio/",
+                "fragments": [dict(fragment) for fragment in video_fragments],
+                "vcodec": "none", "acodec": "mp4a.40.2", "abr": 128,
+            },
+        ]
+
+    def _metadata_formats(self, base, item_id):
+        formats = []
+        for index in range(60):
+            audio = index % 5 == 0
+            height = HEIGHTS[index % len(HEIGHTS)]
+            formats.append({
+                "format_id": str(100 + index),
+                "url": f"{base}/media/progressive/1/video.mp4?itag={100 + index}&sig=" + "x" * 120,
+                "ext": "m4a" if audio else "mp4",
+                "protocol": "https",
+                "vcodec": "none" if audio else VIDEO_CODECS[index % 3],
+                "acodec": "mp4a.40.2" if audio else "none",
+                "height": None if audio else height,
+                "width": None if audio else height * 16 // 9,
+                "fps": None if audio else 30,
+                "tbr": 64.0 + index * 97.5,
+                "filesize": 1_000_000 + index * 7_340_000,
+                "format_note": "medium" if audio else f"{height}p",
+                "http_headers": {"User-Agent": "Mozilla/5.0 (bench)"},
+            })
+        return formats
+"""
+
+
+def install_stub_extractor(root: str) -> str:
+    """
+    Write the stub extractor plugin under root, on sys.path and PYTHONPATH.
+
+    Must run before yt_dlp is imported in this process.
+    """
+    plugin_dir = os.path.join(root, "yt_dlp_plugins", "extractor")
+    os.makedirs(plugin_dir, exist_ok=True)
+    with open(os.path.join(plugin_dir, "bench_standin.py"), "w") as f:
+        f.write(STUB_EXTRACTOR)
+    sys.path.insert(0, root)
+    os.environ["PYTHONPATH"] = os.pathsep.join(
+        path for path in (root, os.environ.get("PYTHONPATH")) if path
+    )
+    return root
+
+
+def hls_playlist(segments: int) -> bytes:
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for n in range(segments):
+        lines.extend([f"#EXTINF:{SEGMENT_SECONDS}.0,", f"{n}.ts"])
+    lines.append("#EXT-X-ENDLIST")
+    return ("\n".join(lines) + "\n").encode()
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self) -> Optional[object]:
+        """Size in bytes of the synthetic file at the path, or playlist bytes."""
+        parts = self.path.split("?")[0].strip("/").split("/")
+        # media/<kind>/<size_mb>/<file> or media/dash/<size_mb>/<track>/<n>.m4s
+        if len(parts) < 4 or parts[0] != "media" or not parts[2].isdigit():
+            return None
+        kind, size_mb = parts[1], int(parts[2])
+        if kind == "progressive":
+            return size_mb * MIB
+        if kind == "hls":
+            return hls_playlist(size_mb) if parts[3] == "index.m3u8" else MIB
+        if kind == "dash" and len(parts) == 5:
+            return MIB if parts[3] == "video" else AUDIO_SEGMENT_BYTES
+        return None
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body: bool):
+        resolved = self._resolve()
+        if resolved is None:
+            self.send_error(404)
+            return
+        if isinstance(resolved, bytes):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.apple.mpegurl")
+            self.send_header("Content-Length", str(len(resolved)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(resolved)
+            return
+
+        size, start, end = resolved, 0, resolved - 1
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            first, _, last = range_header[6:].partition("-")
+            start = int(first or 0)
+            end = min(int(last), size - 1) if last else size - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if not send_body:
+            return
+
+        position = start
+        try:
+            while position <= end:
+                offset = position % MIB
+                length = min(WRITE_CHUNK, MIB - offset, end - position + 1)
+                self.wfile.write(_BLOCK[offset : offset + length])
+                position += length
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer:
+    """Synthetic media over HTTP on 127.0.0.1, served from a background thread."""
+
+    def __init__(self, port: int = 0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _MediaHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "MediaServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(host: str, port: int, path: str, timeout: float = 60) -> None:
+    """Poll until a GET on path answers, or raise TimeoutError."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = request(host, port, "GET", path, timeout=2)
+        if result.status and result.status < 500:
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f"http://{host}:{port}{path} did not come up in {timeout}s")
+
+
+class RequestResult:
+    def __init__(
+        self, status: int, ttfb: float, total: float, size: int, error: str = ""
+    ):
+        self.status = status
+        self.ttfb = ttfb
+        self.total = total
+        self.size = size
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300 and not self.error
+
+
+def request(
+    host: str,
+    port: int,
+    method: str,
+    path: str,
+    body: Optional[dict] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 600,
+) -> RequestResult:
+    """One HTTP request, timing the first body byte and reading the body to the end."""
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    payload = json.dumps(body).encode() if body is not None else None
+    request_headers = dict(headers or {})
+    if payload is not None:
+        request_headers["Content-Type"] = "application/json"
+    start_time = time.perf_counter()
+    try:
+        connection.request(method, path, body=payload, headers=request_headers)
+        response = connection.getresponse()
+        chunk = response.read1(WRITE_CHUNK)
+        ttfb = time.perf_counter() - start_time
+        size = len(chunk)
+        while chunk:
+            chunk = response.read(WRITE_CHUNK)
+            size += len(chunk)
+        return RequestResult(
+            response.status, ttfb, time.perf_counter() - start_time, size
+        )
+    except OSError as e:
+        elapsed = time.perf_counter() - start_time
+        return RequestResult(0, elapsed, elapsed, 0, error=str(e))
+    finally:
+        connection.close()
+
+
+def run_concurrent(
+    func: Callable[[int], RequestResult], total: int, concurrency: int
+) -> Tuple[List[RequestResult], float]:
+    """Call func(0..total-1) with `concurrency` threads; returns results and wall time."""
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(func, range(total)))
+    return results, time.perf_counter() - start_time
+
+
+def percentiles(
+    values: Sequence[float], points=(50, 90, 99)
+) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles, keyed "p50" etc., plus "max"."""
+    ordered = sorted(values)
+    summary: Dict[str, Optional[float]] = {}
+    for point in points:
+        rank = max(1, math.ceil(point / 100 * len(ordered)))
+        summary[f"p{point}"] = ordered[rank - 1] if ordered else None
+    summary["max"] = ordered[-1] if ordered else None
+    return summary
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # removed while walking
+    return total
+
+
+class ResourceSampler:
+    """
+    Samples the RSS of a process and its children, and the size of a
+    directory, on a background thread, keeping the peaks since reset().
+    """
+
+    def __init__(
+        self, pid: int, directory: Optional[str] = None, interval: float = 0.05
+    ):
+        self.pid = pid
+        self.directory = directory
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_disk = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def reset(self):
+        self.peak_rss = 0
+        self.peak_disk = 0
+
+    def rss(self) -> int:
+        if psutil is None:
+            return 0
+        try:
+            process = psutil.Process(self.pid)
+            processes = [process, *process.children(recursive=True)]
+        except psutil.Error:
+            return 0
+        total = 0
+        for child in processes:
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.rss())
+            if self.directory:
+                self.peak_disk = max(self.peak_disk, directory_size(self.directory))
+
+    def __enter__(self) -> "ResourceSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
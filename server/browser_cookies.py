@@ -0,0 +1,224 @@
+import asyncio
+import io
+import os
+import time
+import logging
+from typing import Optional, Tuple
+
+from yt_dlp import cookies as ytdlp_cookies
+
+from cookie_store import CookieJar, CookieStore
+
+logger = logging.getLogger(__name__)
+
+
+# Private yt-dlp helpers behind its cookie database lookup. Without them the
+# database cannot be watched for changes and the cache relies on its TTL;
+# extraction itself goes through the public extract_cookies_from_browser.
+LOOKUP_HELPERS = (
+    "_newest",
+    "_find_files",
+    "_firefox_browser_dirs",
+    "_firefox_cookie_dbs",
+    "_get_chromium_based_browser_settings",
+)
+HAS_DATABASE_LOOKUP = all(hasattr(ytdlp_cookies, name) for name in LOOKUP_HELPERS)
+if not HAS_DATABASE_LOOKUP:
+    logger.info(
+        "This yt-dlp version has no cookie database lookup; "
+        "cached browser cookies expire on their TTL only"
+    )
+
+
+def locate_cookie_database(
+    browser: str, profile: Optional[str] = None
+) -> Optional[str]:
+    """
+    Path of the cookie database yt-dlp reads for a browser profile.
+
+    Uses the same lookup as yt-dlp itself; profile is a profile directory,
+    or None for the default one. Those helpers are private, so any failure
+    just means the cache falls back to expiring on its TTL alone.
+    """
+    if not HAS_DATABASE_LOOKUP:
+        return None
+    try:
+        if browser == "firefox":
+            if profile:
+                roots = [profile]
+            else:
+                roots = list(ytdlp_cookies._firefox_browser_dirs())
+            return ytdlp_cookies._newest(ytdlp_cookies._firefox_cookie_dbs(roots))
+        if browser in ytdlp_cookies.CHROMIUM_BASED_BROWSERS:
+            root = (
+                profile
+                or ytdlp_cookies._get_chromium_based_browser_settings(browser)[
+                    "browser_dir"
+                ]
+            )
+            return ytdlp_cookies._newest(
+                ytdlp_cookies._find_files(root, "Cookies", ytdlp_cookies.YDLLogger())
+            )
+    except Exception as e:
+        logger.debug(f"Could not locate {browser} cookie database: {e}")
+    return None
+
+
+def database_mtime(path: str) -> Optional[float]:
+    """Latest modification time of an SQLite database and its journal files."""
+    mtimes = []
+    for candidate in (path, f"{path}-wal", f"{path}-journal"):
+        try:
+            mtimes.append(os.stat(candidate).st_mtime)
+        except OSError:
+            pass
+    return max(mtimes, default=None)
+
+
+def extract_browser_cookies(
+    browser: str, profile: Optional[str] = None
+) -> Tuple[str, int]:
+    """Read and decrypt a browser's cookies, as Netscape text and a cookie count."""
+    jar = ytdlp_cookies.extract_cookies_from_browser(
+        browser, profile, logger=ytdlp_cookies.YDLLogger()
+    )
+    buffer = io.StringIO()
+    jar.save(buffer)
+    return buffer.getvalue(), len(jar)
+
+
+class BrowserCookieCache:
+    """
+    Browser cookies extracted once and shared by every yt-dlp call.
+
+    Passing cookiesfrombrowser to yt-dlp makes each YoutubeDL instance open
+    and decrypt the browser's cookie database again, which is slow and holds
+    the database lock. Instead the cookies are extracted in a worker thread,
+    stored as a regular jar in the cookie store, and reused until the TTL
+    runs out or the database changes on disk. Concurrent requests wait for a
+    single extraction; a failed extraction is not retried until the TTL has
+    passed, and the previous jar (if any) keeps being served meanwhile. A
+    new extraction replaces the previous jar in the store.
+    """
+
+    def __init__(
+        self,
+        browser: str,
+        store: CookieStore,
+        ttl_seconds: float = 600,
+        profile: Optional[str] = None,
+    ):
+        self.browser = browser
+        self.profile = profile
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.jar: Optional[CookieJar] = None
+        self.database_path: Optional[str] = None
+        self.database_mtime: Optional[float] = None
+        self.extracted_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.extractions = 0
+        self.failures = 0
+        self.invalidations = 0
+
+    def _is_fresh(self) -> bool:
+        if self.jar is None or self.extracted_at is None:
+            return False
+        if time.monotonic() - self.extracted_at >= self.ttl_seconds:
+            return False
+        if (
+            self.database_path is not None
+            and database_mtime(self.database_path) != self.database_mtime
+        ):
+            self.invalidations += 1
+            self.extracted_at = None
+            return False
+        return True
+
+    def _recently_failed(self) -> bool:
+        return (
+            self.failed_at is not None
+            and time.monotonic() - self.failed_at < self.ttl_seconds
+        )
+
+    def _extract(self) -> Tuple[str, int, Optional[str], Optional[float]]:
+        # Stat before reading, so a write during extraction triggers another one
+        database_path = locate_cookie_database(self.browser, self.profile)
+        mtime = database_mtime(database_path) if database_path else None
+        text, cookie_count = extract_browser_cookies(self.browser, self.profile)
+        return text, cookie_count, database_path, mtime
+
+    async def get(self) -> Optional[CookieJar]:
+        """The browser's cookie jar, extracting it again if stale."""
+        if self._is_fresh():
+            self.hits += 1
+            return self.jar
+
+        async with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self.jar
+            if self._recently_failed():
+                return self.jar
+
+            start_time = time.monotonic()
+            try:
+                text, cookie_count, database_path, mtime = await asyncio.to_thread(
+                    self._extract
+                )
+            except Exception as e:
+                self.failed_at = time.monotonic()
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning(f"Extracting {self.browser} cookies failed: {e}")
+                return self.jar
+
+            previous, self.jar = self.jar, self.store.put_text(text, cookie_count)
+            if previous is not None and previous is not self.jar:
+                # Requests already using it keep their reference
+                self.store.remove(previous)
+            self.database_path = database_path
+            self.database_mtime = mtime
+            self.extracted_at = time.monotonic()
+            self.failed_at = None
+            self.last_error = None
+            self.last_duration = self.extracted_at - start_time
+            self.extractions += 1
+            logger.info(
+                f"Extracted {cookie_count} cookies from {self.browser} "
+                f"({self.last_duration:.2f}s)"
+            )
+            return self.jar
+
+    def invalidate(self):
+        """Extract again on next use, including after a failure."""
+        self.extracted_at = None
+        self.failed_at = None
+
+    def stats(self) -> dict:
+        """Return cache statistics for monitoring."""
+        age = (
+            time.monotonic() - self.extracted_at
+            if self.extracted_at is not None
+            else None
+        )
+        return {
+            "browser": self.browser,
+            "cached": self.jar is not None,
+            "cookie_count": self.jar.cookie_count if self.jar else 0,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+            "database_tracked": self.database_path is not None,
+            "hits": self.hits,
+            "extractions": self.extractions,
+            "failures": self.failures,
+            "invalidations": self.invalidations,
+            "last_error": self.last_error,
+            "last_duration_seconds": (
+                round(self.last_duration, 3) if self.last_duration is not None else None
+            ),
+        }
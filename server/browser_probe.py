@@ -0,0 +1,79 @@
+import asyncio
+import time
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserCookieProbe:
+    """
+    Cached result of the browser cookie availability check.
+
+    The check spawns a network-touching yt-dlp process, so endpoints read the
+    last known state and a background task refreshes it on an interval.
+    """
+
+    def __init__(
+        self,
+        browser: str,
+        check: Callable[[str], Awaitable[bool]],
+        describe: Optional[Callable[[str], Awaitable[str]]] = None,
+        interval_seconds: float = 300,
+    ):
+        self.browser = browser
+        self.interval_seconds = interval_seconds
+        self._check = check
+        self._describe = describe
+        self._lock = asyncio.Lock()
+        self.is_available = False
+        self.browser_info = ""
+        self.checked_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+
+    async def refresh(self) -> bool:
+        """Run the probe now and update the cached state."""
+        async with self._lock:
+            start_time = time.monotonic()
+            try:
+                is_available = await self._check(self.browser)
+                browser_info = (
+                    await self._describe(self.browser)
+                    if is_available and self._describe
+                    else ""
+                )
+            except Exception as e:
+                logger.warning(f"Browser cookie probe failed: {e}")
+                is_available, browser_info = False, ""
+
+            self.is_available = is_available
+            self.browser_info = browser_info
+            self.checked_at = datetime.now()
+            self.last_duration = time.monotonic() - start_time
+            logger.info(
+                f"Browser {self.browser} cookie probe: "
+                f"{'available' if is_available else 'not available'} "
+                f"({self.last_duration:.2f}s)"
+            )
+            return is_available
+
+    async def run(self):
+        """Refresh the probe until cancelled."""
+        while True:
+            await self.refresh()
+            if self.interval_seconds <= 0:
+                return
+            await asyncio.sleep(self.interval_seconds)
+
+    def snapshot(self) -> dict:
+        """Return the cached probe state."""
+        return {
+            "browser": self.browser,
+            "is_available": self.is_available,
+            "browser_info": self.browser_info,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "last_duration_seconds": (
+                round(self.last_duration, 3) if self.last_duration is not None else None
+            ),
+        }
@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+import logging
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional, responses fall back to gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    The content coding to use for an Accept-Encoding header.
+
+    Brotli is preferred when installed and acceptable, then gzip; codings
+    with q=0 are refused, and ties go to the smaller output.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = [("br", brotli is not None), ("gzip", True)]
+    best, best_quality = None, 0.0
+    for coding, available in candidates:
+        quality = accepted.get(coding, wildcard)
+        if available and quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete JSON responses with brotli or gzip.
+
+    Whether to compress is decided from the response headers alone: only
+    JSON bodies with a Content-Length of at least minimum_size are
+    buffered and compressed, which covers the metadata endpoints. Everything
+    else, including streams and file downloads, passes through untouched
+    as it is sent. Bodies larger than inline_max_size are compressed on a
+    worker thread so they do not stall the event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        inline_max_size: int = 64 * 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        media_types: Tuple[str, ...] = ("application/json",),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.inline_max_size = inline_max_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.media_types = media_types
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        content_length = headers.get("content-length", "")
+        return (
+            content_type in self.media_types
+            and "content-encoding" not in headers
+            and content_length.isdigit()
+            and int(content_length) >= self.minimum_size
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        chunks: List[bytes] = []
+
+        async def send_compressed(message: Message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if not self._eligible(headers):
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                # Hold the headers until the body is complete and compressed
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            start, start_message = start_message, None
+            body = b"".join(chunks)
+            chunks.clear()
+            if len(body) > self.inline_max_size:
+                body = await asyncio.to_thread(self.compress, body, encoding)
+            else:
+                body = self.compress(body, encoding)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
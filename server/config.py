@@ -28,6 +28,9 @@ class Settings(BaseSettings):
         default=None, description="Optional API key for authentication"
     )
     max_requests_per_minute: int = Field(default=100, description="Rate limit per IP")
+    rate_limit_max_clients: int = Field(
+        default=100_000, description="Max client IPs tracked by the rate limiter"
+    )
 
     # Download Configuration
     download_dir: Path = Field(
@@ -36,11 +39,81 @@ class Settings(BaseSettings):
     max_concurrent_downloads: int = Field(
         default=5, description="Max concurrent downloads"
     )
+    download_queue_size: int = Field(
+        default=50, description="Max downloads waiting for a slot before returning 503"
+    )
+    download_queue_per_client: int = Field(
+        default=5, description="Max queued downloads per client IP"
+    )
+    job_retention_seconds: int = Field(
+        default=3600,
+        description="How long finished download jobs and their files are kept",
+    )
+    job_progress_interval_seconds: float = Field(
+        default=0.5, description="Minimum interval between job progress events"
+    )
+    playlist_download_workers: int = Field(
+        default=4, description="Playlist entries downloaded in parallel per playlist"
+    )
+    playlist_entry_retries: int = Field(
+        default=2, description="Retries for a playlist entry that failed to download"
+    )
+    playlist_page_size: int = Field(
+        default=50, description="Playlist entries returned per page by default"
+    )
+    playlist_page_max: int = Field(
+        default=500, description="Largest playlist page a client may request"
+    )
     max_file_size_gb: float = Field(default=5.0, description="Max file size in GB")
+    progressive_streaming: bool = Field(
+        default=True,
+        description="Forward download bytes as they are produced when no postprocessing is needed",
+    )
+    progressive_first_chunk_timeout: float = Field(
+        default=60,
+        description="Seconds a progressive stream may take to produce its first bytes",
+    )
+    stream_chunk_size: int = Field(
+        default=64 * 1024, description="Chunk size for streamed responses in bytes"
+    )
     cleanup_after_days: int = Field(
         default=7, description="Cleanup downloads after days"
     )
 
+    response_compression: bool = Field(
+        default=True, description="Compress large JSON responses with brotli or gzip"
+    )
+    compression_min_bytes: int = Field(
+        default=1024, description="Smallest JSON response body that gets compressed"
+    )
+    compression_inline_max_bytes: int = Field(
+        default=65536,
+        description="Larger JSON bodies are compressed on a worker thread",
+    )
+    server_timing: bool = Field(
+        default=True,
+        description="Send per-request phase timings as a Server-Timing header and log event",
+    )
+    health_refresh_interval_seconds: float = Field(
+        default=5, description="How often health and system metrics are collected"
+    )
+    health_snapshot_ttl_seconds: float = Field(
+        default=15,
+        description="Oldest health snapshot served before it is collected on demand",
+    )
+
+    # Media Cache Configuration
+    media_cache_enabled: bool = Field(
+        default=False, description="Keep finished downloads on disk for repeat requests"
+    )
+    media_cache_dir: Path = Field(
+        default=Path(tempfile.gettempdir()) / "yt-dlp-ui-cache",
+        description="Media cache directory",
+    )
+    media_cache_max_gb: float = Field(
+        default=10.0, description="Media cache size budget in GB"
+    )
+
     # Cookie Configuration
     cookie_dir: Path = Field(
         default=Path(tempfile.gettempdir()), description="Cookie storage directory"
@@ -53,11 +126,30 @@ class Settings(BaseSettings):
         default=False,
         description="Enable automatic browser cookie extraction (can be unreliable on some systems)",
     )
+    browser_probe_interval_seconds: int = Field(
+        default=300,
+        description="How often browser cookie availability is re-checked (0 = only at startup)",
+    )
+    browser_cookie_cache_ttl_seconds: int = Field(
+        default=600,
+        description="How long cookies extracted from the browser are reused before re-reading its database",
+    )
 
     # yt-dlp Configuration
     ytdlp_timeout: int = Field(default=300, description="yt-dlp timeout in seconds")
     ytdlp_retries: int = Field(default=3, description="yt-dlp retry attempts")
     socket_timeout: int = Field(default=30, description="Socket timeout")
+    max_concurrent_extractions: int = Field(
+        default=4, description="Max concurrent metadata extractions"
+    )
+
+    # Metadata Cache Configuration
+    metadata_cache_ttl_seconds: int = Field(
+        default=300, description="How long extracted video metadata is reused"
+    )
+    metadata_cache_max_entries: int = Field(
+        default=256, description="Max number of cached metadata entries"
+    )
 
     # Database Configuration removed - using in-memory storage only
 
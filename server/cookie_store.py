@@ -0,0 +1,225 @@
+import asyncio
+import os
+import time
+import shutil
+import secrets
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from security import create_security_hash
+
+logger = logging.getLogger(__name__)
+
+NETSCAPE_HEADER = (
+    "# Netscape HTTP Cookie File\n"
+    "# This file was generated by renytdlp\n"
+    "# https://github.com/renbkna/renytdlp\n\n"
+)
+
+
+def format_netscape_cookies(cookies: list) -> str:
+    """Render cookies in the Netscape format read by yt-dlp."""
+    lines = [NETSCAPE_HEADER]
+    for cookie in cookies:
+        # Format: domain, subdomain flag, path, secure flag, expiration, name, value
+        domain = cookie.domain
+        if not domain.startswith(".") and not domain.startswith("www."):
+            domain = "." + domain
+
+        # Default expiration to 1 year if not provided
+        expiration = int(cookie.expirationDate or (time.time() + 31536000))
+
+        # TRUE/FALSE for flags
+        secure = "TRUE" if cookie.secure else "FALSE"
+
+        lines.append(
+            f"{domain}\tTRUE\t{cookie.path}\t{secure}\t{expiration}\t{cookie.name}\t{cookie.value}\n"
+        )
+    return "".join(lines)
+
+
+def cookie_content_hash(cookies: list) -> str:
+    """Content address of a cookie set, independent of cookie order."""
+    canonical = "\n".join(
+        sorted(
+            f"{cookie.domain}\t{cookie.path}\t{cookie.name}\t{cookie.value}\t"
+            f"{cookie.secure}\t{cookie.expirationDate}"
+            for cookie in cookies
+        )
+    )
+    return create_security_hash(canonical)
+
+
+class CookieStream:
+    """
+    A cookie jar as the text stream yt-dlp accepts for its cookiefile option.
+
+    Every read starts from the top and writes are dropped, so one stream
+    can be shared by any number of YoutubeDL instances (yt-dlp writes the
+    jar back when an instance closes) and the stored jar never changes.
+    """
+
+    def __init__(self, jar: "CookieJar"):
+        self.jar = jar
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.jar.text.splitlines(keepends=True))
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        return 0
+
+    def write(self, data: str) -> int:
+        return len(data)
+
+    def __repr__(self) -> str:
+        # Options get logged; never let cookie values end up in the logs
+        return f"<CookieStream {self.jar.key[:12]}>"
+
+
+class CookieJar:
+    """An uploaded cookie set, stored once however many requests use it."""
+
+    def __init__(self, key: str, text: str, cookie_count: int, expires_at: float):
+        self.key = key
+        self.text = text
+        self.cookie_count = cookie_count
+        self.expires_at = expires_at
+        self.stream = CookieStream(self)
+
+
+class CookieStore:
+    """
+    Uploaded cookie jars, held in memory and shared between requests.
+
+    Jars are keyed by a hash of their content, so the same cookies uploaded
+    again (or sent inline with every request) map to the same jar. Session
+    tokens let clients upload once and then send only the token. yt-dlp
+    running in this process reads jars from memory; each subprocess that
+    needs a --cookies file gets its own copy, deleted when it exits.
+    """
+
+    def __init__(self, directory: Path, expiry_seconds: float):
+        self.directory = Path(directory)
+        self.expiry_seconds = expiry_seconds
+        self._jars: Dict[str, CookieJar] = {}
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._files: Set[Path] = set()
+        self.jars_created = 0
+        self.jars_reused = 0
+        self.files_written = 0
+
+        # Files are only referenced from memory; anything left is from a previous run
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def put(self, cookies: list) -> CookieJar:
+        """Store a cookie set, or extend the lifetime of the identical stored jar."""
+        return self._put(
+            cookie_content_hash(cookies),
+            lambda: format_netscape_cookies(cookies),
+            len(cookies),
+        )
+
+    def put_text(self, text: str, cookie_count: int) -> CookieJar:
+        """Store a jar that is already in Netscape format, such as a browser export."""
+        return self._put(create_security_hash(text), lambda: text, cookie_count)
+
+    def _put(self, key: str, render: Callable[[], str], cookie_count: int) -> CookieJar:
+        expires_at = time.time() + self.expiry_seconds
+
+        jar = self._jars.get(key)
+        if jar is None:
+            jar = CookieJar(key, render(), cookie_count, expires_at)
+            self._jars[key] = jar
+            self.jars_created += 1
+            logger.info(f"Stored cookie jar {key[:12]} with {cookie_count} cookies")
+        else:
+            jar.expires_at = max(jar.expires_at, expires_at)
+            self.jars_reused += 1
+        return jar
+
+    def remove(self, jar: CookieJar):
+        """Forget a jar; sessions that referred to it stop resolving."""
+        if self._jars.get(jar.key) is jar:
+            del self._jars[jar.key]
+
+    def create_session(self, jar: CookieJar) -> str:
+        """Issue a token that refers to a jar until the jar's current expiry."""
+        token = secrets.token_urlsafe(32)
+        self._sessions[token] = (jar.key, jar.expires_at)
+        return token
+
+    def get_session(self, token: str) -> Optional[CookieJar]:
+        """The jar behind a session token, or None if unknown or expired."""
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        key, expires_at = session
+        if expires_at <= time.time():
+            del self._sessions[token]
+            return None
+        return self._jars.get(key)
+
+    def acquire_file(self, jar: CookieJar) -> Path:
+        """
+        A private 0600 copy of a jar for one subprocess.
+
+        The yt-dlp CLI rewrites its --cookies file in place when it exits, so
+        a file shared between subprocesses could be read half-written. Pass
+        the path to release_file() once the subprocess has exited.
+        """
+        path = self.directory / f"{jar.key[:16]}-{secrets.token_hex(8)}.txt"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(jar.text)
+        self._files.add(path)
+        self.files_written += 1
+        return path
+
+    def release_file(self, path: Path):
+        """Delete a subprocess's cookie file."""
+        self._files.discard(path)
+        path.unlink(missing_ok=True)
+
+    def cleanup_expired(self):
+        """Forget expired sessions and jars, and delete unused cookie files."""
+        now = time.time()
+        for token, (_, expires_at) in list(self._sessions.items()):
+            if expires_at <= now:
+                del self._sessions[token]
+
+        expired: List[CookieJar] = [
+            jar for jar in self._jars.values() if jar.expires_at <= now
+        ]
+        for jar in expired:
+            del self._jars[jar.key]
+        if expired:
+            logger.info(f"Removed {len(expired)} expired cookie jars")
+
+    async def run_cleanup(self, interval: float = 60):
+        """Expire old jars and sessions periodically until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.cleanup_expired()
+            except Exception as e:
+                logger.warning(f"Cookie store cleanup failed: {e}")
+
+    def clear(self):
+        """Forget every jar and session and delete all cookie files."""
+        self._jars.clear()
+        self._sessions.clear()
+        self._files.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> dict:
+        """Return store statistics for monitoring."""
+        return {
+            "jars": len(self._jars),
+            "sessions": len(self._sessions),
+            "cookie_files": len(self._files),
+            "jars_created": self.jars_created,
+            "jars_reused": self.jars_reused,
+            "files_written": self.files_written,
+        }
@@ -0,0 +1,77 @@
+import os
+import shutil
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from starlette.background import BackgroundTask
+from starlette.responses import FileResponse
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadFileResponse(FileResponse):
+    """
+    FileResponse for finished downloads.
+
+    Sets Content-Length, Last-Modified and ETag from the file and honours
+    Range requests. Servers implementing the ASGI pathsend extension send the
+    file zero-copy; elsewhere it is read in worker threads, off the event loop.
+    """
+
+    chunk_size = 256 * 1024
+
+
+def find_downloaded_files(directory: str) -> List[str]:
+    """Non-empty files in a download directory, in a stable order."""
+    downloaded_files = []
+    for file_name in sorted(os.listdir(directory)):
+        full_path = os.path.join(directory, file_name)
+        if os.path.isfile(full_path) and os.path.getsize(full_path) > 0:
+            downloaded_files.append(full_path)
+    return downloaded_files
+
+
+def describe_directory(directory: str) -> List[str]:
+    """List every file in a directory with its size, for error messages."""
+    return [
+        f"{file_name} ({os.path.getsize(os.path.join(directory, file_name))} bytes)"
+        for file_name in sorted(os.listdir(directory))
+        if os.path.isfile(os.path.join(directory, file_name))
+    ]
+
+
+def remove_directory(directory: Optional[str]):
+    """Remove a temporary download directory and everything in it."""
+    if directory and os.path.exists(directory):
+        try:
+            shutil.rmtree(directory)
+            logger.info(f"Cleaned up temp directory: {directory}")
+        except Exception as e:
+            logger.warning(f"Failed to clean up temp directory: {e}")
+
+
+def attachment_header(filename: str) -> str:
+    """Content-Disposition for a download, RFC 5987-encoded for non-ASCII names."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def build_file_response(
+    path: str,
+    download_name: str,
+    content_type: str,
+    headers: Optional[Dict[str, str]] = None,
+    background: Optional[BackgroundTask] = None,
+) -> DownloadFileResponse:
+    """Serve a finished file as an attachment with accurate length and Range support."""
+    return DownloadFileResponse(
+        path,
+        media_type=content_type,
+        filename=download_name,
+        headers=headers,
+        background=background,
+        stat_result=os.stat(path),
+    )
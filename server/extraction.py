@@ -0,0 +1,143 @@
+import asyncio
+import os
+import signal
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def kill_process_tree(process: asyncio.subprocess.Process):
+    """Kill a subprocess started in its own session, with its children, and reap it."""
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+    await process.wait()
+
+
+class ExtractionTimeout(Exception):
+    """Raised when an extraction exceeds its deadline."""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"Extraction timed out after {timeout:.0f} seconds")
+        self.timeout = timeout
+
+
+class ExtractionService:
+    """
+    Runs yt-dlp extractions without blocking the event loop.
+
+    Subprocesses are started with asyncio and killed when they exceed their
+    deadline or the awaiting request is cancelled. In-process extractions run
+    on a dedicated thread pool. Both share one cap on concurrent extractions.
+    """
+
+    def __init__(self, max_concurrent: int = 4, timeout: float = 300):
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="ytdlp-extract"
+        )
+        self.active = 0
+        self.timeouts = 0
+
+    async def run_command(
+        self,
+        cmd: List[str],
+        timeout: Optional[float] = None,
+        check: bool = False,
+    ) -> subprocess.CompletedProcess:
+        """Run a command as an async subprocess, killing it on timeout or cancel."""
+        timeout = self.timeout if timeout is None else timeout
+
+        async with self._semaphore:
+            self.active += 1
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=os.name == "posix",
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(
+                        process.communicate(), timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    await kill_process_tree(process)
+                    logger.warning(f"Killed subprocess after {timeout}s: {cmd[0]}")
+                    raise ExtractionTimeout(timeout)
+                except asyncio.CancelledError:
+                    await kill_process_tree(process)
+                    logger.info(f"Killed subprocess for cancelled request: {cmd[0]}")
+                    raise
+            finally:
+                self.active -= 1
+
+        result = subprocess.CompletedProcess(
+            cmd,
+            process.returncode,
+            stdout.decode("utf-8", "replace"),
+            stderr.decode("utf-8", "replace"),
+        )
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, cmd, result.stdout, result.stderr
+            )
+        return result
+
+    async def run_in_executor(
+        self, func: Callable[[], T], timeout: Optional[float] = None
+    ) -> T:
+        """
+        Run a blocking callable on the extraction pool with a deadline.
+
+        Threads cannot be killed, so on timeout the caller is released while the
+        concurrency slot stays held until the thread actually finishes.
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        await self._semaphore.acquire()
+        self.active += 1
+
+        def _release(_):
+            self.active -= 1
+            self._semaphore.release()
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, func)
+        except BaseException:
+            _release(None)
+            raise
+        future.add_done_callback(_release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ExtractionTimeout(timeout)
+
+    def shutdown(self):
+        """Stop accepting in-process work."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Return extraction statistics for monitoring."""
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "timeout_seconds": self.timeout,
+            "timeouts": self.timeouts,
+        }
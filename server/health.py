@@ -0,0 +1,128 @@
+import asyncio
+import os
+import shutil
+import time
+import logging
+from datetime import datetime
+from typing import Optional
+
+from yt_dlp.version import __version__ as YTDLP_VERSION
+
+try:
+    import psutil
+except ImportError:  # optional, system metrics are reported as None
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Below this much free temp space the server reports itself unhealthy
+MIN_FREE_SPACE_GB = 1
+
+
+class HealthCollector:
+    """
+    Periodic snapshot of server health and system metrics.
+
+    Disk, CPU and memory readings are taken by a background task in a
+    worker thread, so health probes and metrics requests only read the
+    last snapshot. A snapshot older than `ttl_seconds` (the background task
+    stopped or fell behind) is refreshed on demand instead. The yt-dlp
+    version comes from the imported package rather than a subprocess.
+    """
+
+    def __init__(
+        self,
+        temp_dir: str,
+        interval_seconds: float = 5,
+        ttl_seconds: float = 15,
+    ):
+        self.temp_dir = temp_dir
+        self.interval_seconds = interval_seconds
+        self.ttl_seconds = ttl_seconds
+        self.ytdlp_version = YTDLP_VERSION
+        self._lock = asyncio.Lock()
+        self._snapshot: Optional[dict] = None
+        self._collected_at = 0.0
+
+    def collect(self) -> dict:
+        """Take the readings now. Blocking."""
+        start_time = time.monotonic()
+        stat = os.statvfs(self.temp_dir)
+        free_space_gb = (stat.f_frsize * stat.f_bavail) / (1024**3)
+        # The yt-dlp executable runs extractions and downloads
+        ytdlp_healthy = shutil.which("yt-dlp") is not None
+
+        system = {
+            "cpu_percent": None,
+            "memory_percent": None,
+            "memory_used_gb": None,
+            "disk_free_gb": None,
+            "disk_used_percent": None,
+        }
+        if psutil is not None:
+            # Non-blocking: CPU use since the previous collection
+            memory_info = psutil.virtual_memory()
+            disk_info = psutil.disk_usage(self.temp_dir)
+            system = {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_percent": memory_info.percent,
+                "memory_used_gb": round(memory_info.used / (1024**3), 2),
+                "disk_free_gb": round(disk_info.free / (1024**3), 2),
+                "disk_used_percent": round((disk_info.used / disk_info.total) * 100, 1),
+            }
+
+        return {
+            "healthy": ytdlp_healthy and free_space_gb > MIN_FREE_SPACE_GB,
+            "ytdlp_version": self.ytdlp_version,
+            "ytdlp_healthy": ytdlp_healthy,
+            "free_space_gb": round(free_space_gb, 2),
+            "system_metrics": system,
+            "collected_at": datetime.now().isoformat(),
+            "collect_duration_seconds": round(time.monotonic() - start_time, 4),
+        }
+
+    async def refresh(self) -> dict:
+        """Collect a new snapshot now."""
+        async with self._lock:
+            return await self._collect_snapshot()
+
+    async def get(self) -> dict:
+        """The current snapshot, refreshed first if it has gone stale."""
+        if self._is_fresh():
+            return self._snapshot
+        async with self._lock:
+            # A concurrent request may have refreshed it while this one waited
+            if self._is_fresh():
+                return self._snapshot
+            return await self._collect_snapshot()
+
+    async def _collect_snapshot(self) -> dict:
+        try:
+            snapshot = await asyncio.to_thread(self.collect)
+        except Exception as e:
+            logger.warning(f"Health collection failed: {e}")
+            snapshot = {
+                **(self._snapshot or {}),
+                "healthy": False,
+                "ytdlp_version": self.ytdlp_version,
+                "error": str(e),
+                "collected_at": datetime.now().isoformat(),
+            }
+        self._snapshot = snapshot
+        self._collected_at = time.monotonic()
+        return snapshot
+
+    def _is_fresh(self) -> bool:
+        return self._snapshot is not None and self.age() <= self.ttl_seconds
+
+    def age(self) -> float:
+        return time.monotonic() - self._collected_at
+
+    async def run(self):
+        """Refresh the snapshot until cancelled."""
+        if psutil is not None:
+            # Prime the CPU counter so the first reading covers an interval
+            psutil.cpu_percent(interval=None)
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval_seconds)
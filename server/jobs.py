@@ -0,0 +1,251 @@
+import asyncio
+import time
+import uuid
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from yt_dlp.utils import DownloadCancelled
+
+from delivery import remove_directory
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+JOB_TERMINAL_STATUSES = ("finished", "failed", "cancelled")
+
+
+class JobCancelled(DownloadCancelled):
+    """Raised inside a job's worker thread once the job has been cancelled."""
+
+
+async def run_in_thread(func: Callable[[], T], on_cancel: Callable[[], None]) -> T:
+    """
+    Run blocking work in a worker thread that can only stop cooperatively.
+
+    On cancellation the thread cannot be interrupted directly; on_cancel()
+    asks the work to stop (its next progress hook raises), and the caller is
+    only released once the thread has stopped using its files.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, func)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        on_cancel()
+        await asyncio.wait([future])
+        if not future.cancelled():
+            # Mark the thread's DownloadCancelled as seen, we are cancelled anyway
+            future.exception()
+        raise
+
+
+class DownloadJob:
+    """
+    A download running in the background, decoupled from any HTTP connection.
+
+    State is only mutated on the event loop. Worker threads report progress
+    through report(), which is throttled and handed over thread-safely.
+    """
+
+    def __init__(self, client_id: str, progress_interval: float = 0.5):
+        self.id = str(uuid.uuid4())
+        self.client_id = client_id
+        self.status = "queued"
+        self.phase = "queued"
+        self.progress: Dict = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.file_path: Optional[str] = None
+        self.download_name: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.temp_dir: Optional[str] = None
+        self.cancel_requested = False
+        self.task: Optional[asyncio.Task] = None
+        self.ticket = None
+        self.progress_interval = progress_interval
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._last_report = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.status in JOB_TERMINAL_STATUSES
+
+    def update(self, **fields):
+        """Apply a state change and wake up event subscribers (event loop only)."""
+        progress = fields.pop("progress", None)
+        if progress is not None:
+            self.progress = progress
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def check_cancelled(self):
+        """Raise JobCancelled in a worker thread once the job has been cancelled."""
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def report(self, force: bool = False, **fields):
+        """Report progress from a worker thread, at most once per progress_interval."""
+        self.check_cancelled()
+        now = time.monotonic()
+        if not force and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        self._loop.call_soon_threadsafe(lambda: self.update(**fields))
+
+    def snapshot(self) -> dict:
+        """JSON-serialisable view of the job."""
+        queue_position = None
+        if self.ticket is not None and self.ticket.admitted_at is None:
+            queue_position = self.ticket._scheduler.position(self.ticket)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "phase": self.phase,
+            "progress": self.progress,
+            "queue_position": queue_position,
+            "error": self.error,
+            "filename": self.download_name,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    async def updates(self, heartbeat: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield a snapshot now and after every change until the job ends.
+
+        Changes that happen while the consumer is busy are coalesced, so a slow
+        client always gets the latest state rather than a growing backlog.
+        None is yielded when nothing changed for heartbeat seconds.
+        """
+        while True:
+            changed = self._changed
+            yield self.snapshot()
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class JobManager:
+    """
+    Tracks background download jobs and removes them after a retention period.
+
+    Finished artifacts stay on disk until the job expires or is deleted, so
+    clients can fetch (and resume) them independently of the job itself.
+    """
+
+    def __init__(self, retention_seconds: int = 3600, progress_interval: float = 0.5):
+        self.retention_seconds = retention_seconds
+        self.progress_interval = progress_interval
+        self._jobs: Dict[str, DownloadJob] = {}
+        self.completed_total = 0
+        self.failed_total = 0
+        self.cancelled_total = 0
+
+    def create(self, client_id: str) -> DownloadJob:
+        job = DownloadJob(client_id, self.progress_interval)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        return self._jobs.get(job_id)
+
+    def client_jobs(self, client_id: str) -> List[DownloadJob]:
+        return [job for job in self._jobs.values() if job.client_id == client_id]
+
+    def start(self, job: DownloadJob, runner: Callable[[DownloadJob], Awaitable[None]]):
+        """Run a job's coroutine in the background and record how it ended."""
+        job.task = asyncio.create_task(self._run(job, runner))
+
+    async def _run(
+        self, job: DownloadJob, runner: Callable[[DownloadJob], Awaitable[None]]
+    ):
+        try:
+            await runner(job)
+            job.update(status="finished", phase="finished", finished_at=time.time())
+            self.completed_total += 1
+            logger.info(f"Job {job.id} finished: {job.download_name}")
+        except (asyncio.CancelledError, JobCancelled):
+            self._discard_artifact(job)
+            job.update(status="cancelled", finished_at=time.time())
+            self.cancelled_total += 1
+            logger.info(f"Job {job.id} cancelled")
+        except Exception as e:
+            self._discard_artifact(job)
+            job.update(status="failed", error=str(e), finished_at=time.time())
+            self.failed_total += 1
+            logger.error(f"Job {job.id} failed: {e}")
+        finally:
+            if job.ticket is not None:
+                job.ticket.release()
+
+    async def run_blocking(self, job: DownloadJob, func: Callable[[], T]) -> T:
+        """Run blocking yt-dlp work for a job in a worker thread."""
+        return await run_in_thread(func, lambda: setattr(job, "cancel_requested", True))
+
+    async def cancel(self, job: DownloadJob):
+        """Stop a job that is still queued or running."""
+        job.cancel_requested = True
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            await asyncio.wait([job.task])
+
+    async def remove(self, job: DownloadJob):
+        """Cancel a job if needed, then forget it and delete its artifact."""
+        await self.cancel(job)
+        self._discard_artifact(job)
+        self._jobs.pop(job.id, None)
+
+    def _discard_artifact(self, job: DownloadJob):
+        remove_directory(job.temp_dir)
+        job.temp_dir = None
+        job.file_path = None
+
+    async def cleanup_expired(self):
+        """Remove jobs that ended more than retention_seconds ago."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job
+            for job in self._jobs.values()
+            if job.done and job.finished_at and job.finished_at < cutoff
+        ]
+        for job in expired:
+            await self.remove(job)
+        if expired:
+            logger.info(f"Removed {len(expired)} expired download jobs")
+
+    async def run_cleanup(self, interval: float = 60):
+        """Expire old jobs periodically until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.cleanup_expired()
+            except Exception as e:
+                logger.warning(f"Job cleanup failed: {e}")
+
+    async def shutdown(self):
+        """Cancel every job and delete all artifacts."""
+        for job in list(self._jobs.values()):
+            await self.remove(job)
+
+    def stats(self) -> dict:
+        """Return job statistics for monitoring."""
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "jobs": len(self._jobs),
+            "by_status": by_status,
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "cancelled_total": self.cancelled_total,
+            "retention_seconds": self.retention_seconds,
+        }
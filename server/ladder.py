@@ -0,0 +1,189 @@
+from typing import Dict, List, Optional, Tuple
+
+# Codec string prefixes (before the first ".") mapped to codec families
+VIDEO_CODEC_FAMILIES = {
+    "avc1": "h264",
+    "avc3": "h264",
+    "h264": "h264",
+    "hev1": "h265",
+    "hvc1": "h265",
+    "h265": "h265",
+    "hevc": "h265",
+    "vp09": "vp9",
+    "vp9": "vp9",
+    "vp8": "vp8",
+    "av01": "av1",
+    "av1": "av1",
+}
+AUDIO_CODEC_FAMILIES = {
+    "mp4a": "aac",
+    "aac": "aac",
+    "opus": "opus",
+    "vorbis": "vorbis",
+    "mp3": "mp3",
+    "ac-3": "ac3",
+    "ec-3": "eac3",
+    "flac": "flac",
+}
+
+# Families that mux into MP4 together; anything else is merged into WebM
+# when both sides allow it, or Matroska
+MP4_VIDEO = {"h264", "h265", "av1"}
+MP4_AUDIO = {"aac", "ac3", "eac3", "mp3"}
+WEBM_VIDEO = {"vp9", "vp8", "av1"}
+WEBM_AUDIO = {"opus", "vorbis"}
+
+
+def codec_family(codec: Optional[str], families: Dict[str, str]) -> Optional[str]:
+    """Codec family of a yt-dlp codec string; None for "none" or missing."""
+    if not codec or codec == "none":
+        return None
+    prefix = codec.split(".")[0].lower()
+    return families.get(prefix, prefix)
+
+
+def merge_container(video_family: str, audio_family: str) -> str:
+    if video_family in MP4_VIDEO and audio_family in MP4_AUDIO:
+        return "mp4"
+    if video_family in WEBM_VIDEO and audio_family in WEBM_AUDIO:
+        return "webm"
+    return "mkv"
+
+
+def format_size(fmt: dict) -> Optional[int]:
+    return fmt.get("filesize") or fmt.get("filesize_approx")
+
+
+def format_rank(fmt: dict) -> Tuple:
+    """Higher is better: bitrate first, then frame rate, then a known size."""
+    return (
+        fmt.get("tbr") or fmt.get("vbr") or fmt.get("abr") or 0,
+        fmt.get("fps") or 0,
+        format_size(fmt) is not None,
+    )
+
+
+class FormatLadder:
+    """
+    Ranked index of a video's formats, built while they are annotated.
+
+    Tracks the best video-only format per height and codec family, the
+    best progressive (video+audio) format per height, the best audio-only
+    format per codec family, and from those the best merged
+    video+audio pair per height with its estimated size, so clients can
+    pick a format without sorting the whole list. add() also marks each
+    format with needs_merge.
+    """
+
+    def __init__(self):
+        self._video: Dict[int, Dict[str, dict]] = {}
+        self._audio: Dict[str, dict] = {}
+        self._progressive: Dict[int, dict] = {}
+        # Best single-file format without a known height (direct links)
+        self._single: Optional[dict] = None
+
+    def add(self, fmt: dict):
+        video_family = codec_family(fmt.get("vcodec"), VIDEO_CODEC_FAMILIES)
+        audio_family = codec_family(fmt.get("acodec"), AUDIO_CODEC_FAMILIES)
+        height = fmt.get("height")
+
+        video_only = video_family is not None and fmt.get("acodec") == "none"
+        fmt["needs_merge"] = video_only
+
+        if video_only:
+            if height:
+                best = self._video.setdefault(height, {}).get(video_family)
+                if best is None or format_rank(fmt) > format_rank(best):
+                    self._video[height][video_family] = fmt
+        elif video_family is None and audio_family is not None:
+            best = self._audio.get(audio_family)
+            if best is None or format_rank(fmt) > format_rank(best):
+                self._audio[audio_family] = fmt
+        else:
+            # Video with audio in one file, or a format without codec
+            # information (common outside YouTube), which is a single file too
+            self._keep_progressive(height, fmt)
+
+    def _keep_progressive(self, height: Optional[int], fmt: dict):
+        if not height:
+            if self._single is None or format_rank(fmt) > format_rank(self._single):
+                self._single = fmt
+            return
+        best = self._progressive.get(height)
+        if best is None or format_rank(fmt) > format_rank(best):
+            self._progressive[height] = fmt
+
+    def best_progressive(self) -> Optional[dict]:
+        if self._progressive:
+            return self._progressive[max(self._progressive)]
+        return self._single
+
+    def _best_audio_for(self, video_family: str) -> Optional[Tuple[str, dict]]:
+        """Best audio, preferring one that muxes without falling back to mkv."""
+        if not self._audio:
+            return None
+        ranked = sorted(
+            self._audio.items(),
+            key=lambda item: (
+                merge_container(video_family, item[0]) != "mkv",
+                format_rank(item[1]),
+            ),
+            reverse=True,
+        )
+        return ranked[0]
+
+    def merged_pairs(self) -> List[dict]:
+        """Best video-only format per height with its best audio, tallest first."""
+        pairs = []
+        for height in sorted(self._video, reverse=True):
+            video_family, video = max(
+                self._video[height].items(), key=lambda item: format_rank(item[1])
+            )
+            best_audio = self._best_audio_for(video_family)
+            if best_audio is None:
+                continue
+            audio_family, audio = best_audio
+            video_size, audio_size = format_size(video), format_size(audio)
+            pairs.append(
+                {
+                    "height": height,
+                    "format": f"{video['format_id']}+{audio['format_id']}",
+                    "video_format_id": video["format_id"],
+                    "audio_format_id": audio["format_id"],
+                    "vcodec": video_family,
+                    "acodec": audio_family,
+                    "fps": video.get("fps"),
+                    "ext": merge_container(video_family, audio_family),
+                    "filesize_estimate": (
+                        video_size + audio_size if video_size and audio_size else None
+                    ),
+                    "is_premium": bool(video.get("is_premium")),
+                }
+            )
+        return pairs
+
+    def build(self) -> dict:
+        """The ladder as format ids, ready to serialize."""
+        merged = self.merged_pairs()
+        progressive = self.best_progressive()
+        audio_ranked = sorted(self._audio.values(), key=format_rank, reverse=True)
+        return {
+            "heights": sorted(set(self._video) | set(self._progressive), reverse=True),
+            "video": {
+                str(height): {
+                    family: fmt["format_id"] for family, fmt in by_family.items()
+                }
+                for height, by_family in sorted(self._video.items(), reverse=True)
+            },
+            "audio": {family: fmt["format_id"] for family, fmt in self._audio.items()},
+            "progressive": {
+                str(height): fmt["format_id"]
+                for height, fmt in sorted(self._progressive.items(), reverse=True)
+            },
+            "merged": merged,
+            "best": {
+                "merged": merged[0]["format"] if merged else None,
+                "progressive": progressive["format_id"] if progressive else None,
+                "audio": audio_ranked[0]["format_id"] if audio_ranked else None,
+            },
+        }
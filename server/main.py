@@ -8,11 +8,12 @@ from fastapi import (
     UploadFile,
 )
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, HttpUrl, Field, field_validator
-from typing import Optional, List, Dict, Union, Any
+from typing import Optional, List, Dict, Tuple, Union, Any, Awaitable, Callable
 import yt_dlp
 import asyncio
 import uuid
@@ -23,15 +24,67 @@ import re
 import json
 import tempfile
 import subprocess
-import shutil
+import copy
+import threading
 import io
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
 # Import our new secure components
 from config import settings
-from security import RateLimitMiddleware, SecurityValidator, APIKeyAuth
+from security import (
+    RateLimitMiddleware,
+    SecurityValidator,
+    APIKeyAuth,
+    get_client_ip,
+)
+from metadata_cache import MetadataCache
+from extraction import ExtractionService, ExtractionTimeout
+from browser_probe import BrowserCookieProbe
+from browser_cookies import BrowserCookieCache
+from progressive import ProgressiveStream, plan_progressive_stream
+from admission import DownloadScheduler, QueueFullError
+from media_cache import MediaResultCache
+from cookie_store import CookieJar, CookieStore, CookieStream
+from jobs import DownloadJob, JobManager, JOB_TERMINAL_STATUSES, run_in_thread
+from playlist import (
+    ParallelPlaylistDownload,
+    PlaylistArchiveStream,
+    PlaylistEntry,
+    flat_playlist_entries,
+    is_playlist,
+    list_flat_playlist,
+    parse_playlist_cursor,
+    playlist_items_range,
+    playlist_page,
+)
+from zipstream import ZipStreamWriter, unique_arcname, zip_file_chunks
+from compression import CompressionMiddleware
+from ladder import FormatLadder
+from health import HealthCollector
+from timing import ServerTimingMiddleware, current_task_id, current_timer, phase
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    EXTRACTION_FAILURES,
+    EXTRACTION_SECONDS,
+    StreamMetricsMiddleware,
+    postprocessor_timer,
+    registry as metrics_registry,
+)
+from responses import (
+    COMPACT_FORMAT_FIELDS,
+    compact_response,
+    parse_fields,
+    project,
+)
+from delivery import (
+    attachment_header,
+    build_file_response,
+    describe_directory,
+    find_downloaded_files,
+    remove_directory,
+)
 
 # Database import removed - no longer using database
 
@@ -75,6 +128,8 @@ else:
 DEFAULT_BROWSER = settings.default_browser
 COOKIE_DIR = settings.cookie_dir
 COOKIE_EXPIRY_HOURS = settings.cookie_expiry_hours
+PLAYLIST_PAGE_SIZE = settings.playlist_page_size
+PLAYLIST_PAGE_MAX = settings.playlist_page_max
 
 
 @asynccontextmanager
@@ -89,10 +144,23 @@ async def lifespan(app: FastAPI):
     # Server-side task management removed - using direct downloads only
     logger.info("Using direct download mode only")
 
+    # Keep the browser cookie probe fresh off the request path
+    browser_probe_task = asyncio.create_task(browser_probe.run())
+    health_task = asyncio.create_task(health_collector.run())
+    job_cleanup_task = asyncio.create_task(job_manager.run_cleanup())
+    cookie_cleanup_task = asyncio.create_task(cookie_store.run_cleanup())
+
     yield
 
     # Shutdown
     logger.info("YT-DLP API shutting down...")
+    browser_probe_task.cancel()
+    health_task.cancel()
+    job_cleanup_task.cancel()
+    cookie_cleanup_task.cancel()
+    await job_manager.shutdown()
+    cookie_store.clear()
+    extraction_service.shutdown()
     logger.info("YT-DLP API shutdown complete")
 
 
@@ -108,8 +176,17 @@ app = FastAPI(
 app.add_middleware(
     RateLimitMiddleware,
     calls_per_minute=settings.max_requests_per_minute,
+    max_clients=settings.rate_limit_max_clients,
 )
 
+# Metadata responses are large and repetitive JSON; downloads pass through
+if settings.response_compression:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_bytes,
+        inline_max_size=settings.compression_inline_max_bytes,
+    )
+
 # Secure CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -119,6 +196,13 @@ app.add_middleware(
     allow_credentials=True,
 )
 
+# Per-request phase timings as a Server-Timing header and one log event
+if settings.server_timing:
+    app.add_middleware(ServerTimingMiddleware, logger=logger)
+
+# Outermost, so download timings include the time spent in the other middleware
+app.add_middleware(StreamMetricsMiddleware)
+
 # Optional API key authentication
 api_key_auth = APIKeyAuth(settings.api_key)
 
@@ -174,11 +258,18 @@ class DownloadRequest(BaseModel):
     download_playlist: bool = Field(
         default=False, description="Download all videos in playlist"
     )
+    archive: Optional[bool] = Field(
+        default=None,
+        description="Return all files as one ZIP (default: only when there are several)",
+    )
     sponsorblock: bool = Field(default=False, description="Skip sponsored segments")
     use_browser_cookies: bool = Field(default=False, description="Use browser cookies")
     client_cookies: Optional[List[Cookie]] = Field(
         default=None, description="Cookies provided by the client"
     )
+    cookie_session: Optional[str] = Field(
+        default=None, description="Session token returned by /api/cookies"
+    )
     chapters_from_comments: bool = Field(
         default=False, description="Create chapters from comments"
     )
@@ -210,6 +301,14 @@ class VideoInfoRequest(BaseModel):
     url: HttpUrl
     is_playlist: bool = False
     cookies: Optional[List[Cookie]] = None
+    cookie_session: Optional[str] = None
+    cursor: Optional[str] = Field(
+        default=None, description="Playlist page cursor from a previous response"
+    )
+    limit: int = Field(default=PLAYLIST_PAGE_SIZE, ge=1, le=PLAYLIST_PAGE_MAX)
+    fields: Optional[str] = Field(
+        default=None, description="Comma-separated fields to return, or 'all'"
+    )
 
 
 class VideoInfoResponse(BaseModel):
@@ -222,12 +321,17 @@ class VideoInfoResponse(BaseModel):
     upload_date: Optional[str]
     is_playlist: bool
     entries: Optional[List[Dict]] = None
+    next_cursor: Optional[str] = None
+    playlist_count: Optional[int] = None
 
 
 class FormatsResponse(BaseModel):
     is_playlist: bool
     formats: Optional[List[Dict]] = None
     entries: Optional[List[Dict]] = None
+    next_cursor: Optional[str] = None
+    playlist_count: Optional[int] = None
+    ladder: Optional[Dict] = None
 
 
 class FormatsRequest(BaseModel):
@@ -236,111 +340,91 @@ class FormatsRequest(BaseModel):
     url: HttpUrl
     is_playlist: bool = False
     cookies: Optional[List[Cookie]] = None
+    cookie_session: Optional[str] = None
+    cursor: Optional[str] = Field(
+        default=None, description="Playlist page cursor from a previous response"
+    )
+    limit: int = Field(default=PLAYLIST_PAGE_SIZE, ge=1, le=PLAYLIST_PAGE_MAX)
+    fields: Optional[str] = Field(
+        default=None, description="Comma-separated format fields to return, or 'all'"
+    )
 
 
 class BrowserStatusResponse(BaseModel):
     browser: str
     is_available: bool
     message: str
+    checked_at: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    phase: str
+    progress: Dict = {}
+    queue_position: Optional[int] = None
+    error: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events_url: str
+    file_url: str
 
 
 class CookieStatusResponse(BaseModel):
     browser_cookies_available: bool
     client_cookies_supported: bool
     cookie_file_path: Optional[str] = None
+    session_token: Optional[str] = None
+    expires_at: Optional[str] = None
     message: str
 
 
 # Direct download mode only - no server storage needed
 
 
-class CookieManager:
-    """Manages cookie operations including storage and retrieval."""
-
-    def __init__(self):
-        self.cookie_dir = Path(COOKIE_DIR)
-        self.cookie_dir.mkdir(exist_ok=True)
-        self.cookie_expiry = timedelta(hours=COOKIE_EXPIRY_HOURS)
-
-        # Clean up old cookie files on startup
-        self._cleanup_old_cookie_files()
-
-    def _cleanup_old_cookie_files(self):
-        """Remove old cookie files."""
-        try:
-            expiry_time = datetime.now() - self.cookie_expiry
-            count = 0
-            for file in self.cookie_dir.glob("yt_dlp_cookies_*.txt"):
-                if file.stat().st_mtime < expiry_time.timestamp():
-                    file.unlink()
-                    count += 1
-            if count > 0:
-                logger.info(f"Cleaned up {count} expired cookie files")
-        except Exception as e:
-            logger.warning(f"Error cleaning up cookie files: {e}")
-
-    def create_cookie_file(self, cookies: List[Cookie], task_id: str = None) -> Path:
-        """
-        Create a Netscape format cookie file from a list of cookies.
-
-        Args:
-            cookies: List of Cookie objects
-            task_id: Optional task ID to associate with the cookie file
-
-        Returns:
-            Path to the created cookie file
-        """
-        if not cookies:
-            raise ValueError("No cookies provided")
+# Uploaded cookie jars, shared between requests
+cookie_store = CookieStore(
+    Path(COOKIE_DIR) / "yt-dlp-ui-cookies", COOKIE_EXPIRY_HOURS * 3600
+)
 
-        file_id = task_id or str(uuid.uuid4())
-        cookie_file = self.cookie_dir / f"yt_dlp_cookies_{file_id}.txt"
+# Shared metadata cache for the info and formats endpoints
+metadata_cache = MetadataCache(
+    max_entries=settings.metadata_cache_max_entries,
+    ttl_seconds=settings.metadata_cache_ttl_seconds,
+)
 
-        try:
-            with open(cookie_file, "w") as f:
-                f.write("# Netscape HTTP Cookie File\n")
-                f.write("# This file was generated by renytdlp\n")
-                f.write("# https://github.com/renbkna/renytdlp\n\n")
-
-                for cookie in cookies:
-                    # Format: domain, subdomain flag, path, secure flag, expiration, name, value
-                    domain = cookie.domain
-                    if not domain.startswith(".") and not domain.startswith("www."):
-                        domain = "." + domain
-
-                    # Default expiration to 1 year if not provided
-                    expiration = int(cookie.expirationDate or (time.time() + 31536000))
-
-                    # TRUE/FALSE for flags
-                    http_only = "TRUE" if cookie.httpOnly else "FALSE"
-                    secure = "TRUE" if cookie.secure else "FALSE"
-
-                    # Write the cookie line
-                    # domain, include subdomains, path, secure, expiry, name, value
-                    f.write(
-                        f"{domain}\tTRUE\t{cookie.path}\t{secure}\t{expiration}\t{cookie.name}\t{cookie.value}\n"
-                    )
+# Non-blocking extraction service with deadlines and a parallelism cap
+extraction_service = ExtractionService(
+    max_concurrent=settings.max_concurrent_extractions,
+    timeout=settings.ytdlp_timeout,
+)
 
-            logger.info(f"Created cookie file: {cookie_file}")
-            return cookie_file
-        except Exception as e:
-            logger.error(f"Error creating cookie file: {e}")
-            if cookie_file.exists():
-                cookie_file.unlink()
-            raise
+# Admission control for downloads
+download_scheduler = DownloadScheduler(
+    max_active=settings.max_concurrent_downloads,
+    max_queue=settings.download_queue_size,
+    max_queued_per_client=settings.download_queue_per_client,
+)
 
-    def delete_cookie_file(self, cookie_file: Path):
-        """Delete a cookie file."""
-        try:
-            if cookie_file and cookie_file.exists():
-                cookie_file.unlink()
-                logger.info(f"Deleted cookie file: {cookie_file}")
-        except Exception as e:
-            logger.warning(f"Error deleting cookie file {cookie_file}: {e}")
+# Optional on-disk cache of finished downloads
+media_cache = (
+    MediaResultCache(
+        settings.media_cache_dir, int(settings.media_cache_max_gb * 1024**3)
+    )
+    if settings.media_cache_enabled
+    else None
+)
 
+# Background download jobs, kept until retention expires
+job_manager = JobManager(
+    retention_seconds=settings.job_retention_seconds,
+    progress_interval=settings.job_progress_interval_seconds,
+)
 
-# Initialize cookie manager
-cookie_manager = CookieManager()
+# How often handlers check whether the client is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
 
 
 # Enhanced exception handlers
@@ -356,6 +440,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "path": request.url.path,
             "timestamp": datetime.now().isoformat(),
         },
+        headers=getattr(exc, "headers", None),
     )
 
 
@@ -415,7 +500,29 @@ def sanitize_url(url: str, is_playlist: bool) -> str:
     return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
 
 
-def check_browser_available(browser: str = DEFAULT_BROWSER) -> bool:
+async def cancel_on_disconnect(http_request: Request, awaitable):
+    """
+    Await a coroutine, cancelling it if the client disconnects first.
+
+    Cancellation propagates into the extraction service, which kills any
+    yt-dlp subprocess still working for the request.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected from {http_request.url.path}")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def check_browser_available(browser: str = DEFAULT_BROWSER) -> bool:
     """Check if a browser is available for cookie extraction."""
     try:
         # Use direct command execution to test if browser cookies can be extracted
@@ -426,18 +533,12 @@ def check_browser_available(browser: str = DEFAULT_BROWSER) -> bool:
             "--skip-download",
             "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
         ]
-        result = subprocess.run(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5, check=False
-        )
+        result = await extraction_service.run_command(cmd, timeout=5)
 
         # Check if there was an error message about cookies database
-        if result.returncode != 0 or "could not find" in result.stderr.decode(
-            "utf-8", "ignore"
-        ):
+        if result.returncode != 0 or "could not find" in result.stderr:
             # Only log as debug since this is expected on many systems
-            logger.debug(
-                f"Browser {browser} cookies not accessible: {result.stderr.decode('utf-8', 'ignore')}"
-            )
+            logger.debug(f"Browser {browser} cookies not accessible: {result.stderr}")
             return False
         return True
     except Exception as e:
@@ -445,47 +546,121 @@ def check_browser_available(browser: str = DEFAULT_BROWSER) -> bool:
         return False
 
 
-def get_yt_dlp_base_args(
-    use_browser_cookies: bool, client_cookies: List[Cookie] = None, task_id: str = None
-) -> tuple:
+async def get_browser_version(browser: str = DEFAULT_BROWSER) -> str:
+    """Get a version string for the cookie browser, if it can be determined."""
+    try:
+        if browser == "chrome" or browser == "chromium":
+            cmd = ["google-chrome", "--version"]
+            result = await extraction_service.run_command(cmd, timeout=5)
+            if result.returncode == 0:
+                return result.stdout.strip()
+    except Exception:
+        pass
+    return ""
+
+
+# Browser cookie availability, refreshed in the background by the lifespan task
+browser_probe = BrowserCookieProbe(
+    DEFAULT_BROWSER,
+    check_browser_available,
+    get_browser_version,
+    interval_seconds=settings.browser_probe_interval_seconds,
+)
+
+# Disk, CPU and memory readings, collected in the background for health probes
+health_collector = HealthCollector(
+    tempfile.gettempdir(),
+    interval_seconds=settings.health_refresh_interval_seconds,
+    ttl_seconds=settings.health_snapshot_ttl_seconds,
+)
+
+# Browser cookies are decrypted once and shared until stale
+browser_cookie_cache = BrowserCookieCache(
+    DEFAULT_BROWSER, cookie_store, settings.browser_cookie_cache_ttl_seconds
+)
+
+
+def resolve_cookie_jar(
+    cookies: Optional[List[Cookie]] = None, cookie_session: Optional[str] = None
+) -> Optional[CookieJar]:
     """
-    Get base yt-dlp command-line arguments for cookies.
+    The cookie jar for a request: cookies sent inline, or a stored session.
 
-    Args:
-        use_browser_cookies: Whether to use browser cookies
-        client_cookies: Optional client-provided cookies
-        task_id: Task ID for cookie file management
+    Inline cookies are validated and stored content-addressed, so repeating
+    the same cookies reuses the same jar.
+    """
+    if cookies:
+        cookie_dicts = [cookie.dict() for cookie in cookies]
+        validated_cookies = SecurityValidator.validate_cookie_data(cookie_dicts)
+        if validated_cookies:
+            return cookie_store.put([Cookie(**cookie) for cookie in validated_cookies])
+
+    if cookie_session:
+        jar = cookie_store.get_session(cookie_session)
+        if jar is None:
+            raise HTTPException(
+                status_code=401,
+                detail="Cookie session expired or unknown. Please upload cookies again.",
+            )
+        return jar
+
+    return None
 
-    Returns:
-        Tuple of (command args list, cookie file path or None)
+
+async def get_cookie_options(
+    use_browser_cookies: bool, cookie_jar: Optional[CookieJar] = None
+) -> dict:
     """
-    args = []
-    cookie_file = None
+    yt-dlp cookie options for a request.
 
+    Client cookies are read from the stored jar in memory; browser cookies
+    are used as a fallback when requested and available, from the shared
+    browser cookie cache rather than extracted by every yt-dlp instance.
+    """
     # Try client cookies first if provided
-    if client_cookies:
-        try:
-            cookie_file = cookie_manager.create_cookie_file(client_cookies, task_id)
-            logger.info(f"Using client-provided cookies from file: {cookie_file}")
-            args.extend(["--cookies", str(cookie_file)])
-            return args, cookie_file
-        except Exception as e:
-            logger.warning(f"Failed to create cookie file from client cookies: {e}")
+    if cookie_jar is not None:
+        logger.info(
+            f"Using client-provided cookie jar {cookie_jar.key[:12]} "
+            f"({cookie_jar.cookie_count} cookies)"
+        )
+        return {"cookiefile": cookie_jar.stream}
 
     # Fall back to browser cookies if requested and no client cookies were used
     if use_browser_cookies and DEFAULT_BROWSER:
-        if check_browser_available(DEFAULT_BROWSER):
+        if browser_probe.is_available:
+            browser_jar = await browser_cookie_cache.get()
+            if browser_jar is not None:
+                logger.info(f"Using cached cookies from browser: {DEFAULT_BROWSER}")
+                return {"cookiefile": browser_jar.stream}
             logger.info(f"Using cookies from browser: {DEFAULT_BROWSER}")
-            args.extend(["--cookies-from-browser", DEFAULT_BROWSER])
-        else:
-            logger.info(
-                f"Browser cookies requested but {DEFAULT_BROWSER} is not available (this is normal on many systems)"
-            )
+            return {"cookiesfrombrowser": (DEFAULT_BROWSER, None, None, None)}
+        logger.info(
+            f"Browser cookies requested but {DEFAULT_BROWSER} is not available (this is normal on many systems)"
+        )
+
+    return {}
 
-    return args, cookie_file
 
+def acquire_cookie_args(options: dict) -> Tuple[List[str], Optional[Path]]:
+    """
+    Command-line cookie arguments for the cookie options of a yt-dlp call.
 
-def get_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
+    A client jar is passed to the subprocess as its own cookie file; the
+    returned path must be given to cookie_store.release_file() once the
+    subprocess has exited.
+    """
+    cookiefile = options.get("cookiefile")
+    if isinstance(cookiefile, CookieStream):
+        path = cookie_store.acquire_file(cookiefile.jar)
+        return ["--cookies", str(path)], path
+    if cookiefile:
+        return ["--cookies", str(cookiefile)], None
+    if options.get("cookiesfrombrowser"):
+        return ["--cookies-from-browser", options["cookiesfrombrowser"][0]], None
+    return [], None
+
+
+async def get_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
     """Generate yt-dlp options based on download request with premium quality support."""
     chosen_format = request.format
 
@@ -588,25 +763,13 @@ def get_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
         "download_archive": None,  # CRITICAL: Disable download archive completely
     }
 
-    # Get cookie arguments - handle both client and browser cookies
-    cookie_args, cookie_file = get_yt_dlp_base_args(
-        request.use_browser_cookies, request.client_cookies, task_id
-    )
-
-    # Store cookie file path in options for cleanup
-    if cookie_file:
-        options["cookie_file"] = str(cookie_file)
-
-    # Add cookie arguments to yt-dlp options
-    if "--cookies" in cookie_args:
-        options["cookies"] = cookie_args[cookie_args.index("--cookies") + 1]
-    elif "--cookies-from-browser" in cookie_args:
-        options["cookiesfrombrowser"] = (
-            cookie_args[cookie_args.index("--cookies-from-browser") + 1],
-            None,
-            None,
-            None,
+    # Add cookie options - handle both client and browser cookies
+    options.update(
+        await get_cookie_options(
+            request.use_browser_cookies,
+            resolve_cookie_jar(request.client_cookies, request.cookie_session),
         )
+    )
 
     # Extract audio if requested (only if we determined post-processing is needed)
     if extract_audio_postprocessor:
@@ -661,16 +824,51 @@ def format_size(size_bytes: float) -> str:
         return f"{size_bytes / (1024 * 1024 * 1024):.2f}GB"
 
 
-def cleanup_cookie_file(options: dict):
-    """Clean up any cookie file created for the download."""
-    if "cookie_file" in options and options["cookie_file"]:
-        try:
-            cookie_file = Path(options["cookie_file"])
-            if cookie_file.exists():
-                cookie_file.unlink()
-                logger.info(f"Cleaned up cookie file: {cookie_file}")
-        except Exception as e:
-            logger.warning(f"Error cleaning up cookie file: {e}")
+def job_progress_hook(job: DownloadJob):
+    """yt-dlp progress hook that reports download progress to a job."""
+
+    def hook(d: dict):
+        downloaded = d.get("downloaded_bytes") or 0
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        speed = d.get("speed")
+        progress = {
+            "filename": os.path.basename(d.get("filename") or ""),
+            "downloaded_bytes": downloaded,
+            "total_bytes": total,
+            "percent": round(downloaded / total * 100, 1) if total else None,
+            "speed": speed,
+            "speed_text": format_speed(speed) if speed else None,
+            "downloaded_text": format_size(downloaded),
+            "total_text": format_size(total) if total else None,
+            "eta": d.get("eta"),
+            "fragment_index": d.get("fragment_index"),
+            "fragment_count": d.get("fragment_count"),
+        }
+        # Always report the end of a file, throttle the updates in between
+        job.report(
+            force=d.get("status") != "downloading",
+            phase="downloading",
+            progress=progress,
+        )
+
+    return hook
+
+
+def job_postprocessor_hook(job: DownloadJob):
+    """yt-dlp postprocessor hook that reports postprocessing steps to a job."""
+
+    def hook(d: dict):
+        job.report(
+            force=True,
+            phase="postprocessing",
+            progress={
+                **job.progress,
+                "postprocessor": d.get("postprocessor"),
+                "postprocessor_status": d.get("status"),
+            },
+        )
+
+    return hook
 
 
 @app.post("/api/cookies", response_model=CookieStatusResponse)
@@ -683,27 +881,32 @@ async def upload_cookies(cookies: CookieUpload):
         # Validate cookies
         if not cookies.cookies or len(cookies.cookies) == 0:
             return CookieStatusResponse(
-                browser_cookies_available=check_browser_available(DEFAULT_BROWSER),
+                browser_cookies_available=browser_probe.is_available,
                 client_cookies_supported=True,
                 message="No cookies provided",
             )
 
-        # Create a test cookie file to verify
-        test_id = f"test_{uuid.uuid4()}"
-        cookie_file = cookie_manager.create_cookie_file(cookies.cookies, test_id)
-
-        # Clean up test file
-        cookie_manager.delete_cookie_file(cookie_file)
+        # Store the jar once; later requests refer to it by session token
+        jar = resolve_cookie_jar(cookies.cookies)
+        if jar is None:
+            return CookieStatusResponse(
+                browser_cookies_available=browser_probe.is_available,
+                client_cookies_supported=True,
+                message="No valid cookies provided",
+            )
+        token = cookie_store.create_session(jar)
 
         return CookieStatusResponse(
-            browser_cookies_available=check_browser_available(DEFAULT_BROWSER),
+            browser_cookies_available=browser_probe.is_available,
             client_cookies_supported=True,
-            message=f"Successfully processed {len(cookies.cookies)} cookies",
+            session_token=token,
+            expires_at=datetime.fromtimestamp(jar.expires_at).isoformat(),
+            message=f"Successfully processed {jar.cookie_count} cookies",
         )
     except Exception as e:
         logger.error(f"Error processing uploaded cookies: {e}")
         return CookieStatusResponse(
-            browser_cookies_available=check_browser_available(DEFAULT_BROWSER),
+            browser_cookies_available=browser_probe.is_available,
             client_cookies_supported=True,
             message=f"Error processing cookies: {str(e)}",
         )
@@ -754,11 +957,14 @@ def get_content_type(extension: str) -> str:
         "m4a": "audio/mp4",
         "ogg": "audio/ogg",
         "wav": "audio/wav",
+        "zip": "application/zip",
     }
     return content_types.get(extension, "application/octet-stream")
 
 
-def get_streaming_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
+async def get_streaming_ytdlp_options(
+    request: DownloadRequest, task_id: str, cookie_jar: Optional[CookieJar] = None
+) -> dict:
     """Generate yt-dlp options for streaming downloads."""
     chosen_format = request.format
 
@@ -804,6 +1010,7 @@ def get_streaming_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
 
     options = {
         "format": chosen_format,
+        "noplaylist": not request.download_playlist,
         "quiet": False,
         "no_warnings": False,
         "retries": 3,
@@ -820,21 +1027,8 @@ def get_streaming_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
         "download_archive": None,  # CRITICAL: Disable download archive completely
     }
 
-    # Get cookie arguments
-    cookie_args, cookie_file = get_yt_dlp_base_args(
-        request.use_browser_cookies, request.client_cookies, task_id
-    )
-
-    # Add cookie arguments to options
-    if "--cookies" in cookie_args:
-        options["cookies"] = cookie_args[cookie_args.index("--cookies") + 1]
-    elif "--cookies-from-browser" in cookie_args:
-        options["cookiesfrombrowser"] = (
-            cookie_args[cookie_args.index("--cookies-from-browser") + 1],
-            None,
-            None,
-            None,
-        )
+    # Add cookie options
+    options.update(await get_cookie_options(request.use_browser_cookies, cookie_jar))
 
     # Extract audio if requested (only if we determined post-processing is needed)
     if extract_audio_postprocessor:
@@ -849,32 +1043,399 @@ def get_streaming_ytdlp_options(request: DownloadRequest, task_id: str) -> dict:
     return options
 
 
+def load_merge_cookiejar(options: dict, requested_formats: List[dict]):
+    """
+    The YoutubeDL cookiejar ffmpeg needs for a merged selection.
+
+    Loads the request's cookie options, plus the cookies the extractor set
+    during resolution, which yt-dlp only keeps in each format's "cookies".
+    """
+    ydl = yt_dlp.YoutubeDL(
+        {
+            "quiet": True,
+            "no_warnings": True,
+            "cookiefile": options.get("cookiefile"),
+            "cookiesfrombrowser": options.get("cookiesfrombrowser"),
+        }
+    )
+    for fmt in requested_formats:
+        # Same scoped load yt-dlp applies when it computes the format headers
+        ydl._load_cookies(fmt.get("cookies"), autoscope=False)
+    return ydl.cookiejar
+
+
+async def start_progressive_stream(
+    info: dict, options: dict, request: DownloadRequest
+) -> Optional[ProgressiveStream]:
+    """
+    Start a progressive stream for an info dict resolved with the download options.
+
+    Single-file formats are written to stdout by yt-dlp from the already
+    extracted info, merged video+audio selections are muxed by ffmpeg into
+    fragmented MP4 or Matroska. Returns None when a postprocessor needs the
+    finished file (or the selection cannot be piped) so the caller falls back
+    to the temp-file path.
+    """
+    if not settings.progressive_streaming:
+        return None
+    if options["postprocessors"] or request.download_playlist or request.archive:
+        return None
+
+    cookie_args, cookie_file = acquire_cookie_args(options)
+
+    def release_cookie_file():
+        if cookie_file is not None:
+            cookie_store.release_file(cookie_file)
+
+    try:
+        cookiejar = None
+        if info.get("requested_formats"):
+            cookiejar = await asyncio.to_thread(
+                load_merge_cookiejar, options, info["requested_formats"]
+            )
+        plan = plan_progressive_stream(info, cookie_args, cookiejar)
+        if plan is None:
+            release_cookie_file()
+            return None
+
+        stream = ProgressiveStream(
+            plan, chunk_size=settings.stream_chunk_size, on_close=release_cookie_file
+        )
+        await stream.start(timeout=settings.progressive_first_chunk_timeout)
+        logger.info(f"Progressive streaming via {plan.mode} as .{plan.ext}")
+        return stream
+    except Exception as e:
+        release_cookie_file()
+        logger.warning(f"Progressive streaming unavailable, using temp file: {e}")
+        return None
+
+
+def extract_download_info(url: str, options: dict, flat_playlist: bool = False) -> dict:
+    """
+    Resolve a video once, with cookies and format selection applied.
+
+    The download phase reuses this info dict instead of extracting again.
+    With flat_playlist, playlist entries are only listed, not resolved; the
+    playlist engine resolves each one in its own worker.
+    """
+    preflight_options = {
+        **options,
+        "postprocessors": [],
+        "quiet": True,
+        "no_warnings": True,
+    }
+    if flat_playlist:
+        preflight_options["extract_flat"] = "in_playlist"
+    start_time = time.perf_counter()
+    try:
+        with yt_dlp.YoutubeDL(preflight_options) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    except Exception:
+        EXTRACTION_FAILURES.inc(method="api", operation="download")
+        raise
+    EXTRACTION_SECONDS.observe(
+        time.perf_counter() - start_time, method="api", operation="download"
+    )
+    return info
+
+
+def download_info_to_directory(
+    info: dict,
+    options: dict,
+    request: DownloadRequest,
+    temp_dir: str,
+    filename: str,
+    safe_filename: str,
+) -> List[str]:
+    """Download a resolved info dict into temp_dir and return the files written."""
+    # Set output template with proper extension and unique ID to prevent conflicts
+    unique_id = str(uuid.uuid4())[:8]  # 8-character unique ID
+    if request.extract_audio:
+        # For audio extraction, let yt-dlp handle the extension after post-processing
+        output_template = os.path.join(
+            temp_dir, f"{sanitize_filename(filename)}_{unique_id}.%(ext)s"
+        )
+    else:
+        # For video, use the determined extension with unique ID
+        base_name, ext = os.path.splitext(safe_filename)
+        output_template = os.path.join(temp_dir, f"{base_name}_{unique_id}{ext}")
+
+    options = {
+        **options,
+        "outtmpl": output_template,
+        "postprocessor_hooks": [
+            *options.get("postprocessor_hooks", []),
+            postprocessor_timer(),
+        ],
+    }
+
+    logger.info(f"Downloading to: {output_template}")
+    logger.info(f"Options: {options}")
+
+    with yt_dlp.YoutubeDL(options) as ydl:
+        ydl.process_ie_result(copy.deepcopy(info), download=True)
+
+    logger.info(f"Download command completed for temp directory: {temp_dir}")
+
+    # Find the actual downloaded file(s)
+    downloaded_files = find_downloaded_files(temp_dir)
+
+    logger.info(f"Found {len(downloaded_files)} valid downloaded files")
+    for file_path in downloaded_files:
+        logger.info(
+            f"  - {os.path.basename(file_path)}: {os.path.getsize(file_path)} bytes"
+        )
+
+    if not downloaded_files:
+        all_files = describe_directory(temp_dir)
+        logger.error(f"No valid files downloaded. All files in temp dir: {all_files}")
+        raise Exception(f"No valid files were downloaded. Found files: {all_files}")
+
+    return downloaded_files
+
+
+def download_playlist_entry(
+    entry: PlaylistEntry, options: dict, request: DownloadRequest, temp_dir: str
+) -> List[str]:
+    """Resolve and download one playlist entry into its own subdirectory."""
+    entry_dir = os.path.join(temp_dir, f"{entry.index:04d}")
+    # A retry starts over rather than mixing files with the failed attempt
+    remove_directory(entry_dir)
+    os.makedirs(entry_dir)
+
+    info = extract_download_info(entry.url, options)
+    filename = f"{entry.index:03d} - {info.get('title') or entry.title}"
+    ext = get_extension_from_format(
+        request.format, request.extract_audio, request.audio_format
+    )
+    safe_filename = f"{sanitize_filename(filename)}.{ext}"
+    return download_info_to_directory(
+        info, options, request, entry_dir, filename, safe_filename
+    )
+
+
+async def download_playlist_to_directory(
+    info: dict,
+    options: dict,
+    request: DownloadRequest,
+    temp_dir: str,
+    run_blocking: Optional[
+        Callable[[Callable[[], List[str]]], Awaitable[List[str]]]
+    ] = None,
+    on_entry_done: Optional[Callable[[PlaylistEntry, Dict], None]] = None,
+) -> Tuple[List[str], ParallelPlaylistDownload]:
+    """
+    Download the entries of a flat-extracted playlist in parallel.
+
+    The playlist holds a single admission slot; within it up to
+    playlist_download_workers entries download at once, each retried on its
+    own. Returns the files of every entry that succeeded, in playlist order.
+    """
+    entries = flat_playlist_entries(info)
+    if not entries:
+        raise Exception("The playlist has no downloadable entries")
+
+    if run_blocking is None:
+
+        def run_blocking(func):
+            return asyncio.get_running_loop().run_in_executor(None, func)
+
+    entry_options = {**options, "noplaylist": True}
+    download = ParallelPlaylistDownload(
+        entries,
+        lambda entry: run_blocking(
+            lambda: download_playlist_entry(entry, entry_options, request, temp_dir)
+        ),
+        workers=settings.playlist_download_workers,
+        retries=settings.playlist_entry_retries,
+        on_entry_done=on_entry_done,
+    )
+    logger.info(
+        f"Downloading {len(entries)} playlist entries with "
+        f"{min(download.workers, len(entries))} workers"
+    )
+    await download.run()
+    logger.info(
+        f"Playlist download done: {len(download.finished)} finished, "
+        f"{len(download.failed)} failed"
+    )
+    return [path for entry in entries for path in entry.files], download
+
+
+def playlist_headers(download: ParallelPlaylistDownload) -> Dict[str, str]:
+    """Response headers summarising a parallel playlist download."""
+    return {
+        "X-Playlist-Entries": str(len(download.entries)),
+        "X-Playlist-Failed": str(len(download.failed)),
+    }
+
+
+def wants_archive(request: DownloadRequest, downloaded_files: List[str]) -> bool:
+    """Whether a result is served as a ZIP rather than as its first file."""
+    if request.archive is None:
+        return len(downloaded_files) > 1
+    return request.archive
+
+
+def archive_response(
+    chunks, archive_name: str, headers: Dict[str, str], background: BackgroundTask
+) -> StreamingResponse:
+    """Stream a ZIP built on the fly as an attachment."""
+    safe_filename = f"{sanitize_filename(archive_name)}.zip"
+    logger.info(f"Streaming archive {safe_filename}")
+    return StreamingResponse(
+        chunks,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": attachment_header(safe_filename),
+            "X-Stream-Mode": "archive",
+            **headers,
+        },
+        background=background,
+    )
+
+
+async def zip_downloaded_files(downloaded_files: List[str]):
+    """ZIP the files of a finished download, one chunk in memory at a time."""
+    writer = ZipStreamWriter()
+    used_names = set()
+    for path in downloaded_files:
+        arcname = unique_arcname(os.path.basename(path), used_names)
+        async for chunk in zip_file_chunks(
+            writer, path, arcname, settings.stream_chunk_size
+        ):
+            yield chunk
+    yield writer.finish()
+
+
+async def write_archive(downloaded_files: List[str], directory: str) -> str:
+    """ZIP the files of a finished download into a file, deleting the originals."""
+    fd, archive_path = tempfile.mkstemp(suffix=".zip", dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        async for chunk in zip_downloaded_files(downloaded_files):
+            await asyncio.to_thread(f.write, chunk)
+    for path in downloaded_files:
+        os.remove(path)
+    return archive_path
+
+
+async def start_playlist_archive(
+    info: dict, options: dict, request: DownloadRequest, temp_dir: str, ticket
+) -> PlaylistArchiveStream:
+    """Start downloading a playlist in parallel, zipping entries as they finish."""
+    cancelled = threading.Event()
+
+    def abort_if_cancelled(d):
+        if cancelled.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Client disconnected")
+
+    # Keep the hooks already set, such as the request's postprocessor timer
+    entry_options = {
+        **options,
+        "progress_hooks": [*options.get("progress_hooks", []), abort_if_cancelled],
+        "postprocessor_hooks": [
+            *options.get("postprocessor_hooks", []),
+            abort_if_cancelled,
+        ],
+    }
+
+    def run_download(on_entry_done):
+        return download_playlist_to_directory(
+            info,
+            entry_options,
+            request,
+            temp_dir,
+            run_blocking=lambda func: run_in_thread(func, cancelled.set),
+            on_entry_done=on_entry_done,
+        )
+
+    # The slot is released once the upstream work is done, not when the
+    # client has finished reading the archive
+    archive = PlaylistArchiveStream(
+        run_download,
+        temp_dir,
+        chunk_size=settings.stream_chunk_size,
+        on_download_done=ticket.release,
+    )
+    archive.start()
+    return archive
+
+
 @app.post("/api/download/stream")
 async def stream_download(
     request: DownloadRequest,
+    http_request: Request,
     auth: Optional[str] = Depends(api_key_auth),
 ):
     """Stream download directly to user without server storage."""
     # Enhanced security validation
-    validated_url = SecurityValidator.validate_url(str(request.url))
+    with phase("validation"):
+        validated_url = SecurityValidator.validate_url(str(request.url))
 
-    # Validate cookies if provided
-    if request.client_cookies:
-        cookie_dicts = [cookie.dict() for cookie in request.client_cookies]
-        validated_cookies = SecurityValidator.validate_cookie_data(cookie_dicts)
-        request.client_cookies = [Cookie(**cookie) for cookie in validated_cookies]
-
-    task_id = str(uuid.uuid4())
+    task_id = current_task_id()
     logger.info(f"Starting streaming download {task_id} for URL: {validated_url}")
 
-    # Get yt-dlp options for streaming
-    options = get_streaming_ytdlp_options(request, task_id)
+    # Validate cookies if provided, and get yt-dlp options for streaming
+    with phase("cookies"):
+        cookie_jar = resolve_cookie_jar(request.client_cookies, request.cookie_session)
+        options = await get_streaming_ytdlp_options(request, task_id, cookie_jar)
+
+    # Serve repeat requests for the same video and options straight from disk.
+    # Results fetched with any cookies (client or browser) may be private and
+    # are never cached.
+    uses_cookies = bool(options.get("cookiefile") or options.get("cookiesfrombrowser"))
+    cache_key = None
+    if media_cache is not None and not uses_cookies and not request.download_playlist:
+        cache_key = media_cache.make_key(
+            sanitize_url(validated_url, request.download_playlist), options
+        )
+        entry = media_cache.acquire(cache_key)
+        # Concurrent misses wait for the one request that claimed the key
+        while entry is None and not media_cache.claim(cache_key):
+            with phase("cache"):
+                await media_cache.wait(cache_key)
+            entry = media_cache.acquire(cache_key)
+        if entry is not None:
+            logger.info(f"Media cache hit for {validated_url}")
+            return build_file_response(
+                str(entry.path),
+                entry.download_name,
+                entry.content_type,
+                headers={"X-Cache": "HIT"},
+                background=BackgroundTask(media_cache.release, cache_key),
+            )
+
+    # Wait for a download slot; a full queue is rejected right away
+    try:
+        with phase("queue"):
+            ticket = await acquire_download_slot(http_request)
+    except BaseException:
+        if cache_key:
+            media_cache.finish(cache_key)
+        raise
+    queue_headers = {"X-Queue-Wait": f"{ticket.wait_time:.3f}"}
+    if cache_key:
+        queue_headers["X-Cache"] = "MISS"
+
+    # Time each postprocessor of this request; added after the cache key
+    # was derived from the options
+    timer = current_timer()
+    if timer is not None:
+        options = {
+            **options,
+            "postprocessor_hooks": [
+                *options.get("postprocessor_hooks", []),
+                timer.postprocessor_hook(),
+            ],
+        }
 
-    # Get video info first to determine filename and content type
     try:
-        with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
-            info = await asyncio.get_running_loop().run_in_executor(
-                None, lambda: ydl.extract_info(str(validated_url), download=False)
+        # Shares the extraction cap and deadline with the metadata endpoints
+        with phase("extraction"):
+            info = await extraction_service.run_in_executor(
+                lambda: extract_download_info(
+                    str(validated_url), options, request.download_playlist
+                )
             )
 
         # Determine filename and content type based on format
@@ -887,217 +1448,395 @@ async def stream_download(
 
         logger.info(f"Streaming {safe_filename} as {content_type}")
 
-        # Create streaming generator
-        async def download_generator():
-            temp_dir = None
-            try:
-                # Create temporary directory for download
-                temp_dir = tempfile.mkdtemp()
-
-                # Set output template with proper extension
-                if request.extract_audio:
-                    # For audio extraction, let yt-dlp handle the extension after post-processing
-                    output_template = os.path.join(
-                        temp_dir, f"{sanitize_filename(filename)}.%(ext)s"
+        # Forward bytes as yt-dlp/ffmpeg produce them when nothing needs the
+        # finished file; cacheable results take the temp-file path to be published
+        with phase("download"):
+            progressive = (
+                None
+                if cache_key
+                else await start_progressive_stream(info, options, request)
+            )
+        if progressive:
+            ext = progressive.plan.ext
+            safe_filename = f"{sanitize_filename(filename)}.{ext}"
+            content_type = get_content_type(ext)
+
+            async def progressive_generator():
+                try:
+                    async for chunk in progressive.iter_chunks():
+                        yield chunk
+                finally:
+                    ticket.release()
+
+            async def progressive_cleanup():
+                await progressive.close()
+                ticket.release()
+
+            return StreamingResponse(
+                progressive_generator(),
+                media_type=content_type,
+                headers={
+                    "Content-Disposition": attachment_header(safe_filename),
+                    "Content-Type": content_type,
+                    "X-Stream-Mode": progressive.plan.mode,
+                    **queue_headers,
+                },
+                background=BackgroundTask(progressive_cleanup),
+            )
+
+        # Playlists are zipped entry by entry while the rest still download
+        if is_playlist(info) and request.archive is not False:
+            archive = await start_playlist_archive(
+                info,
+                options,
+                request,
+                tempfile.mkdtemp(prefix=f"ytdlp_stream_{task_id}_"),
+                ticket,
+            )
+            return archive_response(
+                archive.iter_chunks(),
+                filename,
+                {
+                    "X-Playlist-Entries": str(len(flat_playlist_entries(info))),
+                    **queue_headers,
+                },
+                BackgroundTask(archive.close),
+            )
+
+        # Fall back to downloading into a temp directory, then serve the
+        # finished file with an accurate length and Range support
+        temp_dir = (
+            media_cache.staging_dir(prefix=f"ytdlp_stream_{task_id}_")
+            if cache_key
+            else tempfile.mkdtemp(prefix=f"ytdlp_stream_{task_id}_")
+        )
+        try:
+            # Includes postprocessing, which is also timed per postprocessor
+            with phase("download"):
+                if is_playlist(info):
+                    downloaded_files, playlist_download = (
+                        await download_playlist_to_directory(
+                            info, options, request, temp_dir
+                        )
                     )
+                    queue_headers.update(playlist_headers(playlist_download))
                 else:
-                    # For video, use the determined extension
-                    output_template = os.path.join(temp_dir, safe_filename)
+                    downloaded_files = await asyncio.get_running_loop().run_in_executor(
+                        None,
+                        download_info_to_directory,
+                        info,
+                        options,
+                        request,
+                        temp_dir,
+                        filename,
+                        safe_filename,
+                    )
+        except BaseException:
+            remove_directory(temp_dir)
+            raise
 
-                options["outtmpl"] = output_template
+        # The upstream work is done, let the next queued download start
+        ticket.release()
 
-                logger.info(f"Downloading to: {output_template}")
-                logger.info(f"Options: {options}")
+        if wants_archive(request, downloaded_files):
+            return archive_response(
+                zip_downloaded_files(downloaded_files),
+                filename,
+                queue_headers,
+                BackgroundTask(remove_directory, temp_dir),
+            )
 
-                with yt_dlp.YoutubeDL(options) as ydl:
-                    await asyncio.get_running_loop().run_in_executor(
-                        None, lambda: ydl.download([str(validated_url)])
-                    )
+        # Use the first (and usually only) downloaded file
+        download_path = downloaded_files[0]
+        actual_ext = os.path.splitext(download_path)[1][1:]  # Remove the dot
+        if actual_ext:
+            safe_filename = f"{sanitize_filename(filename)}.{actual_ext}"
+            content_type = get_content_type(actual_ext)
 
-                # Find the actual downloaded file(s)
-                downloaded_files = []
-                for file_path in os.listdir(temp_dir):
-                    full_path = os.path.join(temp_dir, file_path)
-                    if os.path.isfile(full_path) and os.path.getsize(full_path) > 0:
-                        downloaded_files.append(full_path)
+        logger.info(
+            f"Serving {os.path.basename(download_path)} ({os.path.getsize(download_path)} bytes) as {safe_filename}"
+        )
 
-                if not downloaded_files:
-                    raise Exception("No valid files were downloaded")
+        if cache_key:
+            entry = media_cache.publish(
+                cache_key, download_path, safe_filename, content_type
+            )
 
-                # Use the first (and usually only) downloaded file
-                download_path = downloaded_files[0]
-                actual_filename = os.path.basename(download_path)
+            def release_cached_download():
+                media_cache.release(cache_key)
+                remove_directory(temp_dir)
 
-                logger.info(
-                    f"Found downloaded file: {actual_filename} ({os.path.getsize(download_path)} bytes)"
-                )
+            return build_file_response(
+                str(entry.path),
+                entry.download_name,
+                entry.content_type,
+                headers=queue_headers,
+                background=BackgroundTask(release_cached_download),
+            )
 
-                # Update filename and content type based on actual file
-                actual_ext = os.path.splitext(actual_filename)[1][1:]  # Remove the dot
-                if actual_ext:
-                    content_type = get_content_type(actual_ext)
+        return build_file_response(
+            download_path,
+            safe_filename,
+            content_type,
+            headers=queue_headers,
+            background=BackgroundTask(remove_directory, temp_dir),
+        )
 
-                # Stream the file back
-                with open(download_path, "rb") as f:
-                    while chunk := f.read(8192):  # 8KB chunks
-                        yield chunk
+    except ExtractionTimeout as e:
+        ticket.release()
+        EXTRACTION_FAILURES.inc(method="api", operation="download")
+        logger.warning(f"Extraction for streaming download {task_id} timed out: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        ticket.release()
+        logger.exception(f"Error in streaming download {task_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
+    except BaseException:
+        ticket.release()
+        raise
+    finally:
+        # Published or not, let requests waiting on this key go ahead
+        if cache_key:
+            media_cache.finish(cache_key)
+
+
+def queue_full_error(client_id: str, e: QueueFullError) -> HTTPException:
+    """503 response for a download rejected by the admission queue."""
+    logger.warning(f"Rejected download for {client_id}: {e}")
+    return HTTPException(
+        status_code=503,
+        detail=f"{e}. Please retry later.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-            except Exception as e:
-                logger.error(f"Error in download generator: {e}")
-                error_msg = f"Download failed: {str(e)}"
-                yield error_msg.encode("utf-8")
-            finally:
-                # Clean up temp directory and all files
-                if temp_dir and os.path.exists(temp_dir):
-                    try:
-                        shutil.rmtree(temp_dir)
-                        logger.info(f"Cleaned up temp directory: {temp_dir}")
-                    except Exception as e:
-                        logger.warning(f"Failed to clean up temp directory: {e}")
-
-        # We need to determine the actual filename after download, so let's create a wrapper
-        actual_filename = safe_filename
-        actual_content_type = content_type
-
-        async def filename_aware_generator():
-            nonlocal actual_filename, actual_content_type
-            temp_dir = None
-            try:
-                # Create unique temporary directory for download
-                temp_dir = tempfile.mkdtemp(prefix=f"ytdlp_stream_{task_id}_")
-
-                # Set output template with proper extension and unique ID to prevent conflicts
-                unique_id = str(uuid.uuid4())[:8]  # 8-character unique ID
-                if request.extract_audio:
-                    # For audio extraction, let yt-dlp handle the extension after post-processing
-                    output_template = os.path.join(
-                        temp_dir, f"{sanitize_filename(filename)}_{unique_id}.%(ext)s"
-                    )
-                else:
-                    # For video, use the determined extension with unique ID
-                    base_name, ext = os.path.splitext(safe_filename)
-                    output_template = os.path.join(
-                        temp_dir, f"{base_name}_{unique_id}{ext}"
-                    )
 
-                options["outtmpl"] = output_template
+async def acquire_download_slot(http_request: Request):
+    """Wait in the admission queue for a download slot, or fail fast with 503."""
+    client_id = get_client_ip(http_request)
+    try:
+        ticket = await cancel_on_disconnect(
+            http_request, download_scheduler.acquire(client_id)
+        )
+    except QueueFullError as e:
+        raise queue_full_error(client_id, e)
 
-                logger.info(f"Downloading to: {output_template}")
-                logger.info(f"Options: {options}")
+    if ticket.wait_time > 0.1:
+        logger.info(f"Download admitted for {client_id} after {ticket.wait_time:.2f}s")
+    return ticket
 
-                with yt_dlp.YoutubeDL(options) as ydl:
-                    await asyncio.get_running_loop().run_in_executor(
-                        None, lambda: ydl.download([str(validated_url)])
-                    )
 
-                logger.info(
-                    f"Download command completed for temp directory: {temp_dir}"
-                )
+async def run_download_job(
+    job: DownloadJob,
+    request: DownloadRequest,
+    validated_url: str,
+    cookie_jar: Optional[CookieJar] = None,
+):
+    """Wait for a download slot, then resolve and download into the job's directory."""
+    await job.ticket.wait()
+    job.update(status="running", phase="extracting", started_at=time.time())
 
-                # Find the actual downloaded file(s)
-                downloaded_files = []
-                for file_path in os.listdir(temp_dir):
-                    full_path = os.path.join(temp_dir, file_path)
-                    if os.path.isfile(full_path) and os.path.getsize(full_path) > 0:
-                        downloaded_files.append(full_path)
-
-                logger.info(f"Found {len(downloaded_files)} valid downloaded files")
-                for file_path in downloaded_files:
-                    logger.info(
-                        f"  - {os.path.basename(file_path)}: {os.path.getsize(file_path)} bytes"
-                    )
+    options = await get_streaming_ytdlp_options(request, job.id, cookie_jar)
+    try:
+        # Shares the extraction cap and deadline with the streaming download
+        info = await extraction_service.run_in_executor(
+            lambda: extract_download_info(
+                validated_url, options, request.download_playlist
+            )
+        )
+    except ExtractionTimeout as e:
+        # The job fails with the same message the streaming endpoint's 504 carries
+        EXTRACTION_FAILURES.inc(method="api", operation="download")
+        logger.warning(f"Extraction for job {job.id} timed out: {e}")
+        raise
 
-                if not downloaded_files:
-                    # List all files in directory for debugging
-                    all_files = []
-                    for file_path in os.listdir(temp_dir):
-                        full_path = os.path.join(temp_dir, file_path)
-                        if os.path.isfile(full_path):
-                            all_files.append(
-                                f"{file_path} ({os.path.getsize(full_path)} bytes)"
-                            )
-
-                    logger.error(
-                        f"No valid files downloaded. All files in temp dir: {all_files}"
-                    )
-                    raise Exception(
-                        f"No valid files were downloaded. Found files: {all_files}"
-                    )
+    filename = info.get("title", "download")
+    ext = get_extension_from_format(
+        request.format, request.extract_audio, request.audio_format
+    )
+    safe_filename = f"{sanitize_filename(filename)}.{ext}"
+    job.update(phase="downloading", download_name=safe_filename)
+
+    job.temp_dir = tempfile.mkdtemp(prefix=f"ytdlp_job_{job.id}_")
+    if is_playlist(info):
+        # Entries download concurrently, so progress is counted per entry;
+        # the hooks only let a cancelled job stop every worker
+        playlist_options = {
+            **options,
+            "progress_hooks": [lambda d: job.check_cancelled()],
+            "postprocessor_hooks": [lambda d: job.check_cancelled()],
+        }
+        downloaded_files, _ = await download_playlist_to_directory(
+            info,
+            playlist_options,
+            request,
+            job.temp_dir,
+            run_blocking=lambda func: job_manager.run_blocking(job, func),
+            on_entry_done=lambda entry, progress: job.update(progress=progress),
+        )
+    else:
+        job_options = {
+            **options,
+            "progress_hooks": [job_progress_hook(job)],
+            "postprocessor_hooks": [job_postprocessor_hook(job)],
+        }
+        downloaded_files = await job_manager.run_blocking(
+            job,
+            lambda: download_info_to_directory(
+                info, job_options, request, job.temp_dir, filename, safe_filename
+            ),
+        )
 
-                # Use the first (and usually only) downloaded file
-                download_path = downloaded_files[0]
-                actual_filename = os.path.basename(download_path)
+    if wants_archive(request, downloaded_files):
+        # Served as one file with Range support, like any other job result
+        job.update(phase="archiving")
+        download_path = await write_archive(downloaded_files, job.temp_dir)
+    else:
+        # Use the first (and usually only) downloaded file
+        download_path = downloaded_files[0]
+    actual_ext = os.path.splitext(download_path)[1][1:] or ext
+    job.update(
+        file_path=download_path,
+        download_name=f"{sanitize_filename(filename)}.{actual_ext}",
+        content_type=get_content_type(actual_ext),
+    )
 
-                logger.info(
-                    f"Found downloaded file: {actual_filename} ({os.path.getsize(download_path)} bytes)"
-                )
 
-                # Update content type based on actual file
-                actual_ext = os.path.splitext(actual_filename)[1][1:]  # Remove the dot
-                if actual_ext:
-                    actual_content_type = get_content_type(actual_ext)
+def get_job_or_404(job_id: str) -> DownloadJob:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
 
-                # Stream the file back
-                with open(download_path, "rb") as f:
-                    while chunk := f.read(8192):  # 8KB chunks
-                        yield chunk
 
-            except Exception as e:
-                logger.error(f"Error in download: {e}")
-                error_msg = f"Download failed: {str(e)}"
-                yield error_msg.encode("utf-8")
-            finally:
-                # Clean up temp directory and all files
-                if temp_dir and os.path.exists(temp_dir):
-                    try:
-                        shutil.rmtree(temp_dir)
-                        logger.info(f"Cleaned up temp directory: {temp_dir}")
-                    except Exception as e:
-                        logger.warning(f"Failed to clean up temp directory: {e}")
-
-        return StreamingResponse(
-            filename_aware_generator(),
-            media_type=actual_content_type,
-            headers={
-                "Content-Disposition": f'attachment; filename="{actual_filename}"',
-                "Content-Type": actual_content_type,
-            },
-        )
+def job_response(job: DownloadJob) -> JobResponse:
+    return JobResponse(
+        **job.snapshot(),
+        events_url=f"/api/jobs/{job.id}/events",
+        file_url=f"/api/jobs/{job.id}/file",
+    )
 
-    except Exception as e:
-        logger.exception(f"Error in streaming download {task_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+async def create_download_job(
+    request: DownloadRequest,
+    http_request: Request,
+    auth: Optional[str] = Depends(api_key_auth),
+):
+    """
+    Start a download in the background and return its job id right away.
 
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint for monitoring."""
-    # Check disk space (temp directory for streaming)
-    temp_dir = Path(tempfile.gettempdir())
-    download_dir_stat = os.statvfs(temp_dir)
-    free_space_gb = (download_dir_stat.f_frsize * download_dir_stat.f_bavail) / (
-        1024**3
-    )
+    Progress is available from the events endpoint, the finished file from
+    the file endpoint, independent of how long the upstream fetch takes.
+    """
+    validated_url = SecurityValidator.validate_url(str(request.url))
+
+    cookie_jar = resolve_cookie_jar(request.client_cookies, request.cookie_session)
 
-    # Check if yt-dlp is working
-    ytdlp_healthy = True
+    # Jobs share the admission queue with direct downloads; reject up front if full
+    client_id = get_client_ip(http_request)
     try:
-        result = subprocess.run(
-            ["yt-dlp", "--version"], capture_output=True, text=True, timeout=5
+        ticket = download_scheduler.enqueue(client_id)
+    except QueueFullError as e:
+        raise queue_full_error(client_id, e)
+
+    job = job_manager.create(client_id)
+    job.ticket = ticket
+    job_manager.start(
+        job, lambda job: run_download_job(job, request, validated_url, cookie_jar)
+    )
+    logger.info(f"Created download job {job.id} for URL: {validated_url}")
+    return job_response(job)
+
+
+@app.get("/api/jobs", response_model=List[JobResponse])
+async def list_download_jobs(http_request: Request):
+    """List the caller's download jobs."""
+    return [
+        job_response(job)
+        for job in job_manager.client_jobs(get_client_ip(http_request))
+    ]
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_download_job(job_id: str):
+    """Get the current state of a download job."""
+    return job_response(get_job_or_404(job_id))
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def get_download_job_events(job_id: str):
+    """
+    Server-Sent Events stream of a job's progress.
+
+    Sends a "progress" event on every change (coalesced for slow readers)
+    and a final "done" event once the job has finished, failed or been
+    cancelled.
+    """
+    job = get_job_or_404(job_id)
+
+    async def event_stream():
+        async for snapshot in job.updates():
+            if snapshot is None:
+                # Keep proxies from timing out an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            event = (
+                "done" if snapshot["status"] in JOB_TERMINAL_STATUSES else "progress"
+            )
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/jobs/{job_id}/file")
+async def get_download_job_file(job_id: str):
+    """Download the finished file of a job, with Range support."""
+    job = get_job_or_404(job_id)
+    if job.status != "finished" or not job.file_path:
+        raise HTTPException(
+            status_code=409, detail=f"Job is {job.status}, no file available"
         )
-        ytdlp_version = result.stdout.strip() if result.returncode == 0 else "unknown"
-    except Exception:
-        ytdlp_healthy = False
-        ytdlp_version = "error"
+    return build_file_response(job.file_path, job.download_name, job.content_type)
+
+
+@app.delete("/api/jobs/{job_id}", response_model=JobResponse)
+async def delete_download_job(job_id: str, auth: Optional[str] = Depends(api_key_auth)):
+    """Cancel a job if it is still running and delete it with its file."""
+    job = get_job_or_404(job_id)
+    await job_manager.remove(job)
+    return job_response(job)
+
+
+@app.get("/api/queue")
+async def get_queue_status(http_request: Request):
+    """Get download queue status and the caller's queued positions."""
+    return {
+        **download_scheduler.stats(),
+        "your_positions": download_scheduler.client_positions(
+            get_client_ip(http_request)
+        ),
+        "retry_after_seconds": download_scheduler.retry_after(),
+    }
+
+
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint for monitoring, served from the collected snapshot."""
+    snapshot = await health_collector.get()
 
     health_status = {
-        "status": "healthy" if ytdlp_healthy and free_space_gb > 1 else "unhealthy",
+        "status": "healthy" if snapshot["healthy"] else "unhealthy",
         "timestamp": datetime.now().isoformat(),
         "version": "1.0.1",
         "mode": "direct_download_only",
-        "ytdlp_version": ytdlp_version,
-        "ytdlp_healthy": ytdlp_healthy,
-        "free_space_gb": round(free_space_gb, 2),
+        "ytdlp_version": snapshot["ytdlp_version"],
+        "ytdlp_healthy": snapshot.get("ytdlp_healthy", False),
+        "free_space_gb": snapshot.get("free_space_gb"),
+        "collected_at": snapshot["collected_at"],
         "config": {
             "max_requests_per_minute": settings.max_requests_per_minute,
             "default_browser": settings.default_browser,
@@ -1111,35 +1850,24 @@ async def health_check():
 @app.get("/api/metrics")
 async def get_metrics():
     """Get application metrics for monitoring."""
-    # Get system info
-    try:
-        import psutil
-
-        cpu_percent = psutil.cpu_percent()
-        memory_info = psutil.virtual_memory()
-        disk_info = psutil.disk_usage(tempfile.gettempdir())
-    except ImportError:
-        # Fallback if psutil not available
-        cpu_percent = None
-        memory_info = None
-        disk_info = None
+    # System readings come from the background health snapshot
+    snapshot = await health_collector.get()
 
     metrics = {
         "timestamp": datetime.now().isoformat(),
         "mode": "direct_download_only",
         "system_metrics": {
-            "cpu_percent": cpu_percent,
-            "memory_percent": memory_info.percent if memory_info else None,
-            "memory_used_gb": (
-                round(memory_info.used / (1024**3), 2) if memory_info else None
-            ),
-            "disk_free_gb": round(disk_info.free / (1024**3), 2) if disk_info else None,
-            "disk_used_percent": (
-                round((disk_info.used / disk_info.total) * 100, 1)
-                if disk_info
-                else None
-            ),
+            **snapshot.get("system_metrics", {}),
+            "collected_at": snapshot["collected_at"],
         },
+        "download_queue": download_scheduler.stats(),
+        "metadata_cache": metadata_cache.stats(),
+        "media_cache": media_cache.stats() if media_cache else None,
+        "jobs": job_manager.stats(),
+        "cookie_store": cookie_store.stats(),
+        "browser_probe": browser_probe.snapshot(),
+        "browser_cookies": browser_cookie_cache.stats(),
+        "extraction": extraction_service.stats(),
         "configuration": {
             "max_requests_per_minute": settings.max_requests_per_minute,
             "max_file_size_gb": settings.max_file_size_gb,
@@ -1150,6 +1878,62 @@ async def get_metrics():
     return metrics
 
 
+# Application state read by the Prometheus endpoint at scrape time
+metrics_registry.gauge_callback(
+    "ytdlp_download_queue_depth",
+    "Downloads waiting for a slot",
+    lambda: download_scheduler.stats()["queue_depth"],
+)
+metrics_registry.gauge_callback(
+    "ytdlp_downloads_active",
+    "Downloads holding a slot",
+    lambda: download_scheduler.active,
+)
+metrics_registry.counter_callback(
+    "ytdlp_download_queue_rejections",
+    "Downloads rejected because the queue was full",
+    lambda: download_scheduler.rejected_total,
+)
+metrics_registry.gauge_callback(
+    "ytdlp_extractions_active",
+    "Metadata extractions running",
+    lambda: extraction_service.active,
+)
+metrics_registry.counter_callback(
+    "ytdlp_extraction_timeouts",
+    "Extractions killed or abandoned at their deadline",
+    lambda: extraction_service.timeouts,
+)
+metrics_registry.gauge_callback(
+    "ytdlp_cookie_files",
+    "Cookie files currently held by yt-dlp subprocesses",
+    lambda: cookie_store.stats()["cookie_files"],
+)
+metrics_registry.gauge_callback(
+    "ytdlp_cookie_jars",
+    "Cookie jars held in memory",
+    lambda: cookie_store.stats()["jars"],
+)
+metrics_registry.gauge_callback(
+    "ytdlp_jobs",
+    "Download jobs by status",
+    lambda: job_manager.stats()["by_status"],
+    labelnames=("status",),
+)
+metrics_registry.counter_callback(
+    "ytdlp_metadata_cache_requests",
+    "Metadata cache lookups by result",
+    lambda: {"hit": metadata_cache.hits, "miss": metadata_cache.misses},
+    labelnames=("result",),
+)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Application metrics in the Prometheus text exposition format."""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # History endpoint removed - database no longer available
 
 
@@ -1163,19 +1947,36 @@ async def get_metrics():
 
 
 @app.post("/api/info", response_model=VideoInfoResponse)
-async def get_video_info_with_cookies(request: VideoInfoRequest):
+async def get_video_info_with_cookies(request: VideoInfoRequest, http_request: Request):
     """
     Get information about a video or playlist with cookies provided directly in the request body.
     This is an alternative POST endpoint to the GET /api/info that allows direct cookie submission.
     """
-    return await _get_video_info(request.url, request.is_playlist, request.cookies)
+    with phase("cookies"):
+        cookie_jar = resolve_cookie_jar(request.cookies, request.cookie_session)
+    return await cancel_on_disconnect(
+        http_request,
+        _get_video_info(
+            request.url,
+            request.is_playlist,
+            cookie_jar,
+            request.cursor,
+            request.limit,
+            request.fields,
+        ),
+    )
 
 
 @app.get("/api/info", response_model=VideoInfoResponse)
 async def get_video_info(
+    http_request: Request,
     url: HttpUrl,
     is_playlist: bool = Query(False),
     client_cookies: Optional[List[Dict]] = None,
+    cookie_session: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PLAYLIST_PAGE_SIZE, ge=1, le=PLAYLIST_PAGE_MAX),
+    fields: Optional[str] = Query(None),
 ):
     """Get information about a video or playlist."""
     # Convert client cookies if provided in query
@@ -1186,107 +1987,219 @@ async def get_video_info(
         except Exception as e:
             logger.warning(f"Failed to parse client cookies: {e}")
 
-    return await _get_video_info(url, is_playlist, cookies_list)
+    with phase("cookies"):
+        cookie_jar = resolve_cookie_jar(cookies_list, cookie_session)
+    return await cancel_on_disconnect(
+        http_request,
+        _get_video_info(url, is_playlist, cookie_jar, cursor, limit, fields),
+    )
 
 
-async def _get_video_info(
-    url: HttpUrl,
-    is_playlist: bool = False,
-    client_cookies: Optional[List[Cookie]] = None,
-):
-    """Internal function to get video info, used by both GET and POST endpoints."""
+def metadata_cache_key(
+    clean_url: str,
+    is_playlist: bool,
+    cookie_options: dict,
+    playlist_items: Optional[str] = None,
+) -> str:
+    """
+    Cache key for extracted metadata: sanitized URL, playlist page and cookies.
+
+    Client and cached browser jars are keyed by content, so results fetched
+    with browser cookies are never shared with anonymous requests.
+    """
+    cookiefile = cookie_options.get("cookiefile")
+    if isinstance(cookiefile, CookieStream):
+        jar_key = cookiefile.jar.key
+    elif cookie_options.get("cookiesfrombrowser"):
+        jar_key = f"browser:{cookie_options['cookiesfrombrowser'][0]}"
+    else:
+        jar_key = "anonymous"
+    return f"{clean_url}|playlist={int(is_playlist)}|items={playlist_items}|{jar_key}"
+
+
+async def _extract_metadata(
+    clean_url: str,
+    is_playlist: bool,
+    cookie_options: dict,
+    playlist_items: Optional[str] = None,
+) -> dict:
+    """
+    Run a yt-dlp metadata extraction for a sanitized URL.
+
+    Playlists are extracted flat and only for the requested playlist_items,
+    so entries are listed without resolving each video.
+    """
     start_time = time.time()
+    deadline = start_time + settings.ytdlp_timeout
     cookie_file = None
+    # Extraction path being timed, for the latency metrics
+    method = None
 
     try:
-        clean_url = sanitize_url(str(url), is_playlist)
-        logger.info(f"Fetching video info for URL: {clean_url}")
-
-        if client_cookies:
-            logger.info(
-                f"Using {len(client_cookies)} client-provided cookies for video info"
-            )
-
         # Basic yt-dlp options
         options = {
             "noplaylist": not is_playlist,
-            "extract_flat": "discard" if not is_playlist else None,
+            "extract_flat": "discard" if not is_playlist else "in_playlist",
             "quiet": True,
             "no_warnings": True,
             "download": False,
+            "allow_unplayable_formats": True,  # Allow premium formats to be listed
+            "check_formats": False,  # Don't skip unplayable formats
+            "extractor_args": {
+                "youtube": {"formats": "missing_pot"}
+            },  # Get premium formats for YouTube
         }
 
-        # Get cookie arguments - handle both client and browser cookies
-        cookie_args, cookie_file = get_yt_dlp_base_args(True, client_cookies)
-
-        # Add cookie arguments to yt-dlp options
-        if "--cookies" in cookie_args:
-            options["cookies"] = cookie_args[cookie_args.index("--cookies") + 1]
-            logger.info(f"Using cookie file: {options['cookies']}")
-        elif "--cookies-from-browser" in cookie_args:
-            options["cookiesfrombrowser"] = (
-                cookie_args[cookie_args.index("--cookies-from-browser") + 1],
-                None,
-                None,
-                None,
-            )
-            logger.info(f"Using browser cookies: {options['cookiesfrombrowser'][0]}")
-
-        # Direct subprocess call with cookies for maximum compatibility
-        try:
-            # First try direct subprocess call with cookies for maximum compatibility
-            cmd = ["yt-dlp", "--dump-json", "--no-warnings", "--quiet"]
-            if not is_playlist:
-                cmd.append("--no-playlist")
-
-            # Add cookie arguments
-            cmd.extend(cookie_args)
-            cmd.append(clean_url)
+        if is_playlist and playlist_items:
+            options["playlist_items"] = playlist_items
 
-            logger.info(f"Running command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        # Client or browser cookies, resolved when the cache key was derived
+        with phase("cookies"):
+            options.update(cookie_options)
+            cookie_args, cookie_file = acquire_cookie_args(options)
 
-            # Parse the JSON output
-            import json
+        with phase("extraction"):
+            # Single extraction path: parse the subprocess JSON output, and only
+            # use the Python API when the subprocess produced nothing usable
+            try:
+                cmd = [
+                    "yt-dlp",
+                    "--dump-single-json",
+                    "--no-warnings",
+                    "--quiet",
+                    "--allow-unplayable-formats",
+                    "--no-check-formats",
+                    "--extractor-args",
+                    "youtube:formats=missing_pot",
+                ]
+                if not is_playlist:
+                    cmd.append("--no-playlist")
+                else:
+                    cmd.append("--flat-playlist")
+                    if playlist_items:
+                        cmd.extend(["--playlist-items", playlist_items])
+
+                # Add cookie arguments
+                cmd.extend(cookie_args)
+                cmd.append(clean_url)
+
+                logger.info(f"Running command: {' '.join(cmd)}")
+                method, method_start = "subprocess", time.perf_counter()
+                result = await extraction_service.run_command(
+                    cmd, timeout=settings.ytdlp_timeout, check=True
+                )
+                info = json.loads(result.stdout)
+                if not isinstance(info, dict):
+                    raise ValueError("yt-dlp returned no metadata")
+
+                EXTRACTION_SECONDS.observe(
+                    time.perf_counter() - method_start,
+                    method=method,
+                    operation="metadata",
+                )
+                duration = time.time() - start_time
+                logger.info(
+                    f"Metadata fetched via subprocess in {duration:.2f} seconds"
+                )
+            except (subprocess.CalledProcessError, ValueError) as e:
+                logger.error(f"Subprocess extraction failed: {getattr(e, 'stderr', e)}")
+                EXTRACTION_FAILURES.inc(method=method, operation="metadata")
 
-            info = json.loads(result.stdout)
+                # Fall back to using the yt-dlp Python API
+                logger.info("Falling back to yt-dlp Python API")
 
-            duration = time.time() - start_time
-            logger.info(f"Video info fetched via subprocess in {duration:.2f} seconds")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Subprocess error: {e.stderr}")
+                def extract_in_process():
+                    with yt_dlp.YoutubeDL(options) as ydl:
+                        return ydl.extract_info(clean_url, download=False)
 
-            # Fall back to using the yt-dlp Python API
-            logger.info("Falling back to yt-dlp Python API")
-            with yt_dlp.YoutubeDL(options) as ydl:
-                info = await asyncio.get_running_loop().run_in_executor(
-                    None, lambda: ydl.extract_info(clean_url, download=False)
+                method, method_start = "api", time.perf_counter()
+                info = await extraction_service.run_in_executor(
+                    extract_in_process, timeout=max(deadline - time.time(), 1)
                 )
 
+                EXTRACTION_SECONDS.observe(
+                    time.perf_counter() - method_start,
+                    method=method,
+                    operation="metadata",
+                )
                 duration = time.time() - start_time
                 logger.info(
-                    f"Video info fetched via Python API in {duration:.2f} seconds"
+                    f"Metadata fetched via Python API in {duration:.2f} seconds"
                 )
 
-        # Handle playlists
-        is_playlist_result = "entries" in info
-        entries = info.get("entries", [])[:50] if is_playlist_result else None
+        return info
+    except ExtractionTimeout as e:
+        EXTRACTION_FAILURES.inc(method=method, operation="metadata")
+        logger.warning(f"Metadata extraction for {clean_url} timed out: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception:
+        if method is not None:
+            EXTRACTION_FAILURES.inc(method=method, operation="metadata")
+        raise
+    finally:
+        # The subprocess has exited; its private cookie file can go
+        if cookie_file is not None:
+            cookie_store.release_file(cookie_file)
 
-        # Extract simplified entry data for playlists
-        if entries:
-            simplified_entries = []
-            for entry in entries:
-                simplified_entries.append(
-                    {
-                        "id": entry.get("id", ""),
-                        "title": entry.get("title", "Untitled"),
-                        "duration": entry.get("duration"),
-                        "thumbnail": entry.get("thumbnail"),
-                    }
-                )
-            entries = simplified_entries
 
-        return VideoInfoResponse(
+async def get_cached_metadata(
+    clean_url: str,
+    is_playlist: bool = False,
+    cookie_jar: Optional[CookieJar] = None,
+    playlist_items: Optional[str] = None,
+) -> dict:
+    """
+    Get the info dict for a sanitized URL, shared by the info and formats endpoints.
+
+    Concurrent requests for the same URL and cookie set share a single extraction.
+    The returned dict is shared with other callers and must not be mutated.
+    """
+    with phase("cookies"):
+        # Browser cookies are used when the client sent none, so they key too
+        cookie_options = await get_cookie_options(True, cookie_jar)
+    key = metadata_cache_key(clean_url, is_playlist, cookie_options, playlist_items)
+    return await metadata_cache.get_or_load(
+        key,
+        lambda: _extract_metadata(
+            clean_url, is_playlist, cookie_options, playlist_items
+        ),
+    )
+
+
+async def _get_video_info(
+    url: HttpUrl,
+    is_playlist: bool = False,
+    cookie_jar: Optional[CookieJar] = None,
+    cursor: Optional[str] = None,
+    limit: int = PLAYLIST_PAGE_SIZE,
+    fields: Optional[str] = None,
+):
+    """Internal function to get video info, used by both GET and POST endpoints."""
+    try:
+        with phase("validation"):
+            clean_url = sanitize_url(str(url), is_playlist)
+            start = parse_playlist_cursor(cursor)
+        logger.info(f"Fetching video info for URL: {clean_url}")
+
+        if cookie_jar is not None:
+            logger.info(
+                f"Using {cookie_jar.cookie_count} client-provided cookies for video info"
+            )
+
+        info = await get_cached_metadata(
+            clean_url,
+            is_playlist,
+            cookie_jar,
+            playlist_items_range(start, limit) if is_playlist else None,
+        )
+
+        # Playlists come back flat, one page of lightweight entries at a time
+        is_playlist_result = "entries" in info
+        entries, next_cursor = (
+            playlist_page(info, start, limit) if is_playlist_result else (None, None)
+        )
+
+        response = VideoInfoResponse(
             title=info.get("title", "Untitled"),
             duration=info.get("duration"),
             thumbnail=info.get("thumbnail"),
@@ -1296,15 +2209,20 @@ async def _get_video_info(
             upload_date=info.get("upload_date"),
             is_playlist=is_playlist_result,
             entries=entries,
+            next_cursor=next_cursor,
+            playlist_count=info.get("playlist_count"),
         )
+        return compact_response(response, parse_fields(fields), always=("is_playlist",))
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error fetching video info: {str(e)}")
 
         # Check if this is a YouTube authentication error
         error_message = str(e)
         if "Sign in to confirm you're not a bot" in error_message:
-            browser_status = check_browser_available(DEFAULT_BROWSER)
+            browser_status = browser_probe.is_available
             additional_info = f"\nBrowser {DEFAULT_BROWSER} {'is' if browser_status else 'is not'} available for cookies."
             additional_info += (
                 "\nConsider providing client-side cookies for authentication."
@@ -1343,7 +2261,7 @@ async def _get_video_info(
                 title = "Instagram content"
 
             # Return minimal info
-            return VideoInfoResponse(
+            response = VideoInfoResponse(
                 title=title,
                 duration=None,
                 thumbnail=None,
@@ -1354,32 +2272,45 @@ async def _get_video_info(
                 is_playlist=False,
                 entries=None,
             )
+            return compact_response(
+                response, parse_fields(fields), always=("is_playlist",)
+            )
 
         # For other platforms, just propagate the error
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        # Clean up any cookie files
-        if cookie_file:
-            try:
-                cookie_manager.delete_cookie_file(Path(cookie_file))
-            except Exception as e:
-                logger.warning(f"Error cleaning up cookie file: {e}")
 
 
 @app.post("/api/formats", response_model=FormatsResponse)
-async def get_formats_with_cookies(request: FormatsRequest):
+async def get_formats_with_cookies(request: FormatsRequest, http_request: Request):
     """
     Get available formats for a video or playlist with cookies provided directly in the request body.
     This is an alternative POST endpoint to the GET /api/formats that allows direct cookie submission.
     """
-    return await _get_formats(request.url, request.is_playlist, request.cookies)
+    with phase("cookies"):
+        cookie_jar = resolve_cookie_jar(request.cookies, request.cookie_session)
+    return await cancel_on_disconnect(
+        http_request,
+        _get_formats(
+            request.url,
+            request.is_playlist,
+            cookie_jar,
+            request.cursor,
+            request.limit,
+            request.fields,
+        ),
+    )
 
 
 @app.get("/api/formats", response_model=FormatsResponse)
 async def get_formats(
+    http_request: Request,
     url: HttpUrl,
     is_playlist: bool = Query(False),
     client_cookies: Optional[List[Dict]] = None,
+    cookie_session: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PLAYLIST_PAGE_SIZE, ge=1, le=PLAYLIST_PAGE_MAX),
+    fields: Optional[str] = Query(None),
 ):
     """Get available formats for a video or playlist with premium quality options."""
     # Convert client cookies if provided in query
@@ -1390,104 +2321,56 @@ async def get_formats(
         except Exception as e:
             logger.warning(f"Failed to parse client cookies: {e}")
 
-    return await _get_formats(url, is_playlist, cookies_list)
+    with phase("cookies"):
+        cookie_jar = resolve_cookie_jar(cookies_list, cookie_session)
+    return await cancel_on_disconnect(
+        http_request, _get_formats(url, is_playlist, cookie_jar, cursor, limit, fields)
+    )
 
 
 async def _get_formats(
     url: HttpUrl,
     is_playlist: bool = False,
-    client_cookies: Optional[List[Cookie]] = None,
+    cookie_jar: Optional[CookieJar] = None,
+    cursor: Optional[str] = None,
+    limit: int = PLAYLIST_PAGE_SIZE,
+    fields: Optional[str] = None,
 ):
     """Internal function to get formats, used by both GET and POST endpoints."""
-    start_time = time.time()
-    cookie_file = None
-
     try:
-        clean_url = sanitize_url(str(url), is_playlist)
+        with phase("validation"):
+            clean_url = sanitize_url(str(url), is_playlist)
+            start = parse_playlist_cursor(cursor)
         logger.info(f"Fetching formats for URL: {clean_url}")
 
-        if client_cookies:
+        if cookie_jar is not None:
             logger.info(
-                f"Using {len(client_cookies)} client-provided cookies for formats"
-            )
-
-        # Basic yt-dlp options
-        options = {
-            "noplaylist": not is_playlist,
-            "extract_flat": "discard" if not is_playlist else None,
-            "quiet": True,
-            "no_warnings": True,
-            "download": False,
-            "allow_unplayable_formats": True,  # Allow premium formats to be listed
-            "check_formats": False,  # Don't skip unplayable formats
-            "extractor_args": {
-                "youtube": {"formats": "missing_pot"}
-            },  # Get premium formats for YouTube
-        }
-
-        # Get cookie arguments - handle both client and browser cookies
-        cookie_args, cookie_file = get_yt_dlp_base_args(True, client_cookies)
-
-        # Add cookie arguments to yt-dlp options
-        if "--cookies" in cookie_args:
-            options["cookies"] = cookie_args[cookie_args.index("--cookies") + 1]
-        elif "--cookies-from-browser" in cookie_args:
-            options["cookiesfrombrowser"] = (
-                cookie_args[cookie_args.index("--cookies-from-browser") + 1],
-                None,
-                None,
-                None,
+                f"Using {cookie_jar.cookie_count} client-provided cookies for formats"
             )
 
-        # Use direct subprocess call first for best compatibility
-        try:
-            # First try direct subprocess call with cookies for maximum compatibility
-            cmd = [
-                "yt-dlp",
-                "--dump-json",
-                "--no-warnings",
-                "--quiet",
-                "--list-formats",
-            ]
-            if not is_playlist:
-                cmd.append("--no-playlist")
-
-            # Add cookie arguments
-            cmd.extend(cookie_args)
-            cmd.append(clean_url)
-
-            logger.info(f"Running command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-
-            # Use the yt-dlp Python API for parsing formats as it's more reliable
-            with yt_dlp.YoutubeDL(options) as ydl:
-                info = await asyncio.get_running_loop().run_in_executor(
-                    None, lambda: ydl.extract_info(clean_url, download=False)
-                )
-
-            duration = time.time() - start_time
-            logger.info(f"Formats fetched in {duration:.2f} seconds")
-        except subprocess.CalledProcessError:
-            # Fall back to using the yt-dlp Python API
-            logger.info("Falling back to yt-dlp Python API for formats")
-            with yt_dlp.YoutubeDL(options) as ydl:
-                info = await asyncio.get_running_loop().run_in_executor(
-                    None, lambda: ydl.extract_info(clean_url, download=False)
-                )
-
-            duration = time.time() - start_time
-            logger.info(f"Formats fetched via Python API in {duration:.2f} seconds")
+        info = await get_cached_metadata(
+            clean_url,
+            is_playlist,
+            cookie_jar,
+            playlist_items_range(start, limit) if is_playlist else None,
+        )
 
-        # Filter and clean up formats for better display
+        # Filter and clean up formats for better display, keeping only the
+        # requested fields of each (a compact set by default)
+        format_fields = parse_fields(fields, COMPACT_FORMAT_FIELDS)
         formats = []
+        ladder = FormatLadder() if info.get("formats") else None
         if "formats" in info:
-            for fmt in info.get("formats", []):
+            for source_fmt in info.get("formats", []):
                 # Skip storyboard formats
-                if fmt.get("format_note") == "storyboard" or fmt.get(
+                if source_fmt.get("format_note") == "storyboard" or source_fmt.get(
                     "format_id", ""
                 ).startswith("sb"):
                     continue
 
+                # The info dict is shared through the metadata cache, annotate a copy
+                fmt = dict(source_fmt)
+
                 # Calculate filesize if not available but we have bitrate and duration
                 if not fmt.get("filesize") and fmt.get("tbr") and info.get("duration"):
                     fmt["filesize"] = int((fmt["tbr"] * 1024 / 8) * info["duration"])
@@ -1509,41 +2392,101 @@ async def _get_formats(
                         fmt["width"] = int(resolution_match.group(1))
                         fmt["height"] = int(resolution_match.group(2))
 
-                formats.append(fmt)
+                # Rank it into the ladder, which also sets needs_merge
+                ladder.add(fmt)
+                formats.append(project(fmt, format_fields))
 
-        return FormatsResponse(
-            is_playlist="entries" in info,
-            formats=formats,
-            entries=info.get("entries", [])[:50] if "entries" in info else None,
+        # Playlist entries are flat; formats of an entry are fetched on demand
+        # by requesting its url
+        entries, next_cursor = (
+            playlist_page(info, start, limit) if "entries" in info else (None, None)
         )
+        return compact_response(
+            FormatsResponse(
+                is_playlist="entries" in info,
+                formats=formats,
+                entries=entries,
+                next_cursor=next_cursor,
+                playlist_count=info.get("playlist_count"),
+                ladder=ladder.build() if ladder is not None else None,
+            )
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error fetching formats: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        # Clean up any cookie files
-        if cookie_file:
-            try:
-                cookie_manager.delete_cookie_file(Path(cookie_file))
-            except Exception as e:
-                logger.warning(f"Error cleaning up cookie file: {e}")
 
 
-@app.get("/api/browser_status", response_model=BrowserStatusResponse)
-async def get_browser_status():
-    """Check if a browser is available for cookie extraction."""
-    browser = DEFAULT_BROWSER
-    is_available = check_browser_available(browser)
+async def playlist_entry_lines(clean_url: str, options: dict, start: int, limit: int):
+    """NDJSON lines of a flat playlist listing, sent as entries are listed."""
+    loop = asyncio.get_running_loop()
+    lines: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def emit(record):
+        loop.call_soon_threadsafe(lines.put_nowait, record)
+
+    def list_entries():
+        try:
+            list_flat_playlist(clean_url, options, start, limit, emit, stop)
+        finally:
+            emit(None)
 
-    # Try to get additional info about the browser
-    browser_info = ""
+    listing = asyncio.ensure_future(extraction_service.run_in_executor(list_entries))
+    # A timed-out listing never reaches its own end marker
+    listing.add_done_callback(lambda _: lines.put_nowait(None))
     try:
-        if browser == "chrome" or browser == "chromium":
-            cmd = ["google-chrome", "--version"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                browser_info = result.stdout.strip()
-    except:
-        pass
+        while (record := await lines.get()) is not None:
+            yield json.dumps(record) + "\n"
+        await listing
+    except Exception as e:
+        logger.warning(f"Playlist listing for {clean_url} failed: {e}")
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+    finally:
+        # The listing thread checks this between entries
+        stop.set()
+
+
+@app.get("/api/playlist/entries")
+async def stream_playlist_entries(
+    url: HttpUrl,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(PLAYLIST_PAGE_SIZE, ge=1, le=PLAYLIST_PAGE_MAX),
+    cookie_session: Optional[str] = Query(None),
+):
+    """
+    Stream a page of playlist entries as newline-delimited JSON.
+
+    The first line describes the playlist, then one "entry" line follows per
+    entry as soon as it is listed, and a final "end" line carries the cursor
+    of the next page. Lazily paged playlists only fetch the pages covering
+    the requested range. Errors after the first line arrive as an "error"
+    line. Formats of an entry are fetched on demand from /api/formats.
+    """
+    start = parse_playlist_cursor(cursor)
+    clean_url = sanitize_url(SecurityValidator.validate_url(str(url)), True)
+    cookie_jar = resolve_cookie_jar(None, cookie_session)
+
+    options = {
+        "quiet": True,
+        "no_warnings": True,
+        "extractor_args": {"youtube": {"formats": "missing_pot"}},
+    }
+    options.update(await get_cookie_options(True, cookie_jar))
+
+    return StreamingResponse(
+        playlist_entry_lines(clean_url, options, start, limit),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def _browser_status_response() -> BrowserStatusResponse:
+    """Build the browser status response from the cached probe state."""
+    browser = browser_probe.browser
+    is_available = browser_probe.is_available
+    browser_info = browser_probe.browser_info
 
     message = (
         f"Browser '{browser}' is available for cookie extraction{': ' + browser_info if browser_info else ''}"
@@ -1552,14 +2495,33 @@ async def get_browser_status():
     )
 
     return BrowserStatusResponse(
-        browser=browser, is_available=is_available, message=message
+        browser=browser,
+        is_available=is_available,
+        message=message,
+        checked_at=(
+            browser_probe.checked_at.isoformat() if browser_probe.checked_at else None
+        ),
     )
 
 
+@app.get("/api/browser_status", response_model=BrowserStatusResponse)
+async def get_browser_status():
+    """Check if a browser is available for cookie extraction."""
+    return _browser_status_response()
+
+
+@app.post("/api/browser_status/refresh", response_model=BrowserStatusResponse)
+async def refresh_browser_status(auth: Optional[str] = Depends(api_key_auth)):
+    """Re-run the browser cookie availability probe now."""
+    browser_cookie_cache.invalidate()
+    await browser_probe.refresh()
+    return _browser_status_response()
+
+
 @app.get("/api/cookie_status", response_model=CookieStatusResponse)
 async def get_cookie_status():
     """Get status information about available cookie options."""
-    browser_available = check_browser_available(DEFAULT_BROWSER)
+    browser_available = browser_probe.is_available
 
     message = "Both client-side and browser cookies are supported."
     if not browser_available:
@@ -1576,7 +2538,7 @@ async def get_cookie_status():
 async def root():
     """API root endpoint."""
     # Check browser and cookie availability for better error messages
-    browser_available = check_browser_available(DEFAULT_BROWSER)
+    browser_available = browser_probe.is_available
     browser_status_message = (
         f"Browser {DEFAULT_BROWSER} is available for cookie extraction"
         if browser_available
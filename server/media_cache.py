@@ -0,0 +1,231 @@
+import os
+import json
+import asyncio
+import shutil
+import time
+import hashlib
+import tempfile
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# yt-dlp options that change the produced file
+CACHE_KEY_OPTIONS = ("format", "postprocessors")
+
+
+class MediaCacheEntry:
+    """A published file in the media cache."""
+
+    def __init__(self, key: str, path: Path, download_name: str, content_type: str):
+        self.key = key
+        self.path = path
+        self.download_name = download_name
+        self.content_type = content_type
+        self.size = path.stat().st_size
+
+
+class MediaResultCache:
+    """
+    Disk-backed cache of finished downloads with a size budget and LRU eviction.
+
+    Downloads are written into a staging directory on the same filesystem and
+    moved into place with os.replace, so a cached file is only ever visible
+    once complete. Entries being served are pinned and never evicted.
+    Concurrent misses for one key are single-flight: the first request
+    claims the key and downloads, the others wait for its result.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.objects_dir = self.root / "objects"
+        self.staging_root = self.root / "staging"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.staging_root.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, MediaCacheEntry]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Event] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(canonical_url: str, options: dict) -> str:
+        """Cache key from the canonical URL and the options that shape the output."""
+        relevant = {name: options.get(name) for name in CACHE_KEY_OPTIONS}
+        payload = json.dumps(
+            {"url": canonical_url, "options": relevant}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _load_index(self):
+        """Rebuild the index from published files, oldest access first."""
+        self._cleanup_staging()
+        found = []
+        for sidecar in self.objects_dir.glob("*.json"):
+            try:
+                meta = json.loads(sidecar.read_text())
+                path = self.objects_dir / meta["file"]
+                if not path.is_file():
+                    sidecar.unlink()
+                    continue
+                entry = MediaCacheEntry(
+                    meta["key"], path, meta["download_name"], meta["content_type"]
+                )
+                found.append((path.stat().st_atime, entry))
+            except Exception as e:
+                logger.warning(f"Dropping unreadable media cache entry {sidecar}: {e}")
+                sidecar.unlink(missing_ok=True)
+
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[entry.key] = entry
+            self.total_bytes += entry.size
+        if found:
+            logger.info(
+                f"Media cache loaded {len(found)} entries ({self.total_bytes} bytes)"
+            )
+        self._evict()
+
+    def _cleanup_staging(self):
+        """Remove leftovers of downloads interrupted by a restart."""
+        for leftover in self.staging_root.iterdir():
+            try:
+                if leftover.is_dir():
+                    shutil.rmtree(leftover)
+                else:
+                    leftover.unlink()
+            except OSError as e:
+                logger.warning(f"Failed to clean media cache staging {leftover}: {e}")
+
+    def staging_dir(self, prefix: str = "ytdlp_") -> str:
+        """A temp directory on the cache filesystem, so publishing is a rename."""
+        return tempfile.mkdtemp(prefix=prefix, dir=self.staging_root)
+
+    def acquire(self, key: str) -> Optional[MediaCacheEntry]:
+        """Look up and pin an entry; call release() once it has been served."""
+        entry = self._entries.get(key)
+        if entry is None or not entry.path.is_file():
+            if entry is not None:
+                self._drop(key)
+            return None
+
+        self._entries.move_to_end(key)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        self.hits += 1
+        try:
+            now = time.time()
+            os.utime(entry.path, (now, entry.path.stat().st_mtime))
+        except OSError:
+            pass
+        return entry
+
+    def claim(self, key: str) -> bool:
+        """
+        Become the request that produces a missing entry.
+
+        Returns False if another request already is; wait() for it, then
+        acquire() again. The claimant must call finish() whatever happens.
+        A request that ends up claiming is counted as the miss, so waiting
+        does not count one per pass.
+        """
+        if key in self._loading:
+            return False
+        self._loading[key] = asyncio.Event()
+        self.misses += 1
+        return True
+
+    async def wait(self, key: str):
+        """Wait until the request that claimed a key has finished."""
+        event = self._loading.get(key)
+        if event is not None:
+            await event.wait()
+
+    def finish(self, key: str):
+        """Release a claim, published or not, and wake the waiting requests."""
+        event = self._loading.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def release(self, key: str):
+        """Unpin an entry acquired for serving."""
+        if key in self._pins:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+        self._evict()
+
+    def publish(
+        self, key: str, source_path: str, download_name: str, content_type: str
+    ) -> MediaCacheEntry:
+        """Atomically move a finished file into the cache and return it pinned."""
+        existing = self._entries.get(key)
+        if existing is not None:
+            if existing.path.is_file():
+                # Another request published the same result first
+                self._pins[key] = self._pins.get(key, 0) + 1
+                return existing
+            # Its file vanished; account for it and remove what is left
+            self._drop(key)
+
+        suffix = Path(source_path).suffix
+        target = self.objects_dir / f"{key}{suffix}"
+        os.replace(source_path, target)
+
+        sidecar = self.objects_dir / f"{key}.json"
+        staging_sidecar = self.objects_dir / f".{key}.json.tmp"
+        staging_sidecar.write_text(
+            json.dumps(
+                {
+                    "key": key,
+                    "file": target.name,
+                    "download_name": download_name,
+                    "content_type": content_type,
+                }
+            )
+        )
+        os.replace(staging_sidecar, sidecar)
+
+        entry = MediaCacheEntry(key, target, download_name, content_type)
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        self._pins[key] = self._pins.get(key, 0) + 1
+        logger.info(f"Published {download_name} to media cache ({entry.size} bytes)")
+        self._evict()
+        return entry
+
+    def _evict(self):
+        """Evict least recently used, unpinned entries until under budget."""
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        (self.objects_dir / f"{key}.json").unlink(missing_ok=True)
+        entry.path.unlink(missing_ok=True)
+        logger.info(f"Evicted {entry.download_name} from media cache")
+
+    def stats(self) -> dict:
+        """Return cache statistics for monitoring."""
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "pinned": len(self._pins),
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """In-process TTL/LRU cache for extracted metadata with single-flight loading.
+
+    Concurrent callers asking for the same key share one in-flight load, so a
+    burst of requests for the same URL costs a single upstream extraction. The
+    load is cancelled only when every caller waiting on it has been cancelled.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared_loads = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        """Return the cached value for key, loading it at most once concurrently."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        future = self._inflight.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = future
+        else:
+            self.shared_loads += 1
+
+        # Shield the shared load so one caller going away does not fail the
+        # others, and cancel it once the last interested caller is gone
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1 and not future.done():
+                future.cancel()
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        try:
+            value = await loader()
+            self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: str, value: Any):
+        """Insert a value and evict least recently used entries over the limit."""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            logger.debug(f"Evicted metadata cache entry: {evicted_key}")
+
+    def invalidate(self, key: str):
+        """Drop a cached entry."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all cached entries."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return cache statistics for monitoring."""
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_loads": self.shared_loads,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
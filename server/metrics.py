@@ -0,0 +1,339 @@
+import bisect
+import math
+import os
+import threading
+import time
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket bounds in seconds and bytes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+SIZE_BUCKETS = tuple(2**power for power in range(16, 36, 2))  # 64 KiB .. 16 GiB
+
+LabelValues = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [
+        f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A metric family with optional labels, rendered in Prometheus text format."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # yt-dlp hooks and download threads update metrics off the event loop
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(suffix, label string, value) for every series."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        # Text format 0.0.4 names a counter family after its _total samples
+        family = f"{self.name}_total" if self.type == "counter" else self.name
+        lines = [
+            f"# HELP {family} {self.documentation}",
+            f"# TYPE {family} {self.type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        if not labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            ("_total", format_labels(self.labelnames, key), value)
+            for key, value in items
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: bucket counts (last one is +Inf), sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            series = sorted(
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._series.items()
+            )
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                labels = format_labels(
+                    (*self.labelnames, "le"), (*key, format_value(bound))
+                )
+                samples.append(("_bucket", labels, cumulative))
+            labels = format_labels(self.labelnames, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """
+    A gauge or counter read from application state when scraped.
+
+    The callback returns a number, or a dict of label values (a tuple when
+    there are several labels) to numbers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        labelnames: Tuple[str, ...] = (),
+        type: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self._callback = callback
+
+    def samples(self):
+        suffix = "_total" if self.type == "counter" else ""
+        value = self._callback()
+        if not isinstance(value, dict):
+            return [] if value is None else [(suffix, "", value)]
+        samples = []
+        for key, series_value in sorted(value.items()):
+            if series_value is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            samples.append((suffix, format_labels(self.labelnames, key), series_value))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, tuple(labelnames)))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, tuple(labelnames), buckets))
+
+    def gauge_callback(
+        self, name: str, documentation: str, callback, labelnames=()
+    ) -> CallbackMetric:
+        return self.register(
+            CallbackMetric(name, documentation, callback, tuple(labelnames))
+        )
+
+    def counter_callback(
+        self, name: str, documentation: str, callback, labelnames=()
+    ) -> CallbackMetric:
+        return self.register(
+            CallbackMetric(
+                name, documentation, callback, tuple(labelnames), type="counter"
+            )
+        )
+
+    def render(self) -> str:
+        """The exposition text of every metric; failing callbacks are skipped."""
+        parts = []
+        for metric in self._metrics.values():
+            try:
+                parts.append(metric.render())
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+        return "".join(parts)
+
+
+registry = MetricsRegistry()
+
+EXTRACTION_SECONDS = registry.histogram(
+    "ytdlp_extraction_seconds",
+    "Duration of successful yt-dlp extractions",
+    ("method", "operation"),
+)
+EXTRACTION_FAILURES = registry.counter(
+    "ytdlp_extraction_failures",
+    "yt-dlp extractions that failed or timed out",
+    ("method", "operation"),
+)
+STREAM_TTFB_SECONDS = registry.histogram(
+    "ytdlp_stream_ttfb_seconds",
+    "Time from request to the first body byte of a streamed download",
+    ("status",),
+    buckets=DURATION_BUCKETS,
+)
+STREAM_DURATION_SECONDS = registry.histogram(
+    "ytdlp_stream_duration_seconds",
+    "Time from request to the end of a streamed download response",
+    ("status",),
+    buckets=DURATION_BUCKETS,
+)
+STREAM_RESPONSE_BYTES = registry.histogram(
+    "ytdlp_stream_response_bytes",
+    "Body size of streamed download responses",
+    ("status",),
+    buckets=SIZE_BUCKETS,
+)
+STREAM_BYTES = registry.counter(
+    "ytdlp_stream_bytes", "Body bytes sent by streamed downloads"
+)
+POSTPROCESSOR_SECONDS = registry.histogram(
+    "ytdlp_postprocessor_seconds",
+    "Time spent in each yt-dlp postprocessor",
+    ("key",),
+    buckets=DURATION_BUCKETS,
+)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "ytdlp_rate_limit_rejections", "Requests rejected by the rate limiter"
+)
+
+
+def status_class(status: int) -> str:
+    return f"{status // 100}xx"
+
+
+def postprocessor_timer() -> Callable[[dict], None]:
+    """
+    yt-dlp postprocessor hook recording how long each postprocessor ran.
+
+    Make one per YoutubeDL instance; the hooks of one instance run in order
+    on one thread.
+    """
+    started: Dict[str, float] = {}
+
+    def hook(d: dict):
+        key = d.get("postprocessor") or "unknown"
+        if d.get("status") == "started":
+            started[key] = time.perf_counter()
+        elif d.get("status") == "finished" and key in started:
+            POSTPROCESSOR_SECONDS.observe(
+                time.perf_counter() - started.pop(key), key=key
+            )
+
+    return hook
+
+
+class StreamMetricsMiddleware:
+    """
+    Records time to first byte, duration and size of download responses.
+
+    Measured at the ASGI boundary, so every way a download is answered
+    (progressive stream, finished file, ZIP archive, cache hit) is covered
+    without instrumenting each one.
+    """
+
+    def __init__(
+        self, app: ASGIApp, paths: Tuple[str, ...] = ("/api/download/stream",)
+    ):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status = "5xx"
+        sent = 0
+        first_byte: Optional[float] = None
+
+        async def send_measured(message: Message):
+            nonlocal status, sent, first_byte
+            if message["type"] == "http.response.start":
+                status = status_class(message["status"])
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if body and first_byte is None:
+                    first_byte = time.perf_counter() - start_time
+                sent += len(body)
+            elif message["type"] == "http.response.pathsend":
+                # The server sends the file itself
+                first_byte = time.perf_counter() - start_time
+                sent += os.path.getsize(message["path"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            duration = time.perf_counter() - start_time
+            if first_byte is not None:
+                STREAM_TTFB_SECONDS.observe(first_byte, status=status)
+            STREAM_DURATION_SECONDS.observe(duration, status=status)
+            STREAM_RESPONSE_BYTES.observe(sent, status=status)
+            STREAM_BYTES.inc(sent)
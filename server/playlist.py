@@ -0,0 +1,392 @@
+import asyncio
+import itertools
+import os
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled, PagedList
+
+from delivery import remove_directory
+from zipstream import ZipStreamWriter, unique_arcname, zip_file_chunks
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_TYPES = ("playlist", "multi_video")
+URL_RESULT_TYPES = ("url", "url_transparent")
+MAX_URL_REDIRECTS = 5
+
+
+class PlaylistDownloadError(Exception):
+    """Raised when not a single playlist entry could be downloaded."""
+
+
+class PlaylistEntry:
+    """One entry of a flat-extracted playlist and the outcome of downloading it."""
+
+    def __init__(self, index: int, url: str, title: str):
+        self.index = index
+        self.url = url
+        self.title = title
+        self.status = "pending"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.files: List[str] = []
+
+    def snapshot(self) -> dict:
+        return {
+            "index": self.index,
+            "title": self.title,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+        }
+
+
+EntryDoneCallback = Callable[[PlaylistEntry, Dict], None]
+
+
+def is_playlist(info: dict) -> bool:
+    return info.get("_type") in PLAYLIST_TYPES
+
+
+def flat_playlist_entries(info: dict) -> List[PlaylistEntry]:
+    """Entries of a playlist extracted with extract_flat, in playlist order."""
+    entries = []
+    for position, entry in enumerate(info.get("entries") or [], start=1):
+        if not entry:
+            continue
+        url = entry.get("url") or entry.get("webpage_url")
+        if not url:
+            continue
+        entries.append(
+            PlaylistEntry(
+                entry.get("playlist_index") or position,
+                url,
+                entry.get("title") or entry.get("id") or f"Entry {position}",
+            )
+        )
+    return entries
+
+
+def parse_playlist_cursor(cursor: Optional[str]) -> int:
+    """1-based index of the first entry of a page; no cursor is the first page."""
+    if not cursor:
+        return 1
+    if not cursor.isdigit() or int(cursor) < 1:
+        raise ValueError(f"Invalid playlist cursor: {cursor}")
+    return int(cursor)
+
+
+def playlist_items_range(start: int, limit: int) -> str:
+    """
+    yt-dlp playlist_items spec for a page starting at `start`.
+
+    Ranges are inclusive, so this asks for one entry more than the page
+    holds; getting it back means there is a next page.
+    """
+    return f"{start}:{start + limit}"
+
+
+def thumbnail_url(entry: dict) -> Optional[str]:
+    if entry.get("thumbnail"):
+        return entry["thumbnail"]
+    thumbnails = entry.get("thumbnails") or []
+    return thumbnails[-1].get("url") if thumbnails else None
+
+
+def simplify_playlist_entry(entry: dict, index: int) -> dict:
+    """The fields of a flat playlist entry a picker needs."""
+    return {
+        "index": index,
+        "id": entry.get("id", ""),
+        "title": entry.get("title") or "Untitled",
+        "url": entry.get("url") or entry.get("webpage_url"),
+        "duration": entry.get("duration"),
+        "thumbnail": thumbnail_url(entry),
+        "uploader": entry.get("uploader") or entry.get("channel"),
+    }
+
+
+def playlist_page(
+    info: dict, start: int, limit: int
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Simplified entries of a playlist extracted with a playlist_items_range,
+    and the cursor of the next page (None on the last page).
+    """
+    raw_entries = [entry for entry in info.get("entries") or [] if entry]
+    indexes = info.get("requested_entries") or []
+    entries = [
+        simplify_playlist_entry(
+            entry, indexes[position] if position < len(indexes) else start + position
+        )
+        for position, entry in enumerate(raw_entries[:limit])
+    ]
+    next_cursor = str(start + limit) if len(raw_entries) > limit else None
+    return entries, next_cursor
+
+
+def playlist_header(info: dict) -> dict:
+    return {
+        "type": "playlist",
+        "is_playlist": is_playlist(info),
+        "id": info.get("id"),
+        "title": info.get("title") or "Untitled",
+        "uploader": info.get("uploader") or info.get("channel"),
+        "thumbnail": thumbnail_url(info),
+        "playlist_count": info.get("playlist_count"),
+    }
+
+
+def list_flat_playlist(
+    url: str,
+    options: dict,
+    start: int,
+    limit: int,
+    emit: Callable[[Dict[str, Any]], None],
+    stop: threading.Event,
+):
+    """
+    Emit a playlist header, then its entries from `start`, one at a time.
+
+    The extractor result is iterated without processing, so lazily paged
+    playlists only fetch the pages covering the requested range, and each
+    entry is emitted as soon as it is listed. Ends with an "end" record
+    carrying the next cursor. Blocking; stops early once `stop` is set.
+    """
+    with yt_dlp.YoutubeDL({**options, "extract_flat": "in_playlist"}) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        for _ in range(MAX_URL_REDIRECTS):
+            if info.get("_type") not in URL_RESULT_TYPES:
+                break
+            info = ydl.extract_info(
+                info["url"], download=False, ie_key=info.get("ie_key"), process=False
+            )
+
+        emit(playlist_header(info))
+        if not is_playlist(info):
+            emit({"type": "end", "count": 0, "next_cursor": None})
+            return
+
+        entries = info.get("entries") or []
+        if isinstance(entries, PagedList):
+            page = entries.getslice(start - 1, start + limit)
+        else:
+            page = itertools.islice(entries, start - 1, start + limit)
+
+        count = 0
+        has_more = False
+        for index, entry in enumerate(page, start):
+            if stop.is_set():
+                return
+            if index == start + limit:
+                has_more = True
+                break
+            if entry:
+                emit({"type": "entry", **simplify_playlist_entry(entry, index)})
+                count += 1
+
+        emit(
+            {
+                "type": "end",
+                "count": count,
+                "next_cursor": str(start + limit) if has_more else None,
+            }
+        )
+
+
+class ParallelPlaylistDownload:
+    """
+    Downloads playlist entries with a bounded pool of workers.
+
+    yt-dlp downloads a playlist's entries one after another; here each entry
+    is resolved and downloaded on its own, up to `workers` at a time. A failed
+    entry is put back on the queue once its backoff delay has passed, until
+    it has used up its retries; the worker picks up other entries meanwhile. A
+    cancelled download stops every worker instead of being retried.
+    """
+
+    def __init__(
+        self,
+        entries: List[PlaylistEntry],
+        download_entry: Callable[[PlaylistEntry], Awaitable[List[str]]],
+        workers: int = 4,
+        retries: int = 2,
+        retry_delay: float = 2.0,
+        on_entry_done: Optional[EntryDoneCallback] = None,
+    ):
+        self.entries = entries
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._download_entry = download_entry
+        self._on_entry_done = on_entry_done
+
+    @property
+    def finished(self) -> List[PlaylistEntry]:
+        return [entry for entry in self.entries if entry.status == "finished"]
+
+    @property
+    def failed(self) -> List[PlaylistEntry]:
+        return [entry for entry in self.entries if entry.status == "failed"]
+
+    def progress(self) -> Dict:
+        """Counts per outcome, and the entries that failed for good."""
+        return {
+            "playlist_total": len(self.entries),
+            "playlist_finished": len(self.finished),
+            "playlist_failed": len(self.failed),
+            "failed_entries": [entry.snapshot() for entry in self.failed],
+        }
+
+    async def run(self) -> List[PlaylistEntry]:
+        """Download every entry; raises PlaylistDownloadError if none succeeded."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for entry in self.entries:
+            queue.put_nowait(entry)
+        worker_count = min(self.workers, len(self.entries))
+        # Entries not yet finished or failed for good; the workers stop at zero
+        self._unsettled = len(self.entries)
+        self._retry_timers: List[asyncio.TimerHandle] = []
+
+        workers = [
+            asyncio.create_task(self._worker(queue, worker_count))
+            for _ in range(worker_count)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for timer in self._retry_timers:
+                timer.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        if self.entries and not self.finished:
+            raise PlaylistDownloadError(
+                f"All {len(self.entries)} playlist entries failed, "
+                f"first error: {self.entries[0].error}"
+            )
+        return self.entries
+
+    async def _worker(self, queue: asyncio.Queue, worker_count: int):
+        # None is the stop sentinel, one per worker once every entry settled
+        while (entry := await queue.get()) is not None:
+            entry.status = "running"
+            entry.attempts += 1
+            try:
+                entry.files = await self._download_entry(entry)
+            except DownloadCancelled:
+                raise
+            except Exception as e:
+                entry.error = str(e)
+                if entry.attempts <= self.retries:
+                    logger.warning(
+                        f"Playlist entry {entry.index} failed (attempt {entry.attempts}), "
+                        f"retrying: {e}"
+                    )
+                    entry.status = "retrying"
+                    # Re-enqueue after the backoff; this worker moves on meanwhile
+                    self._retry_timers.append(
+                        asyncio.get_running_loop().call_later(
+                            self.retry_delay * 2 ** (entry.attempts - 1),
+                            queue.put_nowait,
+                            entry,
+                        )
+                    )
+                    continue
+                logger.error(f"Playlist entry {entry.index} failed: {e}")
+                entry.status = "failed"
+            else:
+                entry.status = "finished"
+                entry.error = None
+
+            self._unsettled -= 1
+            if not self._unsettled:
+                for _ in range(worker_count):
+                    queue.put_nowait(None)
+
+            if self._on_entry_done is not None:
+                self._on_entry_done(entry, self.progress())
+
+
+class PlaylistArchiveStream:
+    """
+    A ZIP of a playlist's entries, streamed as each entry finishes downloading.
+
+    Entries are added in completion order and deleted once sent, so disk use
+    is bounded by the entries in flight and memory by the chunk size.
+    Entries that failed for good are listed in failed_entries.txt at the end.
+    close() stops any remaining downloads before removing temp_dir, whether
+    the archive was read to the end or the client went away.
+    """
+
+    def __init__(
+        self,
+        run_download: Callable[[EntryDoneCallback], Awaitable],
+        temp_dir: str,
+        chunk_size: int = 64 * 1024,
+        on_download_done: Optional[Callable[[], None]] = None,
+    ):
+        self.temp_dir = temp_dir
+        self.chunk_size = chunk_size
+        self._run_download = run_download
+        self._on_download_done = on_download_done
+        self._finished: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._download())
+
+    async def _download(self):
+        try:
+            await self._run_download(
+                lambda entry, progress: self._finished.put_nowait(entry)
+            )
+        finally:
+            self._finished.put_nowait(None)
+            if self._on_download_done is not None:
+                self._on_download_done()
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        writer = ZipStreamWriter()
+        used_names: set = set()
+        failed: List[PlaylistEntry] = []
+
+        while (entry := await self._finished.get()) is not None:
+            if entry.status != "finished":
+                failed.append(entry)
+                continue
+            for path in entry.files:
+                arcname = unique_arcname(os.path.basename(path), used_names)
+                async for chunk in zip_file_chunks(
+                    writer, path, arcname, self.chunk_size
+                ):
+                    yield chunk
+            for directory in {os.path.dirname(path) for path in entry.files}:
+                remove_directory(directory)
+
+        try:
+            await self._task
+        except Exception as e:
+            logger.error(f"Playlist archive incomplete: {e}")
+
+        if failed:
+            report = "".join(
+                f"{entry.index}\t{entry.title}\t{entry.url}\t{entry.error}\n"
+                for entry in sorted(failed, key=lambda entry: entry.index)
+            )
+            yield writer.add_bytes("failed_entries.txt", report.encode("utf-8"))
+        yield writer.finish()
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.wait([self._task])
+        remove_directory(self.temp_dir)
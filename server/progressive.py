@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import shutil
+import logging
+from typing import AsyncIterator, Callable, List, Optional
+from urllib.parse import urlparse
+
+from extraction import kill_process_tree
+
+logger = logging.getLogger(__name__)
+
+# Protocols ffmpeg can read directly when merging video and audio
+FFMPEG_INPUT_PROTOCOLS = {"http", "https", "m3u8", "m3u8_native"}
+
+# Codecs that can be muxed into fragmented MP4 without re-encoding
+MP4_VIDEO_CODECS = ("avc1", "avc3", "h264", "hev1", "hvc1", "av01")
+MP4_AUDIO_CODECS = ("mp4a", "aac", "ac-3", "ec-3", "opus", "flac")
+
+
+class ProgressiveStreamError(Exception):
+    """Raised when a progressive stream could not be started."""
+
+
+class ProgressivePlan:
+    """How a resolved selection is piped to the client without a temp file."""
+
+    def __init__(self, cmd: List[str], ext: str, stdin_data: Optional[bytes] = None):
+        self.cmd = cmd
+        self.ext = ext
+        self.stdin_data = stdin_data
+
+    @property
+    def mode(self) -> str:
+        return "ffmpeg-merge" if self.cmd[0] == "ffmpeg" else "yt-dlp-stdout"
+
+
+def _merge_container(requested_formats: List[dict]) -> str:
+    """Pick fragmented MP4 when every stream fits in it, Matroska otherwise."""
+    for fmt in requested_formats:
+        vcodec = (fmt.get("vcodec") or "none").lower()
+        acodec = (fmt.get("acodec") or "none").lower()
+        if vcodec != "none" and not vcodec.startswith(MP4_VIDEO_CODECS):
+            return "mkv"
+        if acodec != "none" and not acodec.startswith(MP4_AUDIO_CODECS):
+            return "mkv"
+    return "mp4"
+
+
+def merge_cookies(cookiejar, url: str) -> str:
+    """
+    The ffmpeg -cookies value for a URL, one Set-Cookie style line per cookie.
+
+    ffmpeg only reads the first cookie of a single "; " joined line, so this
+    follows yt-dlp's own FFmpegFD and lists every cookie on its own line.
+    """
+    if cookiejar is None or urlparse(url).scheme not in ("http", "https"):
+        return ""
+    return "".join(
+        f"{cookie.name}={cookie.value}; path={cookie.path}; domain={cookie.domain};\r\n"
+        for cookie in cookiejar.get_cookies_for_url(url)
+    )
+
+
+def build_merge_command(requested_formats: List[dict], cookiejar=None) -> List[str]:
+    """
+    ffmpeg command that muxes the selected streams into a pipe-friendly container.
+
+    cookiejar is the YoutubeDL cookiejar the streams were resolved with.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
+    for fmt in requested_formats:
+        headers = "".join(
+            f"{key}: {value}\r\n"
+            for key, value in (fmt.get("http_headers") or {}).items()
+        )
+        if headers:
+            cmd.extend(["-headers", headers])
+        cookies = merge_cookies(cookiejar, fmt["url"])
+        if cookies:
+            cmd.extend(["-cookies", cookies])
+        cmd.extend(["-i", fmt["url"]])
+
+    cmd.extend(["-c", "copy"])
+    for index, fmt in enumerate(requested_formats):
+        cmd.extend(["-map", f"{index}:{fmt.get('manifest_stream_number', 0)}"])
+
+    if _merge_container(requested_formats) == "mp4":
+        # Fragmented MP4 needs no seek back to write the moov atom
+        cmd.extend(
+            ["-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof"]
+        )
+    else:
+        cmd.extend(["-f", "matroska"])
+    cmd.append("pipe:1")
+    return cmd
+
+
+def build_stdout_command(format_id: str, cookie_args: List[str]) -> List[str]:
+    """yt-dlp command that downloads a format of an info JSON read from stdin."""
+    cmd = [
+        "yt-dlp",
+        "--load-info-json",
+        "-",
+        "--format",
+        format_id,
+        "--output",
+        "-",
+        "--quiet",
+        "--no-warnings",
+        "--no-part",
+    ]
+    cmd.extend(cookie_args)
+    return cmd
+
+
+def plan_progressive_stream(
+    resolved: dict, cookie_args: List[str], cookiejar=None
+) -> Optional[ProgressivePlan]:
+    """
+    Decide how a resolved (format-selected) info dict can be streamed as produced.
+
+    Returns None when the selection cannot be piped and the temp-file path
+    must be used instead.
+    """
+    if resolved.get("_type", "video") != "video":
+        return None
+
+    requested_formats = resolved.get("requested_formats")
+    if requested_formats:
+        if not shutil.which("ffmpeg"):
+            logger.info("ffmpeg not available, merged selection needs a temp file")
+            return None
+        if any(
+            fmt.get("protocol") not in FFMPEG_INPUT_PROTOCOLS
+            for fmt in requested_formats
+        ):
+            return None
+        return ProgressivePlan(
+            build_merge_command(requested_formats, cookiejar),
+            _merge_container(requested_formats),
+        )
+
+    if not resolved.get("format_id"):
+        return None
+    return ProgressivePlan(
+        build_stdout_command(resolved["format_id"], cookie_args),
+        resolved.get("ext") or "mp4",
+        stdin_data=json.dumps(resolved).encode("utf-8"),
+    )
+
+
+class ProgressiveStream:
+    """A running producer process whose stdout is forwarded to the client."""
+
+    def __init__(
+        self,
+        plan: ProgressivePlan,
+        chunk_size: int = 64 * 1024,
+        on_close: Optional[Callable[[], None]] = None,
+    ):
+        self.plan = plan
+        self.chunk_size = chunk_size
+        self._on_close = on_close
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.first_chunk = b""
+        self.bytes_sent = 0
+        self._stderr = bytearray()
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    async def start(self, timeout: Optional[float] = None):
+        """
+        Start the producer and wait for its first bytes.
+
+        Raises ProgressiveStreamError if they take longer than timeout
+        seconds, so a stalled upstream does not hold the download slot.
+        """
+        self.process = await asyncio.create_subprocess_exec(
+            *self.plan.cmd,
+            stdin=(
+                asyncio.subprocess.PIPE
+                if self.plan.stdin_data is not None
+                else asyncio.subprocess.DEVNULL
+            ),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=os.name == "posix",
+        )
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+        try:
+            try:
+                self.first_chunk = await asyncio.wait_for(self._first_chunk(), timeout)
+            except asyncio.TimeoutError:
+                raise ProgressiveStreamError(
+                    f"{self.plan.cmd[0]} produced no output within {timeout}s"
+                )
+            if not self.first_chunk:
+                await self.process.wait()
+                await self._stderr_task
+                raise ProgressiveStreamError(
+                    self.stderr or f"{self.plan.cmd[0]} produced no output"
+                )
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _first_chunk(self) -> bytes:
+        if self.plan.stdin_data is not None:
+            self.process.stdin.write(self.plan.stdin_data)
+            await self.process.stdin.drain()
+            self.process.stdin.close()
+        return await self.process.stdout.read(self.chunk_size)
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """Yield the producer output, killing the producer if the client goes away."""
+        try:
+            chunk = self.first_chunk
+            while chunk:
+                self.bytes_sent += len(chunk)
+                yield chunk
+                chunk = await self.process.stdout.read(self.chunk_size)
+
+            returncode = await self.process.wait()
+            if returncode != 0:
+                await self._stderr_task
+                logger.error(
+                    f"Progressive stream ended with code {returncode} after "
+                    f"{self.bytes_sent} bytes: {self.stderr}"
+                )
+        finally:
+            await self.close()
+
+    async def _drain_stderr(self):
+        """Keep reading stderr so a chatty producer never blocks on a full pipe."""
+        while chunk := await self.process.stderr.read(4096):
+            self._stderr.extend(chunk)
+            del self._stderr[:-4096]
+
+    @property
+    def stderr(self) -> str:
+        return self._stderr.decode("utf-8", "replace").strip()
+
+    async def close(self):
+        """Stop the producer if it is still running."""
+        if self.process is not None:
+            await kill_process_tree(self.process)
+        if self._stderr_task is not None and not self._stderr_task.done():
+            self._stderr_task.cancel()
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
@@ -0,0 +1,94 @@
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+# Format keys a format picker needs; URLs, fragment lists, HTTP headers and
+# downloader internals stay on the server
+COMPACT_FORMAT_FIELDS: Tuple[str, ...] = (
+    "format_id",
+    "ext",
+    "resolution",
+    "width",
+    "height",
+    "fps",
+    "vcodec",
+    "acodec",
+    "tbr",
+    "vbr",
+    "abr",
+    "asr",
+    "audio_channels",
+    "filesize",
+    "filesize_approx",
+    "format_note",
+    "dynamic_range",
+    "language",
+    "protocol",
+    "is_premium",
+    "needs_merge",
+)
+
+ALL_FIELDS = "all"
+
+
+class CompactJSONResponse(JSONResponse):
+    """JSON without whitespace, encoded with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=str,
+        ).encode("utf-8")
+
+
+def parse_fields(
+    fields: Optional[str], default: Optional[Tuple[str, ...]] = None
+) -> Optional[Tuple[str, ...]]:
+    """
+    Field selection from a comma-separated `fields=` parameter.
+
+    Returns the default when nothing was asked for, and None (no projection)
+    for `fields=all`.
+    """
+    if not fields:
+        return default
+    if fields.strip() == ALL_FIELDS:
+        return None
+    selected = tuple(name.strip() for name in fields.split(",") if name.strip())
+    return selected or default
+
+
+def project(item: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """The selected keys of a dict, leaving out missing and null values."""
+    if fields is None:
+        return item
+    return {name: item[name] for name in fields if item.get(name) is not None}
+
+
+def compact_response(
+    model: BaseModel,
+    fields: Optional[Tuple[str, ...]] = None,
+    always: Tuple[str, ...] = (),
+) -> CompactJSONResponse:
+    """
+    Serialize a response model without nulls, keeping only the selected fields.
+
+    Returning a Response skips FastAPI's second validation and encoding pass
+    over the model; the response_model of the route still documents it.
+    """
+    content = model.model_dump(exclude_none=True)
+    if fields is not None:
+        content = project(content, (*always, *fields))
+    return CompactJSONResponse(content)
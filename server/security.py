@@ -1,110 +1,178 @@
 import time
+import math
+import bisect
 import hashlib
-from typing import Dict, Optional, Set
+from collections import OrderedDict
+from typing import List, Optional, Set
 from fastapi import HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 import logging
 from pathlib import Path
 import re
 
+from metrics import RATE_LIMIT_REJECTIONS
+
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage (in production, use Redis)
-_rate_limit_storage: Dict[str, Dict[str, float]] = {}
 
+def get_client_ip(request: Request) -> str:
+    """Extract client IP from request."""
+    # Check for forwarded headers (for reverse proxies)
+    forwarded_for = request.headers.get("X-Forwarded-For")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+
+    real_ip = request.headers.get("X-Real-IP")
+    if real_ip:
+        return real_ip
+
+    return request.client.host if request.client else "unknown"
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window rate limiter with constant work per request.
+
+    Each client keeps two counters: requests in the current fixed window and
+    in the previous one. The previous window is weighted by how much of it
+    still overlaps the sliding window, which approximates a true sliding log
+    without storing timestamps.
+
+    Clients are kept in least-recently-seen order. A few stale clients are
+    swept from the front on every request, and the oldest client is evicted
+    once max_clients is reached, so memory stays bounded even under a flood
+    of spoofed X-Forwarded-For addresses.
+    """
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware to prevent abuse."""
+    # Stale clients removed per request, amortizing the sweep
+    SWEEP_BATCH = 2
 
     def __init__(
-        self, app, calls_per_minute: int = 30, excluded_paths: Optional[Set[str]] = None
+        self, limit: int, window_seconds: float = 60, max_clients: int = 100_000
     ):
-        super().__init__(app)
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_clients = max(1, max_clients)
+        # client -> [window index, current count, previous count]
+        self._clients: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.rejected = 0
+        self.evicted = 0
+
+    def hit(self, client_id: str, now: Optional[float] = None) -> bool:
+        """Record a request; returns False if the client is over its limit."""
+        now = time.monotonic() if now is None else now
+        position = now / self.window_seconds
+        window = int(position)
+
+        entry = self._clients.get(client_id)
+        if entry is None:
+            entry = self._clients[client_id] = [window, 0, 0]
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._clients.move_to_end(client_id)
+            if entry[0] != window:
+                entry[2] = entry[1] if entry[0] == window - 1 else 0
+                entry[1] = 0
+                entry[0] = window
+
+        self._sweep(window)
+
+        overlap = 1 - (position - window)
+        if entry[2] * overlap + entry[1] >= self.limit:
+            self.rejected += 1
+            return False
+        entry[1] += 1
+        return True
+
+    def retry_after(self, now: Optional[float] = None) -> int:
+        """Seconds until the current window rolls over."""
+        now = time.monotonic() if now is None else now
+        return max(1, math.ceil(self.window_seconds - now % self.window_seconds))
+
+    def _sweep(self, window: int):
+        """Drop clients whose counters no longer reach into the sliding window."""
+        for _ in range(self.SWEEP_BATCH):
+            if not self._clients:
+                return
+            client_id, entry = next(iter(self._clients.items()))
+            if entry[0] >= window - 1:
+                return
+            del self._clients[client_id]
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def stats(self) -> dict:
+        """Return limiter statistics for monitoring."""
+        return {
+            "tracked_clients": len(self._clients),
+            "max_clients": self.max_clients,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+
+class RateLimitMiddleware:
+    """
+    Rate limiting middleware to prevent abuse.
+
+    Written as plain ASGI: once a request is admitted, receive and send are
+    handed to the app untouched, so streamed download bodies are not copied
+    through an extra memory stream and task group.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        calls_per_minute: int = 30,
+        excluded_paths: Optional[Set[str]] = None,
+        max_clients: int = 100_000,
+    ):
+        self.app = app
         self.calls_per_minute = calls_per_minute
         self.excluded_paths = excluded_paths or {
             "/",
             "/docs",
             "/openapi.json",
             "/api/health",
+            "/metrics",
         }
         self.window_size = 60  # 1 minute window
+        self.limiter = SlidingWindowRateLimiter(
+            calls_per_minute, self.window_size, max_clients
+        )
 
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for excluded paths
-        if request.url.path in self.excluded_paths:
-            return await call_next(request)
-
-        client_ip = self.get_client_ip(request)
-        current_time = time.time()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Skip rate limiting for non-HTTP traffic and excluded paths
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
 
-        # Clean old entries
-        self._cleanup_old_entries(current_time)
+        client_ip = self.get_client_ip(Request(scope))
 
-        # Check rate limit
-        if self._is_rate_limited(client_ip, current_time):
+        # Check the rate limit and record this request
+        if not self.limiter.hit(client_ip):
             logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
+            RATE_LIMIT_REJECTIONS.inc()
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "detail": f"Rate limit exceeded. Maximum {self.calls_per_minute} requests per minute."
                 },
+                headers={"Retry-After": str(self.limiter.retry_after())},
             )
+            await response(scope, receive, send)
+            return
 
-        # Record this request
-        self._record_request(client_ip, current_time)
-
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
     def get_client_ip(self, request: Request) -> str:
         """Extract client IP from request."""
-        # Check for forwarded headers (for reverse proxies)
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-
-        return request.client.host if request.client else "unknown"
-
-    def _cleanup_old_entries(self, current_time: float):
-        """Remove old rate limit entries."""
-        cutoff_time = current_time - self.window_size
-        for ip in list(_rate_limit_storage.keys()):
-            _rate_limit_storage[ip] = {
-                timestamp: count
-                for timestamp, count in _rate_limit_storage[ip].items()
-                if float(timestamp) > cutoff_time
-            }
-            if not _rate_limit_storage[ip]:
-                del _rate_limit_storage[ip]
-
-    def _is_rate_limited(self, client_ip: str, current_time: float) -> bool:
-        """Check if client IP is rate limited."""
-        if client_ip not in _rate_limit_storage:
-            return False
-
-        cutoff_time = current_time - self.window_size
-        request_count = sum(
-            count
-            for timestamp, count in _rate_limit_storage[client_ip].items()
-            if float(timestamp) > cutoff_time
-        )
-
-        return request_count >= self.calls_per_minute
-
-    def _record_request(self, client_ip: str, current_time: float):
-        """Record a request for rate limiting."""
-        if client_ip not in _rate_limit_storage:
-            _rate_limit_storage[client_ip] = {}
-
-        timestamp_key = str(int(current_time))
-        _rate_limit_storage[client_ip][timestamp_key] = (
-            _rate_limit_storage[client_ip].get(timestamp_key, 0) + 1
-        )
+        return get_client_ip(request)
 
 
 class SecurityValidator:
@@ -124,6 +192,18 @@ class SecurityValidator:
         r"del\s+/[sq]",  # Windows dangerous commands
     ]
 
+    # All dangerous patterns as one compiled alternation, so each string is
+    # scanned once instead of once per pattern. IGNORECASE on the raw value
+    # matches exactly what the per-pattern searches matched; case-folding
+    # the input instead differs for some Unicode characters.
+    DANGEROUS_REGEX = re.compile("|".join(DANGEROUS_PATTERNS), re.IGNORECASE)
+
+    # Separator for batch scans; no dangerous pattern can match across it
+    BATCH_SEPARATOR = "\x00"
+
+    TASK_ID_REGEX = re.compile(r"^[a-zA-Z0-9_-]+$")
+    UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+
     # Allowed URL schemes
     ALLOWED_SCHEMES = {"http", "https"}
 
@@ -132,6 +212,40 @@ class SecurityValidator:
     MAX_FILENAME_LENGTH = 255
     MAX_TASK_ID_LENGTH = 128
 
+    @classmethod
+    def contains_dangerous_pattern(cls, value: str) -> bool:
+        """Check a string against every dangerous pattern in one pass."""
+        return cls.DANGEROUS_REGEX.search(value) is not None
+
+    @classmethod
+    def find_dangerous_values(cls, values: List[str]) -> Set[int]:
+        """
+        Indexes of the values that contain a dangerous pattern.
+
+        The values are joined and scanned in one sweep; each match is mapped
+        back to its value by offset, and scanning resumes at the next value.
+        """
+        if not values:
+            return set()
+
+        starts = []
+        offset = 0
+        for value in values:
+            starts.append(offset)
+            offset += len(value) + len(cls.BATCH_SEPARATOR)
+        joined = cls.BATCH_SEPARATOR.join(values)
+
+        dangerous = set()
+        search = cls.DANGEROUS_REGEX.search
+        match = search(joined)
+        while match is not None:
+            index = bisect.bisect_right(starts, match.start()) - 1
+            dangerous.add(index)
+            if index + 1 == len(starts):
+                break
+            match = search(joined, starts[index + 1])
+        return dangerous
+
     @classmethod
     def validate_url(cls, url: str) -> str:
         """Validate and sanitize URL input."""
@@ -142,11 +256,10 @@ class SecurityValidator:
             raise HTTPException(status_code=400, detail="URL too long")
 
         # Check for dangerous patterns
-        for pattern in cls.DANGEROUS_PATTERNS:
-            if re.search(pattern, url, re.IGNORECASE):
-                raise HTTPException(
-                    status_code=400, detail="Invalid URL: contains dangerous pattern"
-                )
+        if cls.contains_dangerous_pattern(url):
+            raise HTTPException(
+                status_code=400, detail="Invalid URL: contains dangerous pattern"
+            )
 
         # Basic URL scheme validation
         if not any(
@@ -166,16 +279,15 @@ class SecurityValidator:
             raise HTTPException(status_code=400, detail="Task ID too long")
 
         # Allow only alphanumeric, dash, and underscore
-        if not re.match(r"^[a-zA-Z0-9_-]+$", task_id):
+        if not cls.TASK_ID_REGEX.match(task_id):
             raise HTTPException(status_code=400, detail="Invalid task ID format")
 
         # Check for dangerous patterns
-        for pattern in cls.DANGEROUS_PATTERNS:
-            if re.search(pattern, task_id, re.IGNORECASE):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid task ID: contains dangerous pattern",
-                )
+        if cls.contains_dangerous_pattern(task_id):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid task ID: contains dangerous pattern",
+            )
 
         return task_id
 
@@ -189,16 +301,15 @@ class SecurityValidator:
             raise HTTPException(status_code=400, detail="Filename too long")
 
         # Check for dangerous patterns
-        for pattern in cls.DANGEROUS_PATTERNS:
-            if re.search(pattern, filename, re.IGNORECASE):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid filename: contains dangerous pattern",
-                )
+        if cls.contains_dangerous_pattern(filename):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid filename: contains dangerous pattern",
+            )
 
         # Remove or replace dangerous characters
         # Keep only safe characters for filenames
-        safe_filename = re.sub(r'[<>:"/\\|?*]', "_", filename)
+        safe_filename = cls.UNSAFE_FILENAME_CHARS.sub("_", filename)
 
         return safe_filename
 
@@ -233,7 +344,7 @@ class SecurityValidator:
         if not cookies:
             return cookies
 
-        validated_cookies = []
+        candidates = []
         for cookie in cookies:
             # Validate domain
             domain = cookie.get("domain", "")
@@ -249,16 +360,20 @@ class SecurityValidator:
                 logger.warning(f"Invalid cookie size: {name}")
                 continue
 
-            # Check for dangerous patterns in cookie values
-            dangerous_found = False
-            for pattern in cls.DANGEROUS_PATTERNS:
-                if re.search(pattern, value, re.IGNORECASE):
-                    logger.warning(f"Dangerous pattern found in cookie: {name}")
-                    dangerous_found = True
-                    break
+            candidates.append(cookie)
 
-            if not dangerous_found:
-                validated_cookies.append(cookie)
+        # Check for dangerous patterns in all cookie values in one sweep
+        dangerous = cls.find_dangerous_values(
+            [cookie.get("value", "") for cookie in candidates]
+        )
+        validated_cookies = []
+        for index, cookie in enumerate(candidates):
+            if index in dangerous:
+                logger.warning(
+                    f"Dangerous pattern found in cookie: {cookie.get('name', '')}"
+                )
+                continue
+            validated_cookies.append(cookie)
 
         return validated_cookies
 
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+import pytest
+
+import browser_cookies
+from browser_cookies import BrowserCookieCache, locate_cookie_database
+from cookie_store import CookieStore
+
+
+def add_cookie(database, name, value):
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            "INSERT INTO moz_cookies (host, name, value, path, expiry, isSecure) "
+            "VALUES (?, ?, ?, '/', ?, 1)",
+            (".youtube.com", name, value, int(time.time()) + 3600),
+        )
+    # Make the change visible to an mtime check within the same second
+    mtime = os.stat(database).st_mtime + 10
+    os.utime(database, (mtime, mtime))
+
+
+@pytest.fixture
+def firefox_profile(tmp_path):
+    """A Firefox profile directory with a cookies.sqlite of two cookies."""
+    profile = tmp_path / "profile"
+    profile.mkdir()
+    database = profile / "cookies.sqlite"
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            "CREATE TABLE moz_cookies (id INTEGER PRIMARY KEY, originAttributes TEXT "
+            "DEFAULT '', host TEXT, name TEXT, value TEXT, path TEXT, expiry INTEGER, "
+            "isSecure INTEGER)"
+        )
+    add_cookie(database, "SID", "first")
+    add_cookie(database, "HSID", "second")
+    return profile
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CookieStore(tmp_path / "cookies", expiry_seconds=3600)
+
+
+def test_locates_the_profile_database(firefox_profile):
+    assert locate_cookie_database("firefox", str(firefox_profile)) == str(
+        firefox_profile / "cookies.sqlite"
+    )
+
+
+def test_extracts_once_and_serves_from_memory(firefox_profile, store):
+    cache = BrowserCookieCache("firefox", store, profile=str(firefox_profile))
+
+    jar = asyncio.run(cache.get())
+    again = asyncio.run(cache.get())
+
+    assert jar is again
+    assert jar.cookie_count == 2
+    assert "\tSID\tfirst" in jar.text
+    assert (cache.extractions, cache.hits) == (1, 1)
+    assert cache.database_path == str(firefox_profile / "cookies.sqlite")
+
+
+def test_database_change_replaces_the_previous_jar(firefox_profile, store):
+    cache = BrowserCookieCache("firefox", store, profile=str(firefox_profile))
+    first = asyncio.run(cache.get())
+
+    add_cookie(firefox_profile / "cookies.sqlite", "SSID", "third")
+    second = asyncio.run(cache.get())
+
+    assert second is not first
+    assert second.cookie_count == 3
+    assert cache.invalidations == 1
+    # Only the current browser jar is kept
+    assert store.stats()["jars"] == 1
+
+
+def test_without_private_helpers_extraction_still_works(
+    firefox_profile, store, monkeypatch
+):
+    monkeypatch.setattr(browser_cookies, "HAS_DATABASE_LOOKUP", False)
+    cache = BrowserCookieCache("firefox", store, profile=str(firefox_profile))
+
+    jar = asyncio.run(cache.get())
+
+    assert jar.cookie_count == 2
+    # Nothing to watch, so the jar lives for the TTL
+    assert cache.database_path is None
+
+
+def test_failed_extraction_is_not_retried_within_ttl(tmp_path, store):
+    cache = BrowserCookieCache("firefox", store, profile=str(tmp_path / "missing"))
+
+    assert asyncio.run(cache.get()) is None
+    assert cache.failures == 1
+    assert asyncio.run(cache.get()) is None
+    assert cache.failures == 1
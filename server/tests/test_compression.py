@@ -0,0 +1,103 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from compression import CompressionMiddleware
+
+PAYLOAD = {"formats": [{"format_id": str(n), "ext": "mp4"} for n in range(500)]}
+
+
+def make_client(**kwargs):
+    async def metadata(request):
+        return JSONResponse(PAYLOAD)
+
+    async def small(request):
+        return JSONResponse({"ok": True})
+
+    async def stream(request):
+        async def chunks():
+            yield b'{"entries": ['
+            yield b"]}"
+
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    app = Starlette(
+        routes=[
+            Route("/metadata", metadata),
+            Route("/small", small),
+            Route("/stream", stream),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, **kwargs)
+    return TestClient(app)
+
+
+def test_large_json_is_compressed():
+    response = make_client().get("/metadata", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == PAYLOAD
+
+
+def test_large_json_is_compressed_off_loop():
+    client = make_client(inline_max_size=1024)
+    response = client.get("/metadata", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == PAYLOAD
+
+
+def test_small_json_passes_through():
+    response = make_client().get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+
+def test_streamed_body_passes_through():
+    response = make_client(minimum_size=1).get(
+        "/stream", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"entries": []}'
+
+
+def test_headers_of_streams_are_not_held():
+    sent = []
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/zip")],
+            }
+        )
+        # The headers must be out before the first entry is ready
+        assert [message["type"] for message in sent] == ["http.response.start"]
+        await send({"type": "http.response.body", "body": b"PK", "more_body": False})
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    middleware = CompressionMiddleware(app)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    asyncio.run(middleware(scope, receive, send))
+
+    assert [message["type"] for message in sent] == [
+        "http.response.start",
+        "http.response.body",
+    ]
@@ -0,0 +1,130 @@
+import json
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cookie_store import CookieJar, CookieStream
+
+VIDEO_INFO = {
+    "id": "dQw4w9WgXcQ",
+    "title": "Stub video",
+    "duration": 212,
+    "webpage_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "formats": [
+        {
+            "format_id": "18",
+            "ext": "mp4",
+            "vcodec": "avc1.42001E",
+            "acodec": "mp4a.40.2",
+            "height": 360,
+        },
+        {"format_id": "140", "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2"},
+    ],
+}
+
+
+class StubExtractor:
+    """Stands in for ExtractionService, counting extractions by path."""
+
+    def __init__(self, fail_subprocess: bool = False):
+        self.fail_subprocess = fail_subprocess
+        self.commands = 0
+        self.in_process = 0
+
+    async def run_command(self, cmd, timeout=None, check=False):
+        self.commands += 1
+        if self.fail_subprocess:
+            raise subprocess.CalledProcessError(1, cmd, "", "ERROR: stub failure")
+        return subprocess.CompletedProcess(cmd, 0, json.dumps(VIDEO_INFO), "")
+
+    async def run_in_executor(self, func, timeout=None):
+        self.in_process += 1
+        return VIDEO_INFO
+
+
+@pytest.fixture
+def client():
+    main.metadata_cache.clear()
+    # No lifespan: the background browser probes would run commands too
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    def install(**kwargs):
+        extractor = StubExtractor(**kwargs)
+        monkeypatch.setattr(
+            main.extraction_service, "run_command", extractor.run_command
+        )
+        monkeypatch.setattr(
+            main.extraction_service, "run_in_executor", extractor.run_in_executor
+        )
+        return extractor
+
+    return install
+
+
+@pytest.mark.parametrize(
+    "method, endpoint",
+    [
+        ("GET", "/api/info"),
+        ("POST", "/api/info"),
+        ("GET", "/api/formats"),
+        ("POST", "/api/formats"),
+    ],
+)
+def test_one_subprocess_extraction_per_request(client, stub, method, endpoint):
+    extractor = stub()
+
+    url = VIDEO_INFO["webpage_url"]
+    if method == "GET":
+        response = client.get(endpoint, params={"url": url})
+    else:
+        response = client.post(endpoint, json={"url": url})
+
+    assert response.status_code == 200, response.text
+    assert (extractor.commands, extractor.in_process) == (1, 0)
+
+
+@pytest.mark.parametrize("endpoint", ["/api/info", "/api/formats"])
+def test_failed_subprocess_falls_back_once(client, stub, endpoint):
+    extractor = stub(fail_subprocess=True)
+
+    response = client.get(endpoint, params={"url": VIDEO_INFO["webpage_url"]})
+
+    assert response.status_code == 200, response.text
+    assert (extractor.commands, extractor.in_process) == (1, 1)
+
+
+def test_info_and_formats_share_one_extraction(client, stub):
+    extractor = stub()
+
+    url = VIDEO_INFO["webpage_url"]
+    assert client.get("/api/info", params={"url": url}).status_code == 200
+    assert client.get("/api/formats", params={"url": url}).status_code == 200
+
+    assert (extractor.commands, extractor.in_process) == (1, 0)
+
+
+def test_browser_cookie_results_are_not_shared_with_anonymous_requests(
+    client, stub, monkeypatch
+):
+    extractor = stub()
+    browser_jar = CookieJar("b" * 64, "# Netscape HTTP Cookie File\n", 0, 0)
+    cookie_options = {}
+
+    async def get_cookie_options(use_browser_cookies, cookie_jar=None):
+        return cookie_options
+
+    monkeypatch.setattr(main, "get_cookie_options", get_cookie_options)
+
+    url = VIDEO_INFO["webpage_url"]
+    assert client.get("/api/info", params={"url": url}).status_code == 200
+    # The browser probe found a browser; its cookies now apply
+    cookie_options = {"cookiefile": CookieStream(browser_jar)}
+    assert client.get("/api/info", params={"url": url}).status_code == 200
+    assert client.get("/api/formats", params={"url": url}).status_code == 200
+
+    assert (extractor.commands, extractor.in_process) == (2, 0)
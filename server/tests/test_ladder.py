@@ -0,0 +1,68 @@
+from ladder import FormatLadder
+
+
+def fmt(format_id, vcodec, acodec, height=None, tbr=None):
+    return {
+        "format_id": format_id,
+        "vcodec": vcodec,
+        "acodec": acodec,
+        "height": height,
+        "tbr": tbr,
+    }
+
+
+def build(formats):
+    ladder = FormatLadder()
+    for f in formats:
+        ladder.add(f)
+    return ladder.build()
+
+
+def test_progressive_does_not_hide_video_only_at_same_height():
+    # 18 (progressive) has the higher bitrate, and used to take the h264
+    # slot at 360p so 134+140 was never offered
+    result = build(
+        [
+            fmt("18", "avc1.42001E", "mp4a.40.2", 360, tbr=600),
+            fmt("134", "avc1.4D401E", "none", 360, tbr=300),
+            fmt("140", "none", "mp4a.40.2", tbr=129),
+        ]
+    )
+
+    assert result["merged"][0]["format"] == "134+140"
+    assert result["merged"][0]["ext"] == "mp4"
+    assert result["video"] == {"360": {"h264": "134"}}
+    assert result["progressive"] == {"360": "18"}
+    assert result["heights"] == [360]
+    assert result["best"] == {"merged": "134+140", "progressive": "18", "audio": "140"}
+
+
+def test_needs_merge_marks_video_only_formats():
+    formats = [
+        fmt("18", "avc1.42001E", "mp4a.40.2", 360),
+        fmt("134", "avc1.4D401E", "none", 360),
+        fmt("140", "none", "mp4a.40.2"),
+    ]
+    build(formats)
+
+    assert [f["needs_merge"] for f in formats] == [False, True, False]
+
+
+def test_merged_prefers_audio_that_muxes_without_mkv():
+    result = build(
+        [
+            fmt("248", "vp9", "none", 1080, tbr=2500),
+            fmt("140", "none", "mp4a.40.2", tbr=129),
+            fmt("251", "none", "opus", tbr=120),
+        ]
+    )
+
+    assert result["merged"][0]["format"] == "248+251"
+    assert result["merged"][0]["ext"] == "webm"
+
+
+def test_direct_link_without_codecs_is_progressive():
+    result = build([fmt("0", None, None)])
+
+    assert result["merged"] == []
+    assert result["best"]["progressive"] == "0"
@@ -0,0 +1,77 @@
+import asyncio
+
+from media_cache import MediaResultCache
+
+
+def staged_file(cache, name, size):
+    path = cache.staging_root / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_publish_over_vanished_entry_keeps_accounting(tmp_path):
+    cache = MediaResultCache(tmp_path, max_bytes=10_000)
+    first = cache.publish(
+        "key", staged_file(cache, "a.webm", 100), "a.webm", "video/webm"
+    )
+    cache.release("key")
+    first.path.unlink()
+
+    second = cache.publish(
+        "key", staged_file(cache, "a.mp4", 300), "a.mp4", "video/mp4"
+    )
+
+    assert cache.total_bytes == 300
+    assert second.path.suffix == ".mp4"
+    # The sidecar now points at the new file; nothing of the old entry is left
+    assert sorted(path.name for path in cache.objects_dir.iterdir()) == [
+        "key.json",
+        "key.mp4",
+    ]
+
+
+def test_concurrent_misses_download_once(tmp_path):
+    cache = MediaResultCache(tmp_path, max_bytes=10_000)
+    downloads = []
+
+    async def serve():
+        entry = cache.acquire("key")
+        while entry is None and not cache.claim("key"):
+            await cache.wait("key")
+            entry = cache.acquire("key")
+        if entry is not None:
+            return entry
+        try:
+            downloads.append(1)
+            await asyncio.sleep(0.01)
+            source = staged_file(cache, "a.mp4", 10)
+            return cache.publish("key", source, "a.mp4", "video/mp4")
+        finally:
+            cache.finish("key")
+
+    async def main():
+        return await asyncio.gather(*(serve() for _ in range(5)))
+
+    entries = asyncio.run(main())
+
+    assert len(downloads) == 1
+    assert len({entry.path for entry in entries}) == 1
+    # One miss for the request that downloaded, however often the others waited
+    assert (cache.hits, cache.misses) == (4, 1)
+    assert cache.stats()["loading"] == 0
+
+
+def test_waiters_take_over_when_the_claimant_fails(tmp_path):
+    cache = MediaResultCache(tmp_path, max_bytes=10_000)
+
+    async def main():
+        assert cache.claim("key")
+        waiter = asyncio.ensure_future(cache.wait("key"))
+        await asyncio.sleep(0)
+        cache.finish("key")
+        await waiter
+        # Nothing was published, so the next request claims the key itself
+        assert cache.acquire("key") is None
+        assert cache.claim("key")
+
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import re
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import MetricsRegistry, StreamMetricsMiddleware
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$")
+
+
+def parse(text):
+    """{family: (type, help, [(sample name, labels, value)])} of exposition text."""
+    families = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, documentation = line[len("# HELP ") :].split(" ", 1)
+            families[name] = [None, documentation, []]
+        elif line.startswith("# TYPE "):
+            name, metric_type = line[len("# TYPE ") :].split(" ")
+            families[name][0] = metric_type
+        else:
+            name, labels, value = SAMPLE.match(line).groups()
+            families[list(families)[-1]][2].append((name, labels or "", value))
+    return {name: tuple(family) for name, family in families.items()}
+
+
+def test_render_names_counter_families_after_their_samples():
+    registry = MetricsRegistry()
+    failures = registry.counter("app_failures", "Failed calls", ("method",))
+    failures.inc(method="api")
+    failures.inc(2, method="cli")
+    registry.counter_callback(
+        "app_jobs", "Jobs by status", lambda: {"done": 3}, ("status",)
+    )
+    registry.gauge_callback("app_active", "Active calls", lambda: 1.5)
+    latency = registry.histogram("app_seconds", "Call latency", buckets=(0.1, 1))
+    latency.observe(0.5)
+
+    families = parse(registry.render())
+
+    assert families["app_failures_total"] == (
+        "counter",
+        "Failed calls",
+        [
+            ("app_failures_total", '{method="api"}', "1"),
+            ("app_failures_total", '{method="cli"}', "2"),
+        ],
+    )
+    assert families["app_jobs_total"] == (
+        "counter",
+        "Jobs by status",
+        [("app_jobs_total", '{status="done"}', "3")],
+    )
+    assert families["app_active"] == (
+        "gauge",
+        "Active calls",
+        [("app_active", "", "1.5")],
+    )
+    assert families["app_seconds"] == (
+        "histogram",
+        "Call latency",
+        [
+            ("app_seconds_bucket", '{le="0.1"}', "0"),
+            ("app_seconds_bucket", '{le="1"}', "1"),
+            ("app_seconds_bucket", '{le="+Inf"}', "1"),
+            ("app_seconds_sum", "", "0.5"),
+            ("app_seconds_count", "", "1"),
+        ],
+    )
+
+
+def test_failing_callback_is_skipped():
+    registry = MetricsRegistry()
+    registry.gauge_callback("app_broken", "Always fails", lambda: 1 / 0)
+    registry.counter("app_calls", "Calls").inc()
+
+    assert list(parse(registry.render())) == ["app_calls_total"]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("app_errors", "Errors", ("message",)).inc(message='say "hi"\n')
+
+    assert 'app_errors_total{message="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_stream_middleware_records_download_responses():
+    app = FastAPI()
+
+    @app.get("/api/download/stream")
+    async def download():
+        return Response(b"x" * 1000, media_type="video/mp4")
+
+    @app.get("/api/other")
+    async def other():
+        return Response(b"y" * 10)
+
+    app.add_middleware(StreamMetricsMiddleware)
+    before = metrics.STREAM_BYTES.samples()[0][2]
+
+    client = TestClient(app)
+    assert client.get("/api/download/stream").status_code == 200
+    assert client.get("/api/other").status_code == 200
+
+    assert metrics.STREAM_BYTES.samples()[0][2] - before == 1000
+    bytes_count = [
+        value
+        for suffix, labels, value in metrics.STREAM_RESPONSE_BYTES.samples()
+        if suffix == "_count" and labels == '{status="2xx"}'
+    ]
+    assert bytes_count and bytes_count[0] >= 1
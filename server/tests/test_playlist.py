@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from playlist import ParallelPlaylistDownload, PlaylistDownloadError, PlaylistEntry
+
+
+def make_entries(count):
+    return [
+        PlaylistEntry(n, f"https://example.com/{n}", f"Entry {n}")
+        for n in range(1, count + 1)
+    ]
+
+
+def run_download(entries, fail_times, **kwargs):
+    """Download entries, failing entry n its first fail_times[n] attempts."""
+    order = []
+
+    async def download_entry(entry):
+        await asyncio.sleep(0)
+        if entry.attempts <= fail_times.get(entry.index, 0):
+            raise RuntimeError(f"entry {entry.index} failed")
+        order.append(entry.index)
+        return [f"/tmp/{entry.index}.mp4"]
+
+    download = ParallelPlaylistDownload(entries, download_entry, **kwargs)
+    asyncio.run(download.run())
+    return download, order
+
+
+def test_retry_backoff_does_not_hold_the_worker():
+    download, order = run_download(
+        make_entries(3), {1: 1}, workers=1, retries=2, retry_delay=0.05
+    )
+
+    # The single worker went on to entries 2 and 3 during entry 1's backoff
+    assert order == [2, 3, 1]
+    assert len(download.finished) == 3
+
+
+def test_workers_wait_for_retries_scheduled_by_others():
+    download, order = run_download(
+        make_entries(2), {2: 2}, workers=2, retries=2, retry_delay=0.01
+    )
+
+    assert sorted(order) == [1, 2]
+    assert download.entries[1].attempts == 3
+    assert not download.failed
+
+
+def test_entry_fails_after_its_retries():
+    download, order = run_download(
+        make_entries(2), {2: 5}, workers=2, retries=1, retry_delay=0.01
+    )
+
+    assert order == [1]
+    assert [entry.index for entry in download.failed] == [2]
+    assert download.entries[1].attempts == 2
+
+
+def test_all_entries_failing_raises():
+    with pytest.raises(PlaylistDownloadError):
+        run_download(make_entries(2), {1: 5, 2: 5}, retries=0)
@@ -0,0 +1,99 @@
+import asyncio
+import http.cookiejar
+import sys
+import time
+
+import pytest
+
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+from progressive import (
+    ProgressivePlan,
+    ProgressiveStream,
+    ProgressiveStreamError,
+    build_merge_command,
+)
+
+
+def python_plan(code):
+    return ProgressivePlan([sys.executable, "-c", code], "mp4")
+
+
+async def read_all(stream):
+    return b"".join([chunk async for chunk in stream.iter_chunks()])
+
+
+def test_streams_producer_output():
+    closed = []
+    stream = ProgressiveStream(
+        python_plan("import sys; sys.stdout.write('media bytes')"),
+        on_close=lambda: closed.append(True),
+    )
+
+    async def main():
+        await stream.start(timeout=10)
+        return await read_all(stream)
+
+    assert asyncio.run(main()) == b"media bytes"
+    assert closed == [True]
+
+
+def test_stalled_producer_times_out_before_first_chunk():
+    closed = []
+    stream = ProgressiveStream(
+        python_plan("import time; time.sleep(30)"),
+        on_close=lambda: closed.append(True),
+    )
+
+    start_time = time.monotonic()
+    with pytest.raises(ProgressiveStreamError, match="no output within"):
+        asyncio.run(stream.start(timeout=0.5))
+
+    assert time.monotonic() - start_time < 10
+    assert stream.process.returncode is not None
+    # The subprocess cookie file is released with the stream
+    assert closed == [True]
+
+
+def make_cookie(name, value, domain):
+    return http.cookiejar.Cookie(
+        0,
+        name,
+        value,
+        None,
+        False,
+        domain,
+        True,
+        domain.startswith("."),
+        "/",
+        True,
+        False,
+        None,
+        False,
+        None,
+        None,
+        {},
+    )
+
+
+def test_merge_command_passes_every_cookie_on_its_own_line():
+    cookiejar = YoutubeDLCookieJar()
+    cookiejar.set_cookie(make_cookie("SID", "abc", ".example.com"))
+    cookiejar.set_cookie(make_cookie("HSID", "def", ".example.com"))
+    cookiejar.set_cookie(make_cookie("other", "xyz", ".elsewhere.org"))
+    formats = [
+        {"url": "https://video.example.com/v.mp4", "vcodec": "avc1", "acodec": "none"},
+        {"url": "https://audio.example.com/a.m4a", "vcodec": "none", "acodec": "mp4a"},
+    ]
+
+    cmd = build_merge_command(formats, cookiejar)
+
+    cookie_values = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-cookies"]
+    assert len(cookie_values) == 2
+    for value in cookie_values:
+        lines = value.split("\r\n")
+        assert lines.pop() == ""
+        assert sorted(lines) == [
+            "HSID=def; path=/; domain=.example.com;",
+            "SID=abc; path=/; domain=.example.com;",
+        ]
@@ -0,0 +1,89 @@
+import random
+import re
+
+import pytest
+from fastapi import HTTPException
+
+from security import SecurityValidator
+
+
+def old_contains_dangerous_pattern(value):
+    """The per-pattern loop the compiled regex replaced."""
+    return any(
+        re.search(pattern, value, re.IGNORECASE)
+        for pattern in SecurityValidator.DANGEROUS_PATTERNS
+    )
+
+
+SAMPLES = [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://example.com/../etc/passwd",
+    "https://example.com/?q=<SCRIPT>alert(1)</script>",
+    "JavaScript:alert(1)",
+    "https://example.com/?x=ONload=1",
+    "ONİload=",
+    "onİload=",
+    "ſystem(1)",
+    "Kill",
+    "EVAL (x)",
+    "Straße",
+    "rm  -RF /",
+    "DEL /Q",
+    "..\\..\\",
+    "",
+]
+
+# Letters whose case mappings are irregular, mixed into random strings
+ALPHABET = "abcdeilnorsvxyzABCDEILNORSVXYZ./\\<>:=( -İıſKß"
+
+
+def random_samples(count=2000, seed=1234):
+    rng = random.Random(seed)
+    keywords = [
+        "on",
+        "load",
+        "eval",
+        "exec",
+        "system",
+        "script",
+        "javascript",
+        "rm",
+        "del",
+    ]
+    samples = []
+    for _ in range(count):
+        parts = [
+            rng.choice(keywords) if rng.random() < 0.3 else rng.choice(ALPHABET)
+            for _ in range(rng.randint(1, 12))
+        ]
+        samples.append("".join(parts))
+    return samples
+
+
+@pytest.mark.parametrize("value", SAMPLES)
+def test_single_value_matches_old_loop(value):
+    assert SecurityValidator.contains_dangerous_pattern(
+        value
+    ) == old_contains_dangerous_pattern(value)
+
+
+def test_random_values_match_old_loop():
+    for value in random_samples():
+        assert SecurityValidator.contains_dangerous_pattern(
+            value
+        ) == old_contains_dangerous_pattern(value), value
+
+
+def test_batch_scan_matches_old_loop():
+    values = SAMPLES + random_samples(500, seed=99)
+    expected = {
+        index
+        for index, value in enumerate(values)
+        if old_contains_dangerous_pattern(value)
+    }
+    assert SecurityValidator.find_dangerous_values(values) == expected
+
+
+def test_dotted_capital_i_is_still_rejected():
+    with pytest.raises(HTTPException):
+        SecurityValidator.validate_url("https://example.com/?x=ONİload=1")
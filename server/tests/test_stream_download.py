@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+
+import main
+from extraction import ExtractionTimeout
+from media_cache import MediaResultCache
+
+
+def test_preflight_runs_on_the_extraction_service(monkeypatch):
+    calls = []
+
+    async def run_in_executor(func, timeout=None):
+        calls.append(func)
+        raise ExtractionTimeout(300)
+
+    monkeypatch.setattr(main.extraction_service, "run_in_executor", run_in_executor)
+    monkeypatch.setattr(main, "media_cache", None)
+
+    response = TestClient(main.app).post(
+        "/api/download/stream",
+        json={"url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"},
+    )
+
+    assert len(calls) == 1
+    assert response.status_code == 504
+    # The download slot was given back
+    assert main.download_scheduler.stats()["active"] == 0
+
+
+def test_job_preflight_timeout_fails_the_job(monkeypatch):
+    async def run_in_executor(func, timeout=None):
+        raise ExtractionTimeout(300)
+
+    monkeypatch.setattr(main.extraction_service, "run_in_executor", run_in_executor)
+
+    client = TestClient(main.app)
+    response = client.post(
+        "/api/jobs",
+        json={"url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"},
+    )
+    assert response.status_code == 202, response.text
+
+    job = main.job_manager.get(response.json()["job_id"])
+    for _ in range(50):
+        if job.status in main.JOB_TERMINAL_STATUSES:
+            break
+        # Each request gives the job task another turn of the event loop
+        client.get(f"/api/jobs/{job.id}")
+    assert job.status == "failed"
+    assert job.error == str(ExtractionTimeout(300))
+    assert main.download_scheduler.stats()["active"] == 0
+
+
+def test_browser_cookie_downloads_skip_the_media_cache(monkeypatch, tmp_path):
+    async def run_in_executor(func, timeout=None):
+        raise ExtractionTimeout(300)
+
+    async def get_cookie_options(use_browser_cookies, cookie_jar=None):
+        return {"cookiesfrombrowser": ("firefox", None, None, None)}
+
+    cache = MediaResultCache(tmp_path, max_bytes=10_000)
+    monkeypatch.setattr(main.extraction_service, "run_in_executor", run_in_executor)
+    monkeypatch.setattr(main, "get_cookie_options", get_cookie_options)
+    monkeypatch.setattr(main, "media_cache", cache)
+
+    response = TestClient(main.app).post(
+        "/api/download/stream",
+        json={
+            "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "use_browser_cookies": True,
+        },
+    )
+
+    assert response.status_code == 504
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert cache.stats()["loading"] == 0
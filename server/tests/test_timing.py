@@ -0,0 +1,117 @@
+import json
+import logging
+import re
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from timing import (
+    PhaseTimer,
+    ServerTimingMiddleware,
+    current_task_id,
+    current_timer,
+    phase,
+)
+
+SERVER_TIMING = re.compile(r"^(\w+);dur=(\d+\.\d)$")
+
+
+def parse_server_timing(value):
+    return dict(SERVER_TIMING.match(part).groups() for part in value.split(", "))
+
+
+def test_phases_with_the_same_name_add_up():
+    timer = PhaseTimer("task-1")
+    timer.record("extraction", 0.25)
+    with timer.phase("download"):
+        pass
+    timer.record("extraction", 0.5)
+
+    phases = dict(timer.phases())
+    assert phases["extraction"] == 0.75
+    assert set(phases) == {"extraction", "download"}
+
+    timing = parse_server_timing(timer.server_timing())
+    assert list(timing) == ["extraction", "download", "total"]
+    assert timing["extraction"] == "750.0"
+
+
+def test_postprocessor_hook_times_each_thread_separately():
+    timer = PhaseTimer()
+    hook = timer.postprocessor_hook()
+
+    def run_postprocessor():
+        hook({"postprocessor": "Merger", "status": "started"})
+        hook({"postprocessor": "Merger", "status": "finished"})
+
+    threads = [threading.Thread(target=run_postprocessor) for _ in range(4)]
+    hook({"postprocessor": "Merger", "status": "started"})
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # A finish without a start on this thread is ignored
+    hook({"postprocessor": "FFmpegMetadata", "status": "finished"})
+
+    assert [name for name, _ in timer.phases()] == ["pp_Merger"]
+
+
+def test_phase_outside_a_request_does_nothing():
+    assert current_timer() is None
+    with phase("extraction"):
+        pass
+    assert current_task_id() != current_task_id()
+
+
+def make_app(logger):
+    app = FastAPI()
+
+    @app.get("/api/work")
+    async def work():
+        with phase("extraction"):
+            pass
+        return {"task_id": current_task_id()}
+
+    @app.get("/api/health")
+    async def health():
+        return {"timed": current_timer() is not None}
+
+    app.add_middleware(ServerTimingMiddleware, logger=logger)
+    return app
+
+
+def test_middleware_sends_server_timing_and_logs_the_request(caplog):
+    logger = logging.getLogger("test_timing")
+    client = TestClient(make_app(logger))
+
+    with caplog.at_level(logging.INFO, logger="test_timing"):
+        response = client.get("/api/work")
+
+    assert response.status_code == 200
+    assert set(parse_server_timing(response.headers["Server-Timing"])) == {
+        "extraction",
+        "total",
+    }
+
+    (record,) = caplog.records
+    event = json.loads(record.getMessage()[len("request_timing ") :])
+    assert event["task_id"] == response.json()["task_id"]
+    assert (event["method"], event["path"], event["status"]) == (
+        "GET",
+        "/api/work",
+        200,
+    )
+    assert set(event["phases_ms"]) == {"extraction", "delivery"}
+
+
+def test_excluded_paths_are_not_timed(caplog):
+    logger = logging.getLogger("test_timing")
+    client = TestClient(make_app(logger))
+
+    with caplog.at_level(logging.INFO, logger="test_timing"):
+        response = client.get("/api/health")
+
+    assert response.json() == {"timed": False}
+    assert "Server-Timing" not in response.headers
+    assert caplog.records == []
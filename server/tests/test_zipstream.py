@@ -0,0 +1,97 @@
+import asyncio
+import io
+import struct
+import zipfile
+
+from zipstream import ZIP64_LIMIT, ZipStreamWriter, unique_arcname, zip_file_chunks
+
+LOCAL_HEADER = "<IHHHHHIIIHH"
+
+
+def local_header(archive: bytes, info: zipfile.ZipInfo):
+    """(fields, extra) of an entry's local file header."""
+    size = struct.calcsize(LOCAL_HEADER)
+    fields = struct.unpack_from(LOCAL_HEADER, archive, info.header_offset)
+    name_length, extra_length = fields[9], fields[10]
+    extra_start = info.header_offset + size + name_length
+    return fields, archive[extra_start : extra_start + extra_length]
+
+
+def test_unsized_entry_has_zip64_local_header_and_plain_directory_entry():
+    writer = ZipStreamWriter()
+    data = b"streamed without a known size" * 100
+    archive = (
+        writer.begin_entry("stream.mp4", mtime=1700000000, size_hint=None)
+        + writer.write(data[:1000])
+        + writer.write(data[1000:])
+        + writer.end_entry()
+        + writer.add_bytes("notes.txt", b"small")
+        + writer.finish()
+    )
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.testzip() is None
+        assert zf.read("stream.mp4") == data
+        assert zf.read("notes.txt") == b"small"
+        info = zf.getinfo("stream.mp4")
+
+    fields, extra = local_header(archive, info)
+    # Version 4.5, sizes deferred to the ZIP64 extra and data descriptor
+    assert fields[1] == 45
+    assert fields[7:9] == (ZIP64_LIMIT, ZIP64_LIMIT)
+    assert extra[:4] == struct.pack("<HH", 0x0001, 16)
+    # The entry is small, so the central directory keeps the plain fields
+    assert info.extra == b""
+    assert (info.file_size, info.compress_size) == (len(data), len(data))
+
+
+def test_utf8_names_round_trip(tmp_path):
+    path = tmp_path / "source.bin"
+    path.write_bytes(b"\x00\x01" * 5000)
+    name = "Beyoncé – 東京 🎵.webm"
+
+    async def build():
+        writer = ZipStreamWriter()
+        chunks = [
+            chunk async for chunk in zip_file_chunks(writer, str(path), name, 4096)
+        ]
+        return b"".join(chunks) + writer.finish()
+
+    archive = asyncio.run(build())
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        (info,) = zf.infolist()
+        assert info.filename == name
+        assert info.flag_bits & 0x800
+        assert zf.read(name) == path.read_bytes()
+
+    # A known size below 4 GiB needs no ZIP64 extra in the local header
+    fields, extra = local_header(archive, info)
+    assert fields[1] == 20
+    assert extra == b""
+
+
+def test_unique_arcname_resolves_collisions():
+    used = set()
+    names = [
+        unique_arcname(name, used)
+        for name in ["clip.mp4", "clip.mp4", "clip.mp4", "clip (1).mp4", "README"]
+    ]
+    names.append(unique_arcname("README", used))
+
+    assert names == [
+        "clip.mp4",
+        "clip (1).mp4",
+        "clip (2).mp4",
+        "clip (1) (1).mp4",
+        "README",
+        "README (1)",
+    ]
+    assert used == set(names)
+
+    writer = ZipStreamWriter()
+    archive = b"".join(writer.add_bytes(name, name.encode()) for name in names)
+    archive += writer.finish()
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.namelist() == names
+        assert all(zf.read(name) == name.encode() for name in names)
@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_current_timer: ContextVar[Optional["PhaseTimer"]] = ContextVar(
+    "phase_timer", default=None
+)
+
+
+class PhaseTimer:
+    """
+    Durations of the phases of one request, keyed by its task id.
+
+    Phases with the same name add up. Durations can be recorded from
+    worker threads (yt-dlp hooks), so updates are locked.
+    """
+
+    def __init__(self, task_id: Optional[str] = None):
+        self.task_id = task_id or str(uuid.uuid4())
+        self.started = time.perf_counter()
+        self._phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._phases[name] = self._phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def phases(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return list(self._phases.items())
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        metrics = [
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases()
+        ]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def postprocessor_hook(self) -> Callable[[dict], None]:
+        """yt-dlp postprocessor hook recording each postprocessor as pp_<key>."""
+        # Playlist entries share the hook across download threads
+        started: Dict[Tuple[int, str], float] = {}
+
+        def hook(d: dict):
+            key = d.get("postprocessor") or "unknown"
+            slot = (threading.get_ident(), key)
+            if d.get("status") == "started":
+                started[slot] = time.perf_counter()
+            elif d.get("status") == "finished" and slot in started:
+                self.record(f"pp_{key}", time.perf_counter() - started.pop(slot))
+
+        return hook
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    """The timer of the request being handled, if it is timed."""
+    return _current_timer.get()
+
+
+def current_task_id() -> str:
+    """The task id of the timed request, or a new one."""
+    timer = current_timer()
+    return timer.task_id if timer is not None else str(uuid.uuid4())
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a phase of the current request; does nothing outside one."""
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    """
+    Times API requests phase by phase.
+
+    Handlers mark phases with phase(); time from the response headers to
+    the last body byte is recorded as "delivery". The phases known when the
+    headers go out are sent as a Server-Timing header, and again with
+    delivery as a trailer when the server supports trailers and the body is
+    streamed. Each request ends with one "request_timing" log event.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        logger: logging.Logger,
+        path_prefix: str = "/api/",
+        excluded_paths: Tuple[str, ...] = ("/api/health",),
+    ):
+        self.app = app
+        self.logger = logger
+        self.path_prefix = path_prefix
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or not path.startswith(self.path_prefix)
+            or path in self.excluded_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        timer = PhaseTimer()
+        token = _current_timer.set(timer)
+        supports_trailers = "http.response.trailers" in scope.get("extensions", {})
+        status = 500
+        delivery_start: Optional[float] = None
+        send_trailers = False
+
+        async def send_timed(message: Message):
+            nonlocal status, delivery_start, send_trailers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(raw=message["headers"])
+                headers["Server-Timing"] = timer.server_timing()
+                if supports_trailers and "content-length" not in headers:
+                    headers["Trailer"] = "Server-Timing"
+                    message["trailers"] = send_trailers = True
+                delivery_start = time.perf_counter()
+                await send(message)
+                return
+
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                if delivery_start is not None:
+                    timer.record("delivery", time.perf_counter() - delivery_start)
+                if send_trailers:
+                    send_trailers = False
+                    await send(
+                        {
+                            "type": "http.response.trailers",
+                            "headers": [
+                                (b"server-timing", timer.server_timing().encode())
+                            ],
+                            "more_trailers": False,
+                        }
+                    )
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current_timer.reset(token)
+            self.log(timer, scope, status)
+
+    def log(self, timer: PhaseTimer, scope: Scope, status: int):
+        event = {
+            "task_id": timer.task_id,
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status,
+            "total_ms": round(timer.elapsed() * 1000, 1),
+            "phases_ms": {
+                name: round(seconds * 1000, 1) for name, seconds in timer.phases()
+            },
+        }
+        if hasattr(self.logger, "bind"):
+            # structlog: the fields become keys of the JSON event
+            self.logger.info("request_timing", **event)
+        else:
+            self.logger.info(f"request_timing {json.dumps(event)}")
@@ -0,0 +1,241 @@
+import asyncio
+import os
+import struct
+import time
+import zlib
+from typing import AsyncIterator, List, Optional, Tuple
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+# General purpose flags: sizes and CRC follow the data (bit 3), UTF-8 names (bit 11)
+FLAGS = 0x0808
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+EXTERNAL_ATTR = 0o100644 << 16
+
+
+def dos_datetime(timestamp: float) -> Tuple[int, int]:
+    """DOS (time, date) fields for a timestamp, clamped to the format's 1980 epoch."""
+    t = time.localtime(max(timestamp, 315532800))
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipEntry:
+    def __init__(self, name: bytes, offset: int, mtime: float, zip64: bool):
+        self.name = name
+        self.offset = offset
+        self.dos_time, self.dos_date = dos_datetime(mtime)
+        self.zip64 = zip64
+        self.crc = 0
+        self.size = 0
+
+
+class ZipStreamWriter:
+    """
+    Builds a ZIP archive as a stream of bytes, one entry after another.
+
+    Entries are stored without compression (media is already compressed) and
+    use data descriptors, so an entry's header goes out before its size or
+    CRC is known and nothing has to be buffered. ZIP64 records are used for
+    entries and archives beyond the 4 GiB / 65535 entry limits.
+    """
+
+    def __init__(self):
+        self._entries: List[ZipEntry] = []
+        self._current: Optional[ZipEntry] = None
+        self.offset = 0
+
+    def _emit(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def begin_entry(
+        self, name: str, mtime: Optional[float] = None, size_hint: Optional[int] = None
+    ) -> bytes:
+        """
+        Local file header for a new entry.
+
+        Without a size_hint the entry is assumed to possibly need ZIP64; a
+        hint below 4 GiB keeps the plain format most tools expect.
+        """
+        if self._current is not None:
+            raise RuntimeError("Previous ZIP entry was not finished")
+        zip64 = size_hint is None or size_hint >= ZIP64_LIMIT
+        entry = ZipEntry(
+            name.encode("utf-8"),
+            self.offset,
+            time.time() if mtime is None else mtime,
+            zip64,
+        )
+        self._current = entry
+
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+            sizes = ZIP64_LIMIT
+        else:
+            extra = b""
+            sizes = 0
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50,
+            VERSION_ZIP64 if zip64 else VERSION_DEFAULT,
+            FLAGS,
+            0,  # stored
+            entry.dos_time,
+            entry.dos_date,
+            0,  # CRC, in the data descriptor
+            sizes,
+            sizes,
+            len(entry.name),
+            len(extra),
+        )
+        return self._emit(header + entry.name + extra)
+
+    def write(self, data: bytes) -> bytes:
+        """Account for a chunk of the current entry's data and return it."""
+        entry = self._current
+        entry.crc = zlib.crc32(data, entry.crc)
+        entry.size += len(data)
+        return self._emit(data)
+
+    def end_entry(self) -> bytes:
+        """Data descriptor closing the current entry."""
+        entry = self._current
+        self._current = None
+        if not entry.zip64 and entry.size >= ZIP64_LIMIT:
+            raise ValueError(f"ZIP entry grew past its size hint: {entry.name!r}")
+        self._entries.append(entry)
+        if entry.zip64:
+            descriptor = struct.pack(
+                "<IIQQ", 0x08074B50, entry.crc, entry.size, entry.size
+            )
+        else:
+            descriptor = struct.pack(
+                "<IIII", 0x08074B50, entry.crc, entry.size, entry.size
+            )
+        return self._emit(descriptor)
+
+    def add_bytes(self, name: str, data: bytes) -> bytes:
+        """A complete small entry from bytes held in memory."""
+        return (
+            self.begin_entry(name, size_hint=len(data))
+            + self.write(data)
+            + self.end_entry()
+        )
+
+    def finish(self) -> bytes:
+        """Central directory and end records; the archive is complete after this."""
+        if self._current is not None:
+            raise RuntimeError("Last ZIP entry was not finished")
+        directory_offset = self.offset
+        records = []
+        for entry in self._entries:
+            needs_zip64 = entry.size >= ZIP64_LIMIT or entry.offset >= ZIP64_LIMIT
+            extra_fields = []
+            if entry.size >= ZIP64_LIMIT:
+                extra_fields += [entry.size, entry.size]
+            if entry.offset >= ZIP64_LIMIT:
+                extra_fields.append(entry.offset)
+            extra = (
+                struct.pack(
+                    f"<HH{len(extra_fields)}Q",
+                    0x0001,
+                    8 * len(extra_fields),
+                    *extra_fields,
+                )
+                if extra_fields
+                else b""
+            )
+            version = VERSION_ZIP64 if needs_zip64 or entry.zip64 else VERSION_DEFAULT
+            size = min(entry.size, ZIP64_LIMIT)
+            records.append(
+                struct.pack(
+                    "<IHHHHHHIIIHHHHHII",
+                    0x02014B50,
+                    (3 << 8) | version,  # made by: Unix
+                    version,
+                    FLAGS,
+                    0,
+                    entry.dos_time,
+                    entry.dos_date,
+                    entry.crc,
+                    size,
+                    size,
+                    len(entry.name),
+                    len(extra),
+                    0,  # comment
+                    0,  # disk
+                    0,  # internal attributes
+                    EXTERNAL_ATTR,
+                    min(entry.offset, ZIP64_LIMIT),
+                )
+                + entry.name
+                + extra
+            )
+        directory = b"".join(records)
+        directory_size = len(directory)
+        count = len(self._entries)
+
+        trailer = b""
+        if (
+            count >= ZIP_FILECOUNT_LIMIT
+            or directory_offset >= ZIP64_LIMIT
+            or directory_size >= ZIP64_LIMIT
+        ):
+            zip64_end_offset = directory_offset + directory_size
+            trailer += struct.pack(
+                "<IQHHIIQQQQ",
+                0x06064B50,
+                44,
+                (3 << 8) | VERSION_ZIP64,
+                VERSION_ZIP64,
+                0,
+                0,
+                count,
+                count,
+                directory_size,
+                directory_offset,
+            )
+            trailer += struct.pack("<IIQI", 0x07064B50, 0, zip64_end_offset, 1)
+        trailer += struct.pack(
+            "<IHHHHIIH",
+            0x06054B50,
+            0,
+            0,
+            min(count, ZIP_FILECOUNT_LIMIT),
+            min(count, ZIP_FILECOUNT_LIMIT),
+            min(directory_size, ZIP64_LIMIT),
+            min(directory_offset, ZIP64_LIMIT),
+            0,
+        )
+        return self._emit(directory + trailer)
+
+
+async def zip_file_chunks(
+    writer: ZipStreamWriter, path: str, arcname: str, chunk_size: int
+) -> AsyncIterator[bytes]:
+    """Yield one file on disk as a ZIP entry, reading it in worker threads."""
+    stat_result = os.stat(path)
+    yield writer.begin_entry(arcname, stat_result.st_mtime, stat_result.st_size)
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield writer.write(chunk)
+    yield writer.end_entry()
+
+
+def unique_arcname(name: str, used: set) -> str:
+    """Archive name that does not clash with names already in the archive."""
+    candidate = name
+    base, ext = os.path.splitext(name)
+    counter = 1
+    while candidate in used:
+        candidate = f"{base} ({counter}){ext}"
+        counter += 1
+    used.add(candidate)
+    return candidate